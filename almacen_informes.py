@@ -0,0 +1,252 @@
+# =========================================================
+# almacen_informes.py - INTERFÍCIE COMUNA D'EMMAGATZEMATGE D'INFORMES
+# =========================================================
+# app.py (SQLite) i app_dataverse.py (Dataverse) fan les mateixes consultes
+# amb dues API diferents. AlmacenInformes és el contracte comú que fan servir
+# les vistes i els històrics; les implementacions són:
+#   - informes_sqlite.AlmacenSQLite       (informes.db)
+#   - dataverse_almacen.AlmacenDataverse  (Dataverse, o la rèplica si està llesta)
+#   - AlmacenEnCache (aquí): decorador que guarda les lectures de qualsevol
+#     dels dos uns segons i les invalida en desar.
+#
+# Formats (iguals a tots dos costats):
+#   - dates en ISO (AAAA-MM-DD);
+#   - informe general: {"fecha", "cuidador", "entradas", "mantenimiento",
+#     "temas"} i, si es demanen, "taxis";
+#   - taxi: {"Fecha", "Hora", "Recogida", "Destino", "Deportistas",
+#     "Observaciones"} (claus del formulari);
+#   - informe individual: (fecha, contenido).
+# Les escriptures segueixen el format de la cua de Dataverse: guardar(tipo,
+# datos) amb tipo "informe_general", "informe_individual" o "borrar_individual".
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from types import MappingProxyType
+from typing import Iterator
+
+TIPOS_OPERACION = ("informe_general", "informe_individual", "borrar_individual")
+
+
+class AlmacenInformes(ABC):
+    """
+    Lectures i escriptures d'informes, independents del backend. Un backend
+    que no implementa algun mètode no es pot instanciar.
+    """
+
+    # ----------------------------------------------
+    # Informes generals
+    # ----------------------------------------------
+    @abstractmethod
+    def informe_general(self, fecha_iso: str) -> dict | None:
+        """Informe general del dia, amb "taxis" (None si no n'hi ha)."""
+
+    @abstractmethod
+    def informes_generales_rango(self, desde_iso: str, hasta_iso: str, con_taxis: bool = False) -> list[dict]:
+        """Informes generals del rang, per data ascendent."""
+
+    @abstractmethod
+    def iter_informes_generales_todos(self) -> Iterator[dict]:
+        """Tots els informes generals (més recents primer), sense taxis."""
+
+    @abstractmethod
+    def iter_informes_generales_con_texto(self, terminos: list[str]) -> Iterator[dict]:
+        """Informes generals (més recents primer) on algun camp conté algun terme (sense distingir majúscules)."""
+
+    @abstractmethod
+    def taxis_rango(self, desde_iso: str, hasta_iso: str, por_servicio: bool = False) -> list[tuple[str, dict]]:
+        """
+        (data de l'informe, taxi) dels informes del rang o, amb por_servicio,
+        dels serveis amb data dins el rang.
+        """
+
+    # ----------------------------------------------
+    # Informes individuals
+    # ----------------------------------------------
+    @abstractmethod
+    def informe_individual(self, fecha_iso: str, alumno: str) -> str | None:
+        """Contingut de l'informe (None si no n'hi ha)."""
+
+    @abstractmethod
+    def informes_individuales(self, alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None,
+                              ascendente: bool = False) -> list[tuple[str, str]]:
+        """(fecha, contenido) de l'esportista, opcionalment dins el rang; més recents primer per defecte."""
+
+    @abstractmethod
+    def alumnos_con_informe(self, fecha_iso: str) -> list[str]:
+        """Esportistes amb informe individual aquell dia."""
+
+    # ----------------------------------------------
+    # Escriptura
+    # ----------------------------------------------
+    @abstractmethod
+    def guardar(self, tipo: str, datos: dict) -> dict | None:
+        """
+        Aplica un desat (vegeu TIPOS_OPERACION). datos porta "fecha_iso" i els
+        camps de l'informe ("cuidador", "entradas", "mantenimiento", "temas",
+        "taxis" / "alumno", "alias", "contenido"). Retorna el que doni el
+        backend (a Dataverse, {"id", "etag"}).
+        """
+
+
+# -----------------------
+# Decorador amb caché de lectures
+# -----------------------
+ALMACEN_CACHE_TTL = 30          # segons
+ALMACEN_CACHE_MAX_ENTRADAS = 256
+
+
+def _congelar(valor):
+    """Còpia de només lectura (tuples i MappingProxyType) d'un resultat."""
+    if isinstance(valor, dict):
+        return MappingProxyType({k: _congelar(v) for k, v in valor.items()})
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def _en_rango(fecha: str, desde: str | None, hasta: str | None) -> bool:
+    return not (desde and hasta) or desde <= fecha <= hasta
+
+
+def _afecta(clave: tuple, tipo: str | None, datos: dict | None) -> bool:
+    """True si un desat (tipo, datos) pot canviar el resultat guardat amb aquesta clau."""
+    if tipo is None or not datos:
+        return True
+    nombre, *args = clave
+    fecha = datos.get("fecha_iso") or ""
+    if tipo == "informe_general":
+        if nombre == "informe_general":
+            return args[0] == fecha
+        if nombre == "informes_generales_rango":
+            return _en_rango(fecha, args[0], args[1])
+        if nombre == "taxis_rango":
+            # Per data del servei: els taxis (nous i vells) poden ser de qualsevol dia
+            return args[2] or _en_rango(fecha, args[0], args[1])
+        return False
+    alumno = datos.get("alumno")
+    if nombre == "informe_individual":
+        return (args[0], args[1]) == (fecha, alumno)
+    if nombre == "informes_individuales":
+        return args[0] == alumno and _en_rango(fecha, args[1], args[2])
+    if nombre == "alumnos_con_informe":
+        return args[0] == fecha
+    return False
+
+
+class AlmacenEnCache(AlmacenInformes):
+    """
+    Envolta un altre AlmacenInformes i en guarda les lectures (LRU amb TTL,
+    thread-safe); les iter_* passen directes. guardar() passa al backend i
+    invalida només les lectures que el desat pot haver canviat (per data i
+    esportista); si els desats arriben al backend per un altre camí (cua,
+    altres instàncies), cal cridar invalidar(tipo, datos) o acceptar fins a
+    'ttl' segons de dades antigues.
+    Els resultats són de només lectura (tuples i MappingProxyType): es
+    comparteixen entre sessions sense copiar-los.
+    """
+
+    def __init__(self, base: AlmacenInformes, ttl: float = ALMACEN_CACHE_TTL,
+                 max_entradas: int = ALMACEN_CACHE_MAX_ENTRADAS):
+        self.base = base
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._generacion = 0
+        # Darreres invalidacions (generació, tipo, datos), per saber si una
+        # lectura que ha començat abans d'un desat encara es pot guardar
+        self._invalidaciones: deque[tuple[int, str | None, dict | None]] = deque(maxlen=64)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _leer(self, nombre: str, *args):
+        clave = (nombre, *args)
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is not None and item[0] >= time.monotonic():
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return item[1]
+            if item is not None:
+                del self._datos[clave]
+            self.fallos += 1
+            generacion = self._generacion
+
+        valor = _congelar(getattr(self.base, nombre)(*args))
+
+        with self._lock:
+            # Si s'ha desat mentre llegíem, el resultat pot ser antic: no es guarda
+            if self.ttl > 0 and self._vigente(clave, generacion):
+                self._datos[clave] = (time.monotonic() + self.ttl, valor)
+                while len(self._datos) > self.max_entradas:
+                    self._datos.popitem(last=False)
+        return valor
+
+    def _vigente(self, clave: tuple, generacion: int) -> bool:
+        if generacion == self._generacion:
+            return True
+        if not self._invalidaciones or self._invalidaciones[0][0] > generacion + 1:
+            return False  # no sabem què s'ha invalidat entremig
+        return not any(
+            _afecta(clave, tipo, datos) for gen, tipo, datos in self._invalidaciones if gen > generacion
+        )
+
+    def invalidar(self, tipo: str | None = None, datos: dict | None = None):
+        """
+        Oblida les lectures que el desat (tipo, datos) pot haver canviat; sense
+        arguments, totes.
+        """
+        with self._lock:
+            self._generacion += 1
+            self._invalidaciones.append((self._generacion, tipo, datos))
+            for clave in [c for c in self._datos if _afecta(c, tipo, datos)]:
+                del self._datos[clave]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "encerts": self.aciertos,
+                "errades": self.fallos,
+                "percentatge_encerts": round(100 * self.aciertos / total, 1) if total else 0.0,
+                "entrades": len(self._datos),
+            }
+
+    # ----------------------------------------------
+    # Lectures
+    # ----------------------------------------------
+    def informe_general(self, fecha_iso: str) -> dict | None:
+        return self._leer("informe_general", fecha_iso)
+
+    def informes_generales_rango(self, desde_iso: str, hasta_iso: str, con_taxis: bool = False) -> list[dict]:
+        return self._leer("informes_generales_rango", desde_iso, hasta_iso, con_taxis)
+
+    def iter_informes_generales_todos(self) -> Iterator[dict]:
+        return self.base.iter_informes_generales_todos()
+
+    def iter_informes_generales_con_texto(self, terminos: list[str]) -> Iterator[dict]:
+        return self.base.iter_informes_generales_con_texto(terminos)
+
+    def taxis_rango(self, desde_iso: str, hasta_iso: str, por_servicio: bool = False) -> list[tuple[str, dict]]:
+        return self._leer("taxis_rango", desde_iso, hasta_iso, por_servicio)
+
+    def informe_individual(self, fecha_iso: str, alumno: str) -> str | None:
+        return self._leer("informe_individual", fecha_iso, alumno)
+
+    def informes_individuales(self, alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None,
+                              ascendente: bool = False) -> list[tuple[str, str]]:
+        return self._leer("informes_individuales", alumno, desde_iso, hasta_iso, ascendente)
+
+    def alumnos_con_informe(self, fecha_iso: str) -> list[str]:
+        return self._leer("alumnos_con_informe", fecha_iso)
+
+    # ----------------------------------------------
+    # Escriptura
+    # ----------------------------------------------
+    def guardar(self, tipo: str, datos: dict) -> dict | None:
+        try:
+            return self.base.guardar(tipo, datos)
+        finally:
+            # També si falla a mitges: no sabem què ha quedat escrit
+            self.invalidar(tipo, datos)
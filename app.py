@@ -1,6 +1,5 @@
 # app.py - Bloque 1
 import streamlit as st
-import sqlite3
 from datetime import date
 import pandas as pd
 import os
@@ -10,7 +9,6 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-import json
 import streamlit.components.v1 as components
 
 
@@ -29,28 +27,17 @@ os.makedirs(PDFS_DIR, exist_ok=True)
 # -----------------------
 # Conexión a la base de datos
 # -----------------------
-conn = sqlite3.connect("informes.db", check_same_thread=False)
-c = conn.cursor()
-
-# Tabla de informes generales
-c.execute('''CREATE TABLE IF NOT EXISTS informes (
-    fecha TEXT PRIMARY KEY,
-    cuidador TEXT,
-    entradas_salidas TEXT,
-    mantenimiento TEXT,
-    temas_genericos TEXT,
-    taxis TEXT
-)''')
-
-# Tabla de informes individuales
-c.execute('''CREATE TABLE IF NOT EXISTS informes_alumnos (
-    fecha TEXT,
-    alumno TEXT,
-    contenido TEXT,
-    PRIMARY KEY (fecha, alumno)
-)''')
-
-conn.commit()
+from informes_sqlite import GestorConexiones, AlmacenSQLite, CAMPOS_TAXI
+
+@st.cache_resource
+def _crear_gestor_conexiones() -> GestorConexiones:
+    # Un per procés; aplica les migracions (taules, índexs, FTS) en crear-se
+    return GestorConexiones("informes.db")
+
+
+# Pool de connexions (WAL, busy_timeout) compartit per totes les sessions:
+# cada consulta en treu una amb `with GESTOR.conexion() as conn:`.
+GESTOR = _crear_gestor_conexiones()
 
 # -----------------------
 # Listas de cuidadores y alumnos
@@ -134,14 +121,67 @@ for alumno in ALUMNOS:
     ALIAS_DEPORTISTAS[alumno] = alias
     _alias_usados.add(alias)
 
+# -----------------------
+# Índex de mencions (taula 'menciones' a informes.db, s'actualitza en desar)
+# -----------------------
+from menciones import CAMPOS_MENCIONES, BuscadorMenciones, IndiceMenciones
+
+BUSCADOR_MENCIONES = BuscadorMenciones.desde_alias(ALUMNOS, ALIAS_DEPORTISTAS)
+INDICE_MENCIONES = IndiceMenciones(GESTOR.conexion)
+
+
+def _indexar_menciones_general(conn, datos: dict):
+    # Dins la transacció del desat (mateixa connexió)
+    INDICE_MENCIONES.indexar_informe(
+        BUSCADOR_MENCIONES, datos["fecha_iso"], datos["cuidador"],
+        {"entradas": datos["entradas"], "mantenimiento": datos["mantenimiento"], "temas": datos["temas"]},
+        conn=conn,
+    )
+
+
+# -----------------------
+# Accés als informes (interfície comuna amb app_dataverse.py)
+# -----------------------
+ALMACEN = AlmacenSQLite(GESTOR, al_guardar_general=_indexar_menciones_general)
+
+if not INDICE_MENCIONES.vigente(BUSCADOR_MENCIONES):
+    # Primera execució o àlies canviats: s'omple amb els informes existents, en
+    # un fil (mentrestant, menciones_de_alumno recorre els informes)
+    INDICE_MENCIONES.reconstruir_en_segundo_plano(BUSCADOR_MENCIONES, ALMACEN.iter_informes_generales_todos)
+
+
+def menciones_de_alumno(alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None,
+                        ascendente: bool = False) -> list[tuple[str, str, dict[str, list[str]]]]:
+    """
+    [(fecha_iso, cuidador, {títol del camp: [línies]})] de l'esportista. Va a
+    l'índex si està al dia; si encara s'està reconstruint, recorre els informes.
+    """
+    if INDICE_MENCIONES.vigente(BUSCADOR_MENCIONES):
+        return INDICE_MENCIONES.menciones_de(alumno, desde_iso, hasta_iso, ascendente=ascendente)
+    if desde_iso and hasta_iso:
+        informes = ALMACEN.informes_generales_rango(desde_iso, hasta_iso)
+    else:
+        informes = ALMACEN.iter_informes_generales_todos()
+    menciones = []
+    for rec in informes:
+        campos = {
+            titulo: lineas
+            for campo, titulo in CAMPOS_MENCIONES.items()
+            if (lineas := extraer_menciones_de(alumno, rec.get(campo) or ""))
+        }
+        if campos:
+            menciones.append((rec.get("fecha") or "", rec.get("cuidador") or "", campos))
+    menciones.sort(key=lambda m: m[0], reverse=not ascendente)
+    return menciones
+
 # -----------------------
 # Tabla de usuarios (para contraseñas actualizadas)
 # -----------------------
-c.execute('''CREATE TABLE IF NOT EXISTS usuarios (
-    usuario TEXT PRIMARY KEY,
-    password_hash TEXT
-)''')
-conn.commit()
+with GESTOR.conexion() as conn, conn:
+    conn.execute('''CREATE TABLE IF NOT EXISTS usuarios (
+        usuario TEXT PRIMARY KEY,
+        password_hash TEXT
+    )''')
 
 import hashlib
 
@@ -160,8 +200,9 @@ def obtener_usuarios():
         st.error("⚠️ No s'han trobat credencials a .streamlit/secrets.toml (secció [auth])")
 
     # Sobrescribir si existen usuarios actualizados en la BD
-    c.execute("SELECT usuario, password_hash FROM usuarios")
-    for u, p in c.fetchall():
+    with GESTOR.conexion() as conn:
+        filas = conn.execute("SELECT usuario, password_hash FROM usuarios").fetchall()
+    for u, p in filas:
         usuarios[u] = p
 
     return usuarios
@@ -225,11 +266,11 @@ def cambiar_contraseña():
 
         # Guardar hash nuevo en la base de datos
         hash_nuevo = hashlib.sha256(pw_nueva.encode()).hexdigest()
-        c.execute(
-            "INSERT OR REPLACE INTO usuarios (usuario, password_hash) VALUES (?, ?)",
-            (usuario, hash_nuevo)
-        )
-        conn.commit()
+        with GESTOR.conexion() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO usuarios (usuario, password_hash) VALUES (?, ?)",
+                (usuario, hash_nuevo)
+            )
 
         st.success("✅ Contrasenya actualitzada correctament.")
         st.info("Tornant al menú principal...")
@@ -570,6 +611,9 @@ def mostrar_menu():
         if st.button("🖨️ Imprimir històrics", use_container_width=True):
             st.session_state["vista_actual"] = "historico"
             st.rerun()
+        if st.button("🔍 Cercar als informes", use_container_width=True):
+            st.session_state["vista_actual"] = "buscar"
+            st.rerun()
 
     # Vistas secundarias
     elif vista == "informe_general":
@@ -580,6 +624,8 @@ def mostrar_menu():
         consultar_informe_general()
     elif vista == "consultar_individual":
         consultar_informe_individual()
+    elif vista == "buscar":
+        vista_buscar_informes()
 
 
 # app.py - Bloque 6
@@ -610,14 +656,10 @@ def limpiar_formulario_individual():
     st.session_state["vista_actual"] = "menu"
 
 def comprobar_sobrescribir_general(fecha_iso):
-    c.execute("SELECT * FROM informes WHERE fecha=?", (fecha_iso,))
-    row = c.fetchone()
-    return row is not None
+    return ALMACEN.informe_general(fecha_iso) is not None
 
 def comprobar_sobrescribir_individual(fecha_iso, alumno):
-    c.execute("SELECT * FROM informes_alumnos WHERE fecha=? AND alumno=?", (fecha_iso, alumno))
-    row = c.fetchone()
-    return row is not None
+    return ALMACEN.informe_individual(fecha_iso, alumno) is not None
 
 # app.py – Bloque 7
 # -----------------------
@@ -660,21 +702,15 @@ def formulario_informe_general():
     if st.session_state["fecha_cargada"] != fecha_iso:
         st.session_state["fecha_cargada"] = fecha_iso
 
-        c.execute(
-            "SELECT cuidador, entradas_salidas, mantenimiento, temas_genericos, taxis "
-            "FROM informes WHERE fecha=?",
-            (fecha_iso,)
-        )
-        row = c.fetchone()
+        informe = ALMACEN.informe_general(fecha_iso)
 
-        if row:
-            cuidador, entradas, mantenimiento, temas, taxis_json = row
+        if informe:
             st.session_state["informe_general"] = {
-                "cuidador": cuidador or "",
-                "entradas": entradas or "",
-                "mantenimiento": mantenimiento or "",
-                "temas": temas or "",
-                "taxis": json.loads(taxis_json) if taxis_json else []
+                "cuidador": informe["cuidador"],
+                "entradas": informe["entradas"],
+                "mantenimiento": informe["mantenimiento"],
+                "temas": informe["temas"],
+                "taxis": informe["taxis"]
             }
             st.session_state["taxis_df"] = pd.DataFrame(
                 st.session_state["informe_general"]["taxis"],
@@ -829,15 +865,16 @@ def formulario_informe_general():
 
         taxis_records = st.session_state["taxis_df"].to_dict("records")
         info["taxis"] = taxis_records
-        taxis_json = json.dumps(taxis_records)
 
-        c.execute(
-            "INSERT OR REPLACE INTO informes "
-            "(fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos, taxis) "
-            "VALUES (?,?,?,?,?,?)",
-            (fecha_iso, info["cuidador"], info["entradas"], info["mantenimiento"], info["temas"], taxis_json)
-        )
-        conn.commit()
+        # Informe + taxis + índex de mencions en una sola transacció
+        ALMACEN.guardar("informe_general", {
+            "fecha_iso": fecha_iso,
+            "cuidador": info["cuidador"],
+            "entradas": info["entradas"],
+            "mantenimiento": info["mantenimiento"],
+            "temas": info["temas"],
+            "taxis": taxis_records,
+        })
 
         # OPCIONAL: debug para verificar exactamente qué hay en BD
         # c.execute(
@@ -848,8 +885,7 @@ def formulario_informe_general():
         # debug_row = c.fetchone()
         # st.caption(f"[DEBUG] BD després de desar: {debug_row}")
 
-        c.execute("SELECT alumno FROM informes_alumnos WHERE fecha=?", (fecha_iso,))
-        alumnos = [r[0] for r in c.fetchall()]
+        alumnos = ALMACEN.alumnos_con_informe(fecha_iso)
 
         pdf = generar_pdf_general(
             info["cuidador"], fecha_iso,
@@ -935,14 +971,10 @@ def formulario_informe_individual():
     tiene_informe = False
 
     if alumno:
-        c.execute(
-            "SELECT contenido FROM informes_alumnos WHERE fecha=? AND alumno=?",
-            (fecha_iso, alumno)
-        )
-        row = c.fetchone()
-        if row:
+        existente = ALMACEN.informe_individual(fecha_iso, alumno)
+        if existente is not None:
             tiene_informe = True
-            contenido_inicial = row[0] or ""
+            contenido_inicial = existente
 
     bloqueado = tiene_informe and not st.session_state["forzar_edicion_individual"]
 
@@ -971,11 +1003,12 @@ def formulario_informe_individual():
             return
 
         # Guardam exactament el que hi ha al widget ara mateix
-        c.execute(
-            "INSERT OR REPLACE INTO informes_alumnos (fecha, alumno, contenido) VALUES (?,?,?)",
-            (fecha_iso, alumno, contenido)
-        )
-        conn.commit()
+        ALMACEN.guardar("informe_individual", {
+            "fecha_iso": fecha_iso,
+            "alumno": alumno,
+            "alias": ALIAS_DEPORTISTAS.get(alumno, ""),
+            "contenido": contenido,
+        })
 
         # OPCIONAL: debug per comprovar què queda a la BD
         # c.execute(
@@ -1132,13 +1165,7 @@ def consultar_informe_individual():
     # 1) INFORMES INDIVIDUALS
     # -------------------------------------------------
     if tipo == "Informes individuals":
-        c.execute("""
-            SELECT fecha, contenido 
-            FROM informes_alumnos 
-            WHERE alumno=? 
-            ORDER BY fecha DESC
-        """, (alumno,))
-        registros = c.fetchall()
+        registros = ALMACEN.informes_individuales(alumno)
 
         if not registros:
             st.info("No hi ha informes individuals per aquest esportista.")
@@ -1160,32 +1187,11 @@ def consultar_informe_individual():
     # 2) MENCIONS EN INFORMES GENERALS
     # -------------------------------------------------
     else:
-        c.execute("""
-            SELECT fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos
-            FROM informes
-            ORDER BY fecha DESC
-        """)
-        registros = c.fetchall()
-
-        menciones = []
-
-        for fecha, cuidador, entradas, mantenimiento, temas in registros:
-            campos = {}
-
-            frags_e = extraer_menciones_de(alumno, entradas)
-            if frags_e:
-                campos["Informe del dia"] = "\n".join(frags_e)
-
-            frags_m = extraer_menciones_de(alumno, mantenimiento)
-            if frags_m:
-                campos["Notes per direcció, manteniment i neteja"] = "\n".join(frags_m)
-
-            frags_t = extraer_menciones_de(alumno, temas)
-            if frags_t:
-                campos["Pícnics pel dia següent"] = "\n".join(frags_t)
-
-            if campos:
-                menciones.append((fecha, cuidador, campos))
+        # Cerca a l'índex de mencions (omplert en desar cada informe general)
+        menciones = [
+            (fecha, cuidador, {camp: "\n".join(frags) for camp, frags in campos.items()})
+            for fecha, cuidador, campos in menciones_de_alumno(alumno)
+        ]
 
         if not menciones:
             st.info("No hi ha mencions d'aquest esportista als informes generals.")
@@ -1226,14 +1232,9 @@ def consultar_informe_general():
 
     st.markdown(f"**Data seleccionada:** {fecha_mostrar}")
 
-    c.execute("""
-        SELECT cuidador, entradas_salidas, mantenimiento, temas_genericos, taxis 
-        FROM informes 
-        WHERE fecha=?
-    """, (fecha_iso,))
-    row = c.fetchone()
+    informe = ALMACEN.informe_general(fecha_iso)
 
-    if not row:
+    if not informe:
         st.info(f"No hi ha informe general guardat per a {fecha_mostrar}.")
 
         if st.button("🏠 Tornar al menú", key="volver_menu_general_consulta_sense_informe"):
@@ -1242,7 +1243,9 @@ def consultar_informe_general():
 
         return
 
-    cuidador, entradas, mantenimiento, temas, taxis_json = row
+    cuidador, entradas, mantenimiento, temas = (
+        informe["cuidador"], informe["entradas"], informe["mantenimiento"], informe["temas"]
+    )
 
     st.markdown(
         f"""
@@ -1288,7 +1291,7 @@ def consultar_informe_general():
     )
 
     # Taxis
-    taxis_list = json.loads(taxis_json) if taxis_json else []
+    taxis_list = informe["taxis"]
     if taxis_list:
         st.markdown(
             """
@@ -1305,6 +1308,86 @@ def consultar_informe_general():
         st.rerun()
 
 
+# =====================================================
+#   CERCA DE TEXT ALS INFORMES (FTS5)
+# =====================================================
+
+def _consulta_fts(texto):
+    """
+    Converteix el que escriu l'usuari en una consulta FTS5 segura: totes les
+    paraules han d'aparèixer, com a prefix ("febre" troba també "febres").
+    """
+    paraules = re.findall(r"\w+", texto or "")
+    return " ".join(f'"{p}"*' for p in paraules)
+
+
+def buscar_en_informes(texto, desde_iso, hasta_iso, limite=200):
+    """
+    Informes generals i individuals del rang que contenen totes les paraules.
+    Retorna (generals, individuals):
+      generals:    [(fecha, cuidador, fragment)]
+      individuals: [(fecha, alumno, fragment)]
+    Els fragments marquen les coincidències amb **negreta**.
+    """
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return [], []
+
+    with GESTOR.conexion() as conn:
+        generales = conn.execute("""
+            SELECT i.fecha, i.cuidador, snippet(informes_fts, -1, '**', '**', '…', 16)
+            FROM informes_fts JOIN informes i ON i.rowid = informes_fts.rowid
+            WHERE informes_fts MATCH ? AND i.fecha BETWEEN ? AND ?
+            ORDER BY i.fecha DESC
+            LIMIT ?
+        """, (consulta, desde_iso, hasta_iso, limite)).fetchall()
+
+        individuales = conn.execute("""
+            SELECT a.fecha, a.alumno, snippet(informes_alumnos_fts, 0, '**', '**', '…', 16)
+            FROM informes_alumnos_fts JOIN informes_alumnos a ON a.rowid = informes_alumnos_fts.rowid
+            WHERE informes_alumnos_fts MATCH ? AND a.fecha BETWEEN ? AND ?
+            ORDER BY a.fecha DESC
+            LIMIT ?
+        """, (consulta, desde_iso, hasta_iso, limite)).fetchall()
+
+    return generales, individuales
+
+
+def vista_buscar_informes():
+    st.header("🔍 Cercar als informes")
+
+    texto = st.text_input("Paraules a cercar", placeholder="p. ex. febre, metge, aeroport…")
+    col1, col2 = st.columns(2)
+    with col1:
+        desde = st.date_input("Des de", value=date(date.today().year - 1, date.today().month, 1), key="cerca_desde")
+    with col2:
+        hasta = st.date_input("Fins a", value=date.today(), key="cerca_hasta")
+
+    if texto.strip():
+        generales, individuales = buscar_en_informes(texto, desde.isoformat(), hasta.isoformat())
+
+        if not generales and not individuales:
+            st.info("Cap informe del rang conté aquestes paraules.")
+
+        if generales:
+            st.subheader(f"🗓️ Informes generals ({len(generales)})")
+            for fecha, cuidador, fragmento in generales:
+                fecha_mostrar = datetime.strptime(fecha, "%Y-%m-%d").strftime("%d/%m/%Y")
+                st.markdown(f"**📅 {fecha_mostrar}** — 🧑‍💼 {cuidador or '—'}")
+                st.markdown(f"> {fragmento}")
+
+        if individuales:
+            st.subheader(f"👤 Informes individuals ({len(individuales)})")
+            for fecha, alumno, fragmento in individuales:
+                fecha_mostrar = datetime.strptime(fecha, "%Y-%m-%d").strftime("%d/%m/%Y")
+                st.markdown(f"**📅 {fecha_mostrar}** — {alumno}")
+                st.markdown(f"> {fragmento}")
+
+    if st.button("🏠 Tornar al menú", key="volver_menu_cerca"):
+        st.session_state["vista_actual"] = "menu"
+        st.rerun()
+
+
 # =====================================================
 #   HISTÒRIC INDIVIDUAL (AMB MENCIONS)
 # =====================================================
@@ -1336,43 +1419,14 @@ def generar_pdf_historico_individual(alumno, desde, hasta):
                                   fontSize=10, leading=14)
 
     # Informes individuals
-    c.execute("""
-        SELECT fecha, contenido 
-        FROM informes_alumnos 
-        WHERE alumno=? 
-          AND fecha BETWEEN ? AND ? 
-        ORDER BY fecha ASC
-    """, (alumno, desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")))
-    registros_ind = c.fetchall()
-
-    # Mencions generals
-    c.execute("""
-        SELECT fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos
-        FROM informes
-        WHERE fecha BETWEEN ? AND ?
-        ORDER BY fecha ASC
-    """, (desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")))
-    registros_gen = c.fetchall()
-
-    menciones = []
-
-    for fecha, cuidador, entradas, mantenimiento, temas in registros_gen:
-        campos = {}
-
-        frags_e = extraer_menciones_de(alumno, entradas)
-        if frags_e:
-            campos["Informe del dia"] = frags_e
-
-        frags_m = extraer_menciones_de(alumno, mantenimiento)
-        if frags_m:
-            campos["Notes per direcció, manteniment i neteja"] = frags_m
-
-        frags_t = extraer_menciones_de(alumno, temas)
-        if frags_t:
-            campos["Pícnics pel dia següent"] = frags_t
+    registros_ind = ALMACEN.informes_individuales(
+        alumno, desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d"), ascendente=True
+    )
 
-        if campos:
-            menciones.append((fecha, cuidador, campos))
+    # Mencions generals (índex de mencions)
+    menciones = menciones_de_alumno(
+        alumno, desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d"), ascendente=True
+    )
 
     if not registros_ind and not menciones:
         return None
@@ -1444,13 +1498,9 @@ def generar_pdf_historico_general(desde, hasta):
     estilo_titulo = ParagraphStyle(name="Titulo", fontName="Helvetica-Bold", fontSize=12, spaceAfter=4)
     estilo_texto = ParagraphStyle(name="Texto", fontName="Helvetica", fontSize=10, leading=14)
 
-    c.execute("""
-        SELECT fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos, taxis
-        FROM informes
-        WHERE fecha BETWEEN ? AND ?
-        ORDER BY fecha ASC
-    """, (desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")))
-    registros = c.fetchall()
+    registros = ALMACEN.informes_generales_rango(
+        desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d"), con_taxis=True
+    )
 
     if not registros:
         return None
@@ -1465,7 +1515,10 @@ def generar_pdf_historico_general(desde, hasta):
     ))
     elements.append(Spacer(1, 12))
 
-    for fecha, cuidador, entradas, mantenimiento, temas, taxis_json in registros:
+    for rec in registros:
+        fecha, cuidador, entradas, mantenimiento, temas = (
+            rec["fecha"], rec["cuidador"], rec["entradas"], rec["mantenimiento"], rec["temas"]
+        )
         fecha_mostrar = datetime.strptime(fecha, "%Y-%m-%d").strftime("%d/%m/%Y")
 
         elements.append(Paragraph(f"Informe del dia {fecha_mostrar}", estilo_fecha))
@@ -1481,7 +1534,7 @@ def generar_pdf_historico_general(desde, hasta):
         elements.append(Paragraph("<b>Pícnics pel dia següent:</b>", estilo_titulo))
         elements.append(Paragraph((temas or '—').replace("\n", "<br/>"), estilo_texto))
 
-        taxis_list = json.loads(taxis_json) if taxis_json else []
+        taxis_list = rec["taxis"]
         if taxis_list:
             data = [["Data", "Hora", "Recollida", "Destí", "Esportistes", "Observacions"]]
 
@@ -1516,56 +1569,28 @@ def generar_pdf_historico_general(desde, hasta):
 #   HISTÒRIC TAXIS (PDF + DataFrame)
 # =====================================================
 
-def _recopilar_taxis_en_rang(desde, hasta):
+def _recopilar_taxis_en_rang(desde, hasta, por_servicio=False):
     """
     Retorna una llista de files amb tots els taxis en el rang de dates.
     Cada fila és [data_informe, data_servei, hora, recollida, destí, esportistes, observacions]
+    El rang és de la data de l'informe, o de la data del servei amb por_servicio=True.
     """
-    c.execute("""
-        SELECT fecha, taxis
-        FROM informes
-        WHERE fecha BETWEEN ? AND ?
-        ORDER BY fecha ASC
-    """, (desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")))
-    registros = c.fetchall()
+    taxis = ALMACEN.taxis_rango(desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d"), por_servicio)
 
     filas = []
-
-    for fecha_informe, taxis_json in registros:
-        taxis_list = json.loads(taxis_json) if taxis_json else []
-        if not taxis_list:
-            continue
-
+    for fecha_informe, taxi in taxis:
         # Data de l'informe (YYYY-MM-DD -> dd/mm/aaaa)
         try:
-            fecha_inf_dt = datetime.strptime(fecha_informe, "%Y-%m-%d")
-            fecha_inf_str = fecha_inf_dt.strftime("%d/%m/%Y")
+            fecha_inf_str = datetime.strptime(fecha_informe, "%Y-%m-%d").strftime("%d/%m/%Y")
         except Exception:
             fecha_inf_str = fecha_informe
-
-        for t in taxis_list:
-            data_servei = t.get("Fecha", "") or ""
-            hora = t.get("Hora", "") or ""
-            recollida = t.get("Recogida", "") or ""
-            desti = t.get("Destino", "") or ""
-            esportistes = t.get("Deportistas", "") or ""
-            observacions = t.get("Observaciones", "") or ""
-
-            filas.append([
-                fecha_inf_str,
-                data_servei,
-                hora,
-                recollida,
-                desti,
-                esportistes,
-                observacions
-            ])
+        filas.append([fecha_inf_str] + [taxi[k] or "" for k in CAMPOS_TAXI])
 
     return filas
 
 
-def generar_pdf_historico_taxis(desde, hasta):
-    filas = _recopilar_taxis_en_rang(desde, hasta)
+def generar_pdf_historico_taxis(desde, hasta, por_servicio=False):
+    filas = _recopilar_taxis_en_rang(desde, hasta, por_servicio)
     if not filas:
         return None
 
@@ -1623,8 +1648,8 @@ def generar_pdf_historico_taxis(desde, hasta):
     return fname
 
 
-def obtener_historico_taxis_df(desde, hasta):
-    filas = _recopilar_taxis_en_rang(desde, hasta)
+def obtener_historico_taxis_df(desde, hasta, por_servicio=False):
+    filas = _recopilar_taxis_en_rang(desde, hasta, por_servicio)
     if not filas:
         return None
 
@@ -1679,6 +1704,9 @@ def main():
     elif vista == "consultar_individual":
         consultar_informe_individual()
 
+    elif vista == "buscar":
+        vista_buscar_informes()
+
     elif vista == "cambiar_contraseña":
         cambiar_contraseña()
 
@@ -1752,13 +1780,20 @@ def main():
         # HISTÓRICO TAXIS - PDF + EXCEL
         # ============================================================
         elif tipo == "Històric taxis":
+            criterio = st.radio(
+                "Rang de dates aplicat a",
+                ["Data de l'informe", "Data del servei"],
+                horizontal=True
+            )
+            por_servicio = criterio == "Data del servei"
+
             if st.button("🚕 Generar històric de taxis"):
 
                 # PDF
-                pdf = generar_pdf_historico_taxis(desde, hasta)
+                pdf = generar_pdf_historico_taxis(desde, hasta, por_servicio)
 
                 # Excel (DataFrame)
-                df_taxis = obtener_historico_taxis_df(desde, hasta)
+                df_taxis = obtener_historico_taxis_df(desde, hasta, por_servicio)
 
                 if not pdf and df_taxis is None:
                     st.info("No hi ha serveis de taxi en aquest rang.")
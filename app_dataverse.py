@@ -11,11 +11,11 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-import json
 import streamlit.components.v1 as components
 import hashlib
-import requests
 import traceback
+import time
+import uuid
 from reportlab.lib.units import cm
 
 # -----------------------
@@ -65,510 +65,218 @@ ALIAS_DEPORTISTAS: dict[str, str] = {}
 # =========================================================
 # app_dataverse.py - BLOQUE 2 (CLIENTE DATAVERSE) — CORREGIDO
 # =========================================================
+# El client viu a dataverse_client.py perquè Streamlit torna a executar aquest
+# script a cada rerun; un mòdul importat conserva l'estat (token OAuth...) entre
+# reruns i entre sessions del mateix procés.
+from dataverse_client import DataverseClient, ConflictoEscritura, dv_to_ddmmyyyy
+from dataverse_replica import ReplicaDataverse, REPLICA_INTERVALO
+from dataverse_cola import ColaEscrituras, clave_general, clave_individual
+from menciones import BuscadorMenciones, IndiceMenciones, CAMPOS_MENCIONES
+from almacen_informes import AlmacenEnCache, ALMACEN_CACHE_TTL
+from dataverse_almacen import AlmacenDataverse
 
 # -----------------------
 # Configuración Dataverse
 # -----------------------
 DV_CFG = st.secrets["dataverse"]
 
-TENANT_ID = DV_CFG["tenant_id"]
-CLIENT_ID = DV_CFG["client_id"]
-CLIENT_SECRET = DV_CFG["client_secret"]
-
-RESOURCE = DV_CFG["resource"]
-API_BASE = DV_CFG["api_base"]
-
 ENTITY_INFORMES = DV_CFG["informes_entity_set"]
 ENTITY_TAXIS = DV_CFG["taxis_entity_set"]
 ENTITY_INDIV = DV_CFG["informes_ind_entity_set"]
 ENTITY_USUARIOS = DV_CFG["usuarios_entity_set"]
 ENTITY_ALUMNOS = DV_CFG["alumnos_entity_set"]
 
-USU_LOGIN_FIELD = "cr143_nomusuariregistre"
-USU_NAME_FIELD  = "cr143_nomusuari"
 
-ALUMNOS_NAME_FIELD  = "cr143_nomcomplet"
-ALUMNOS_ALIAS_FIELD = "cr143_alias"
-
-import pandas as pd
+@st.cache_resource
+def _crear_cliente_dataverse() -> DataverseClient:
+    return DataverseClient(DV_CFG)
 
-def dv_to_iso_date(value: str) -> str:
-    """
-    Devuelve YYYY-MM-DD para usar en lógica (comparaciones, rangos, etc.).
-    Acepta:
-      - 2025-12-15
-      - 2025-12-15T00:00:00
-      - 2025-12-15T00:00:00Z
-      - 15/12/2025
-    """
-    if not value:
-        return ""
-    v = str(value).strip()
-    if not v:
-        return ""
 
-    # dd/mm/yyyy
-    if "/" in v and len(v.split("/")) == 3:
-        try:
-            return datetime.strptime(v, "%d/%m/%Y").strftime("%Y-%m-%d")
-        except Exception:
-            return ""
+# Instancia global del cliente Dataverse (una per procés, compartida entre sessions)
+DV = _crear_cliente_dataverse()
 
-    # ISO con Z
-    if v.endswith("Z"):
-        v = v[:-1] + "+00:00"
 
-    try:
-        return datetime.fromisoformat(v).date().strftime("%Y-%m-%d")
-    except Exception:
-        try:
-            return datetime.strptime(v[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
-        except Exception:
-            return ""
-
-
-def dv_to_ddmmyyyy(value: str) -> str:
-    """Devuelve dd/mm/yyyy para mostrar en UI/PDF."""
-    iso = dv_to_iso_date(value)
-    if not iso:
-        return ""
-    try:
-        return datetime.strptime(iso, "%Y-%m-%d").strftime("%d/%m/%Y")
-    except Exception:
-        return ""
+# -----------------------
+# Rèplica local (opcional, dataverse.replica_path a secrets)
+# -----------------------
+@st.cache_resource
+def _crear_replica() -> ReplicaDataverse | None:
+    path = DV_CFG.get("replica_path")
+    if not path:
+        return None
+    replica = ReplicaDataverse(
+        DV, path,
+        intervalo=float(DV_CFG.get("replica_intervalo") or REPLICA_INTERVALO),
+    )
+    replica.iniciar()
+    return replica
 
 
-class DataverseClient:
-    def __init__(self):
-        self._token: str | None = None
+REPLICA = _crear_replica()
 
-    def _get_token(self) -> str:
-        if self._token:
-            return self._token
 
-        url = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
-        data = {
-            "client_id": CLIENT_ID,
-            "client_secret": CLIENT_SECRET,
-            "scope": f"{RESOURCE}/.default",
-            "grant_type": "client_credentials",
-        }
+# -----------------------
+# Accés als informes (interfície comuna amb app.py)
+# Consultes d'històric i mencions a la rèplica si està llesta; lectures
+# guardades dataverse.almacen_cache_ttl segons (0 = sense caché).
+# -----------------------
+@st.cache_resource
+def _crear_almacen() -> AlmacenEnCache:
+    return AlmacenEnCache(
+        AlmacenDataverse(DV, REPLICA),
+        ttl=float(DV_CFG.get("almacen_cache_ttl", ALMACEN_CACHE_TTL)),
+    )
 
-        resp = requests.post(url, data=data)
-        if resp.status_code != 200:
-            raise RuntimeError(f"Error obtenint token OAuth: {resp.status_code} - {resp.text}")
 
-        self._token = resp.json()["access_token"]
-        return self._token
+ALMACEN = _crear_almacen()
 
-    def _headers(self) -> dict:
-        return {
-            "Authorization": f"Bearer {self._get_token()}",
-            "Content-Type": "application/json; charset=utf-8",
-            "Accept": "application/json",
-            "OData-MaxVersion": "4.0",
-            "OData-Version": "4.0",
-        }
 
-    # ----------------------------------------------
-    # Helpers HTTP
-    # ----------------------------------------------
-    def get(self, endpoint: str, params: dict | None = None):
-        r = requests.get(f"{API_BASE}/{endpoint}", headers=self._headers(), params=params)
-        if r.status_code not in (200, 204):
-            raise RuntimeError(f"GET {endpoint} → {r.status_code}: {r.text}")
-        if not r.text:
-            return None
-        return r.json()
-
-    def post(self, endpoint: str, payload: dict):
-        r = requests.post(f"{API_BASE}/{endpoint}", headers=self._headers(), data=json.dumps(payload))
-        if r.status_code not in (200, 201, 204):
-            raise RuntimeError(f"POST {endpoint} → {r.status_code}: {r.text}")
-        return r
-
-    def patch(self, endpoint: str, payload: dict):
-        r = requests.patch(f"{API_BASE}/{endpoint}", headers=self._headers(), data=json.dumps(payload))
-        if r.status_code not in (200, 204):
-            raise RuntimeError(f"PATCH {endpoint} → {r.status_code}: {r.text}")
-        return r
-
-    def delete(self, endpoint: str):
-        r = requests.delete(f"{API_BASE}/{endpoint}", headers=self._headers())
-        if r.status_code not in (200, 204):
-            raise RuntimeError(f"DELETE {endpoint} → {r.status_code}: {r.text}")
-        return r
-
-    # =========================================================
-    # 🔶 USUARIOS
-    # =========================================================
-    def _get_usuario_registro(self, usuario_login: str) -> dict | None:
-        usuario_esc = usuario_login.replace("'", "''")
-        filtro = f"{USU_LOGIN_FIELD} eq '{usuario_esc}'"
-        endpoint = f"{ENTITY_USUARIOS}?$filter={filtro}"
-        data = self.get(endpoint)
-        if not data or not data.get("value"):
-            return None
-        return data["value"][0]
-
-    def get_usuario_hash(self, usuario_login: str) -> str | None:
-        rec = self._get_usuario_registro(usuario_login)
-        if not rec:
-            return None
-        return rec.get("cr143_passwordhash")
-
-    def set_usuario_hash(self, usuario_login: str, password_hash: str):
-        usuario_esc = usuario_login.replace("'", "''")
-        filtro = f"{USU_LOGIN_FIELD} eq '{usuario_esc}'"
-        endpoint = f"{ENTITY_USUARIOS}?$filter={filtro}"
-        data = self.get(endpoint)
-
-        payload = {
-            USU_LOGIN_FIELD: usuario_login,
-            "cr143_passwordhash": password_hash,
-        }
+def avisar_replica():
+    """Després d'un desat: demana a la rèplica que apliqui els canvis ara."""
+    if REPLICA is not None:
+        REPLICA.solicitar_sincronizacion()
 
-        if data and data.get("value"):
-            rec_id = data["value"][0]["cr143_usuarisaplicacioid"]
-            self.patch(f"{ENTITY_USUARIOS}({rec_id})", payload)
-        else:
-            self.post(ENTITY_USUARIOS, payload)
-
-    def get_usuario_nombre_visible(self, usuario_login: str) -> str | None:
-        rec = self._get_usuario_registro(usuario_login)
-        if not rec:
-            return None
-        return (rec.get(USU_NAME_FIELD) or "").strip()
-
-    # =========================================================
-    # 🔶 INFORME GENERAL
-    # =========================================================
-    def get_informe_general(self, fecha_iso: str) -> dict | None:
-        fecha_esc = fecha_iso.replace("'", "''")
-        filtro = f"cr143_codigofecha eq '{fecha_esc}'"
-        endpoint = f"{ENTITY_INFORMES}?$filter={filtro}"
-        data = self.get(endpoint)
-        if not data or not data.get("value"):
-            return None
-
-        rec = data["value"][0]
-        return {
-            "id": rec.get("cr143_informegeneralid"),
-            "cuidador": rec.get("cr143_cuidador") or "",
-            "entradas": rec.get("cr143_informedeldia") or "",
-            "mantenimiento": rec.get("cr143_notesdireccio") or "",
-            "temas": rec.get("cr143_picnics") or "",
-        }
 
-    def upsert_informe_general(self, fecha_iso: str, cuidador: str, entradas: str, mantenimiento: str, temas: str) -> str | None:
-        existente = self.get_informe_general(fecha_iso)
-        fecha_date = datetime.strptime(fecha_iso, "%Y-%m-%d").date().isoformat()
-
-        payload = {
-            "cr143_fechainforme": fecha_date,
-            "cr143_codigofecha": fecha_iso,
-            "cr143_cuidador": cuidador or "",
-            "cr143_informedeldia": entradas or "",
-            "cr143_notesdireccio": mantenimiento or "",
-            "cr143_picnics": temas or "",
-        }
+# -----------------------
+# Índex de mencions local (dataverse.menciones_path = "" a secrets el desactiva)
+# S'omple quan Dataverse accepta cada informe general i es reconstrueix en segon pla la
+# primera vegada, quan canvien els àlies i cada MENCIONES_MAX_EDAD segons
+# (recull els canvis fets des d'altres instàncies de l'app).
+# -----------------------
+MENCIONES_MAX_EDAD = 6 * 3600
 
-        if existente and existente.get("id"):
-            rec_id = existente["id"]
-            self.patch(f"{ENTITY_INFORMES}({rec_id})", payload)
-            return rec_id
 
-        r = self.post(ENTITY_INFORMES, payload)
-        location = r.headers.get("OData-EntityId") or r.headers.get("Location")
-        if location and "(" in location and ")" in location:
-            return location.split("(")[1].split(")")[0]
+@st.cache_resource
+def _crear_indice_menciones() -> IndiceMenciones | None:
+    path = DV_CFG.get("menciones_path", "dataverse_menciones.db")
+    if not path:
         return None
+    return IndiceMenciones(path)
 
-    # =========================================================
-    # 🔶 TAXIS
-    # =========================================================
-    def get_taxis_by_informe(self, informe_id: str) -> list[dict]:
-        if not informe_id:
-            return []
-
-        filtro = f"_cr143_informegeneral_value eq {informe_id}"
-        endpoint = f"{ENTITY_TAXIS}?$filter={filtro}"
-        data = self.get(endpoint)
-        rows = data.get("value", []) if data else []
-
-        taxis: list[dict] = []
-        for rec in rows:
-            # UI/PDF quiere dd/mm/yyyy
-            fecha_txt = dv_to_ddmmyyyy(rec.get("cr143_fecha"))
-            taxis.append({
-                "Fecha": fecha_txt,
-                "Hora": rec.get("cr143_hora") or "",
-                "Recogida": rec.get("cr143_recollida") or "",
-                "Destino": rec.get("cr143_desti") or "",
-                "Deportistas": rec.get("cr143_esportistes") or "",
-                "Observaciones": rec.get("cr143_observacions") or "",
-            })
-        return taxis
 
-    def replace_taxis_for_informe(self, informe_id: str, fecha_iso: str, taxis_list: list[dict]):
-        if not informe_id:
-            return
+INDICE_MENCIONES = _crear_indice_menciones()
 
-        def _to_text(v) -> str:
-            if v is None:
-                return ""
-            try:
-                if isinstance(v, float) and pd.isna(v):
-                    return ""
-            except Exception:
-                pass
-            if isinstance(v, (list, tuple, set)):
-                return "\n".join([str(x) for x in v if x is not None])
-            return str(v)
-
-        filtro = f"_cr143_informegeneral_value eq {informe_id}"
-        endpoint = f"{ENTITY_TAXIS}?$filter={filtro}"
-        data = self.get(endpoint)
-        rows = data.get("value", []) if data else []
-
-        for rec in rows:
-            taxi_id = rec["cr143_taxiid"]
-            self.delete(f"{ENTITY_TAXIS}({taxi_id})")
 
-        for t in taxis_list:
-            fecha_txt = _to_text(t.get("Fecha") or fecha_iso).strip()
+@st.cache_resource
+def _crear_buscador_actual() -> dict:
+    # Darrer buscador calculat al fil de l'script: el fil de la cua el llegeix
+    # d'aquí (no pot cridar la caché de Streamlit)
+    return {"buscador": None}
 
-            # aceptar YYYY-MM-DD o dd/mm/yyyy
-            fecha_iso_real = ""
-            for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
-                try:
-                    fecha_iso_real = datetime.strptime(fecha_txt, fmt).date().isoformat()
-                    break
-                except Exception:
-                    pass
-            if not fecha_iso_real:
-                fecha_iso_real = datetime.strptime(fecha_iso, "%Y-%m-%d").date().isoformat()
-
-            payload = {
-                "cr143_fecha": fecha_iso_real,
-                "cr143_hora": _to_text(t.get("Hora", "")).strip(),
-                "cr143_recollida": _to_text(t.get("Recogida", "")).strip(),
-                "cr143_desti": _to_text(t.get("Destino", "")).strip(),
-                "cr143_esportistes": _to_text(t.get("Deportistas", "")).strip(),
-                "cr143_observacions": _to_text(t.get("Observaciones", "")).strip(),
-                "cr143_Informegeneral@odata.bind": f"/{ENTITY_INFORMES}({informe_id})",
-            }
-            self.post(ENTITY_TAXIS, payload)
-
-    # =========================================================
-    # 🔶 INFORMES INDIVIDUALS
-    # =========================================================
-    def get_informe_individual(self, fecha_iso: str, alumno: str) -> dict | None:
-        fecha_esc = fecha_iso.replace("'", "''")
-        alumno_esc = alumno.replace("'", "''")
-        filtro = f"cr143_codigofecha eq '{fecha_esc}' and cr143_alumne eq '{alumno_esc}'"
-        endpoint = f"{ENTITY_INDIV}?$filter={filtro}"
-        data = self.get(endpoint)
-        if not data or not data.get("value"):
-            return None
-
-        rec = data["value"][0]
-        return {
-            "id": rec.get("cr143_informeindividualsid"),
-            "contenido": rec.get("cr143_congingut") or "",
-        }
 
-    def upsert_informe_individual(self, fecha_iso: str, alumno: str, alias: str, contenido: str) -> str | None:
-        existente = self.get_informe_individual(fecha_iso, alumno)
-        fecha_date = datetime.strptime(fecha_iso, "%Y-%m-%d").date().isoformat()
+BUSCADOR_ACTUAL = _crear_buscador_actual()
 
-        payload = {
-            "cr143_fechainforme": fecha_date,
-            "cr143_codigofecha": fecha_iso,
-            "cr143_alumne": alumno,
-            "cr143_alias": alias or "",
-            "cr143_congingut": contenido or "",
-        }
 
-        if existente and existente.get("id"):
-            rec_id = existente["id"]
-            self.patch(f"{ENTITY_INDIV}({rec_id})", payload)
-            return rec_id
+@st.cache_resource(max_entries=2)
+def _buscador_menciones(alias_items: tuple[tuple[str, str], ...]) -> BuscadorMenciones:
+    return BuscadorMenciones.desde_alias([a for a, _ in alias_items], dict(alias_items))
 
-        r = self.post(ENTITY_INDIV, payload)
-        location = r.headers.get("OData-EntityId") or r.headers.get("Location")
-        if location and "(" in location and ")" in location:
-            return location.split("(")[1].split(")")[0]
+
+def buscador_menciones() -> BuscadorMenciones | None:
+    """Buscador per als esportistes carregats (None si encara no n'hi ha)."""
+    if not ALIAS_DEPORTISTAS:
         return None
+    buscador = _buscador_menciones(tuple(sorted(ALIAS_DEPORTISTAS.items())))
+    BUSCADOR_ACTUAL["buscador"] = buscador
+    return buscador
 
-    def get_informes_individuales_por_alumno(self, alumno: str) -> list[tuple[str, str]]:
-        """
-        Devuelve (fecha_iso_YYYY_MM_DD, contenido)
-        """
-        alumno_esc = alumno.replace("'", "''")
-        filtro = f"cr143_alumne eq '{alumno_esc}'"
-        endpoint = f"{ENTITY_INDIV}?$filter={filtro}&$orderby=cr143_fechainforme desc"
-        data = self.get(endpoint)
-
-        rows = data.get("value", []) if data else []
-        res: list[tuple[str, str]] = []
-
-        for rec in rows:
-            fecha_iso = dv_to_iso_date(rec.get("cr143_fechainforme"))
-            contenido = rec.get("cr143_congingut") or ""
-            if fecha_iso:
-                res.append((fecha_iso, contenido))
-
-        return res
-
-    # =========================================================
-    # 🔶 ALUMNOS (Esportistes)
-    # =========================================================
-    def get_alumnos(self) -> list[dict]:
-        data = self.get(ENTITY_ALUMNOS)
-        if not data or "value" not in data:
-            return []
-
-        rows = data["value"] or []
-        res: list[dict] = []
-
-        for rec in rows:
-            nombre = (rec.get(ALUMNOS_NAME_FIELD) or "").strip()
-            if not nombre:
-                continue
-
-            alias = ""
-            if ALUMNOS_ALIAS_FIELD:
-                alias = (rec.get(ALUMNOS_ALIAS_FIELD) or "").strip()
-
-            res.append({"nombre": nombre, "alias": alias})
-
-        return res
-
-    # =========================================================
-    # 🔶 HELPERS EXTRA
-    # =========================================================
-    def get_alumnos_con_informe_en_fecha(self, fecha_iso: str) -> list[str]:
-        fecha_esc = fecha_iso.replace("'", "''")
-        filtro = f"cr143_codigofecha eq '{fecha_esc}'"
-        endpoint = f"{ENTITY_INDIV}?$filter={filtro}&$select=cr143_alumne"
-        data = self.get(endpoint)
-
-        alumnes: list[str] = []
-        rows = data.get("value", []) if data else []
-        for rec in rows:
-            nom = (rec.get("cr143_alumne") or "").strip()
-            if nom and nom not in alumnes:
-                alumnes.append(nom)
-        return alumnes
-
-    def get_informes_generales_rango(self, desde_iso: str, hasta_iso: str) -> list[dict]:
-        """
-        Devuelve 'fecha' en ISO (YYYY-MM-DD) para que el bloque 9 pueda parsear y comparar bien.
-        """
-        desde_esc = desde_iso.replace("'", "''")
-        hasta_esc = hasta_iso.replace("'", "''")
-
-        filtro = f"cr143_codigofecha ge '{desde_esc}' and cr143_codigofecha le '{hasta_esc}'"
-        select = ",".join([
-            "cr143_informegeneralid",
-            "cr143_codigofecha",
-            "cr143_cuidador",
-            "cr143_informedeldia",
-            "cr143_notesdireccio",
-            "cr143_picnics",
-        ])
 
-        endpoint = (
-            f"{ENTITY_INFORMES}"
-            f"?$filter={filtro}"
-            f"&$orderby=cr143_codigofecha asc"
-            f"&$select={select}"
+def indice_menciones_listo() -> bool:
+    """
+    True si les consultes de mencions poden anar a l'índex local. Si està
+    desfasat, en llança la reconstrucció (mentrestant es busca a Dataverse).
+    """
+    buscador = buscador_menciones()
+    if INDICE_MENCIONES is None or buscador is None:
+        return False
+    vigente = INDICE_MENCIONES.vigente(buscador)
+    if not vigente or time.time() - INDICE_MENCIONES.reconstruido_en() > MENCIONES_MAX_EDAD:
+        INDICE_MENCIONES.reconstruir_en_segundo_plano(
+            buscador, lambda: ALMACEN.iter_informes_generales_todos()
         )
+    return vigente
 
-        data = self.get(endpoint)
-        rows = data.get("value", []) if data else []
-
-        res: list[dict] = []
-        for rec in rows:
-            fecha_iso = (rec.get("cr143_codigofecha") or "").strip()
-            res.append({
-                "id": rec.get("cr143_informegeneralid"),
-                "fecha": fecha_iso,  # ISO
-                "cuidador": rec.get("cr143_cuidador") or "",
-                "entradas": rec.get("cr143_informedeldia") or "",
-                "mantenimiento": rec.get("cr143_notesdireccio") or "",
-                "temas": rec.get("cr143_picnics") or "",
-            })
-        return res
-
-    def get_informes_generales_todos(self) -> list[dict]:
-        """
-        Devuelve 'fecha' en ISO (YYYY-MM-DD).
-        """
-        select = ",".join([
-            "cr143_informegeneralid",
-            "cr143_codigofecha",
-            "cr143_cuidador",
-            "cr143_informedeldia",
-            "cr143_notesdireccio",
-            "cr143_picnics",
-        ])
-        endpoint = (
-            f"{ENTITY_INFORMES}"
-            f"?$orderby=cr143_codigofecha desc"
-            f"&$select={select}"
-        )
 
-        data = self.get(endpoint)
-        rows = data.get("value", []) if data else []
-
-        res: list[dict] = []
-        for rec in rows:
-            fecha_iso = (rec.get("cr143_codigofecha") or "").strip()
-            res.append({
-                "id": rec.get("cr143_informegeneralid"),
-                "fecha": fecha_iso,  # ISO
-                "cuidador": rec.get("cr143_cuidador") or "",
-                "entradas": rec.get("cr143_informedeldia") or "",
-                "mantenimiento": rec.get("cr143_notesdireccio") or "",
-                "temas": rec.get("cr143_picnics") or "",
-            })
-        return res
+def indexar_menciones_general(datos: dict, buscador: BuscadorMenciones | None):
+    """Actualitza l'índex amb l'informe general que s'acaba de desar a Dataverse."""
+    if INDICE_MENCIONES is None or buscador is None or not INDICE_MENCIONES.vigente(buscador):
+        return
+    INDICE_MENCIONES.indexar_informe(
+        buscador, datos["fecha_iso"], datos["cuidador"],
+        {"entradas": datos["entradas"], "mantenimiento": datos["mantenimiento"], "temas": datos["temas"]},
+    )
+
+
+def _al_desar_cola(tipo: str, datos: dict):
+    """Fil de la cua: Dataverse ha acceptat l'entrada."""
+    ALMACEN.invalidar(tipo, datos)
+    if tipo == "informe_general":
+        indexar_menciones_general(datos, BUSCADOR_ACTUAL["buscador"])
 
 
-# Instancia global del cliente Dataverse
-DV = DataverseClient()
+# -----------------------
+# Cua d'escriptures (desat local immediat, enviament a Dataverse en segon pla)
+# dataverse.outbox_path = "" a secrets la desactiva i es torna al desat directe
+# -----------------------
+@st.cache_resource
+def _crear_cola() -> ColaEscrituras | None:
+    path = DV_CFG.get("outbox_path", "dataverse_outbox.db")
+    if not path:
+        return None
+    cola = ColaEscrituras(DV, path, al_aplicar=avisar_replica, al_desar=_al_desar_cola)
+    cola.iniciar()
+    return cola
+
+
+COLA = _crear_cola()
+
+
+def desar_a_dataverse(tipo: str, clave_orden: str, datos: dict) -> dict | None:
+    """
+    Encola l'operació (retorna tot d'una, None) o, sense cua, l'aplica
+    directament i retorna {"id", "etag"} del registre desat. L'índex de
+    mencions s'actualitza quan Dataverse accepta el desat.
+    Les excepcions del desat directe (ConflictoEscritura inclosa) arriben al
+    formulari com abans.
+    """
+    if COLA is not None:
+        COLA.encolar(tipo, clave_orden, datos, escritor=st.session_state.get("escritor_cola"))
+        # Les lectures guardades d'aquest informe ja no reflecteixen el que veurà Dataverse
+        ALMACEN.invalidar(tipo, datos)
+        desat = None
+    else:
+        desat = ALMACEN.guardar(tipo, datos)
+        if tipo == "informe_general":
+            indexar_menciones_general(datos, buscador_menciones())
+    return desat
 
 
 # =========================================================
 # Càrrega d'esportistes (ALUMNOS + ALIAS_DEPORTISTAS)
 # =========================================================
-def cargar_alumnos_desde_dataverse():
+def cargar_alumnos_desde_dataverse(forzar: bool = False):
+    """
+    Omple ALUMNOS i ALIAS_DEPORTISTAS des de la llista compartida del client
+    (DV.roster): normalment no fa cap crida, només quan ha passat el TTL o
+    amb forzar=True (botó "Actualitzar esportistes").
+    """
     global ALUMNOS, ALIAS_DEPORTISTAS
 
     try:
-        rows = DV.get_alumnos()
+        version, roster = DV.roster.obtener(forzar=forzar)
     except Exception as e:
         st.error(f"Error carregant esportistes des de Dataverse: {e}")
         ALUMNOS = []
         ALIAS_DEPORTISTAS = {}
         return
 
-    alumnos = []
     alias_map = {}
-
-    for r in rows or []:
-        nombre = (r.get("nombre") or "").strip()
-        if not nombre:
-            continue
-
-        alias = (r.get("alias") or "").strip()
-        alumnos.append(nombre)
+    for nombre, alias in roster.items():
         alias_map[nombre] = alias if alias else generar_alias(nombre)
 
-    ALUMNOS = sorted(set(alumnos), key=lambda x: x.lower())
+    ALUMNOS = sorted(alias_map, key=lambda x: x.lower())
     ALIAS_DEPORTISTAS = alias_map
+    st.session_state["roster_version"] = version
 
 
 def dv_get_alumnos():
@@ -583,6 +291,10 @@ def dv_get_alumnos():
 if "vista_actual" not in st.session_state:
     st.session_state["vista_actual"] = "menu"
 
+# Identifica els desats d'aquesta sessió a la cua (traducció d'etags entre desats)
+if "escritor_cola" not in st.session_state:
+    st.session_state["escritor_cola"] = uuid.uuid4().hex
+
 if "form_general" not in st.session_state:
     st.session_state["form_general"] = {
         "fecha": "",
@@ -962,6 +674,7 @@ def limpiar_formulario_general():
     st.session_state["bloqueado"] = False
     st.session_state["confirmar_salir_general"] = False
     st.session_state["informe_general_id"] = None
+    st.session_state["informe_general_etag"] = None
 
     # Tornar al menú
     st.session_state["vista_actual"] = "menu"
@@ -1024,6 +737,110 @@ def comprobar_sobrescribir_individual(fecha_iso: str, alumno: str) -> bool:
 
     return informe is not None
 
+def mostrar_estado_cola():
+    """Indicador a la barra lateral dels desats pendents d'arribar a Dataverse."""
+    if COLA is None:
+        return
+    estado = COLA.estado()
+    if estado["conflictes"]:
+        st.sidebar.error(f"⚖️ {estado['conflictes']} desat(s) en conflicte amb canvis d'un altre usuari.")
+        if st.sidebar.button("⚖️ Resoldre conflictes"):
+            st.session_state["vista_actual"] = "conflictes"
+            st.rerun()
+    if estado["errors"]:
+        st.sidebar.error(f"⚠️ {estado['errors']} desat(s) no s'han pogut enviar a Dataverse.")
+        if estado["ultim_error"]:
+            st.sidebar.caption(estado["ultim_error"][:300])
+        if st.sidebar.button("🔁 Reintentar enviaments"):
+            COLA.reintentar_errores()
+            st.rerun()
+    elif estado["pendents"]:
+        st.sidebar.warning(f"⏳ {estado['pendents']} desat(s) pendents d'enviar a Dataverse.")
+        if estado["ultim_error"]:
+            st.sidebar.caption(f"Darrer error: {estado['ultim_error'][:300]}")
+    else:
+        st.sidebar.caption("☁️ Tot desat a Dataverse.")
+
+
+CAMPOS_CONFLICTO_GENERAL = [
+    ("cuidador", "Cuidador"),
+    ("entradas", "Entrades / sortides"),
+    ("mantenimiento", "Manteniment / incidències"),
+    ("temas", "Pícnics pel dia següent"),
+]
+
+
+def _mostrar_version_conflicto(titol: str, clave: str, tipo: str, datos: dict | None, taxis: list[dict] | None):
+    st.markdown(f"**{titol}**")
+    if datos is None:
+        st.info("No existeix (esborrat).")
+        return
+    if tipo == "informe_general":
+        for campo, etiqueta in CAMPOS_CONFLICTO_GENERAL:
+            st.text_area(etiqueta, value=datos.get(campo, ""), disabled=True, key=f"{clave}_{campo}")
+        df = _ensure_taxis_df_schema(pd.DataFrame(taxis or [])).drop(columns=["Id"])
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.text_area("Contingut de l'informe", value=datos.get("contenido", ""), disabled=True, key=f"{clave}_contenido")
+
+
+def vista_conflictos():
+    """
+    Desats de la cua aturats per un 412: algú ha modificat l'informe a Dataverse
+    després que l'usuari el carregàs. Es mostren les dues versions i es tria.
+    """
+    st.header("⚖️ Conflictes de desat")
+    st.caption(
+        "Aquests desats no s'han enviat perquè un altre usuari havia modificat l'informe "
+        "a Dataverse mentrestant. Tria quina versió s'ha de quedar."
+    )
+
+    conflictos = COLA.conflictos() if COLA is not None else []
+    if not conflictos:
+        st.info("No hi ha conflictes pendents.")
+
+    for c in conflictos:
+        datos = c["datos"]
+        fecha_txt = dv_to_ddmmyyyy(datos.get("fecha_iso"))
+        try:
+            if c["tipo"] == "informe_general":
+                st.subheader(f"Informe general – {fecha_txt}")
+                actual = (
+                    DV.get_informe_general_por_id(datos["id"]) if datos.get("id")
+                    else DV.get_informe_general(datos["fecha_iso"])
+                )
+                taxis_actuals = DV.get_taxis_by_informe(actual["id"]) if actual else None
+            else:
+                st.subheader(f"Informe individual – {datos.get('alumno', '')} – {fecha_txt}")
+                actual = DV.get_informe_individual(datos["fecha_iso"], datos["alumno"])
+                taxis_actuals = None
+        except Exception as e:
+            st.error(f"Error llegint la versió actual de Dataverse: {e}")
+            continue
+
+        local = None if c["tipo"] == "borrar_individual" else datos
+        col1, col2 = st.columns(2)
+        with col1:
+            _mostrar_version_conflicto("La teva versió (no desada)", f"conf_{c['id']}_local", c["tipo"], local, datos.get("taxis"))
+        with col2:
+            _mostrar_version_conflicto("Versió actual a Dataverse", f"conf_{c['id']}_dv", c["tipo"], actual, taxis_actuals)
+
+        b1, b2 = st.columns(2)
+        with b1:
+            if st.button("💾 Desar la meva versió", key=f"conf_{c['id']}_mantenir"):
+                COLA.resolver_conflicto(c["id"], True, (actual or {}).get("id"), (actual or {}).get("etag"))
+                st.rerun()
+        with b2:
+            if st.button("↩️ Quedar-me la de Dataverse", key=f"conf_{c['id']}_descartar"):
+                COLA.resolver_conflicto(c["id"], False)
+                st.rerun()
+        st.divider()
+
+    if st.button("🏠 Tornar al menú", key="volver_menu_conflictes"):
+        st.session_state["vista_actual"] = "menu"
+        st.rerun()
+
+
 # app_dataverse.py – Bloque 7
 # -----------------------
 # Formulari Informe General (Dataverse)
@@ -1047,8 +864,9 @@ def _ensure_taxis_df_schema(df: pd.DataFrame) -> pd.DataFrame:
     Evita l'error:
       streamlit.data_editor._check_type_compatibilities(...)
     Força columnes i tipus 'object' (text) per a totes les columnes configurades com TextColumn.
+    La columna "Id" (cr143_taxiid, oculta a l'editor) identifica les files ja desades.
     """
-    cols = ["Fecha", "Hora", "Recogida", "Destino", "Deportistas", "Observaciones"]
+    cols = ["Fecha", "Hora", "Recogida", "Destino", "Deportistas", "Observaciones", "Id"]
 
     if df is None or not isinstance(df, pd.DataFrame):
         df = pd.DataFrame(columns=cols)
@@ -1173,17 +991,33 @@ def formulario_informe_general():
             st.error(f"Error llegint informe general des de Dataverse: {e}")
             informe = None
 
+        # Un desat encara a la cua mana sobre el que hi ha a Dataverse
+        # (amb el seu id/etag: els desats següents continuen la mateixa edició)
+        pendiente = COLA.pendiente(clave_general(fecha_iso)) if COLA is not None else None
+        taxis_pendientes = None
+        if pendiente:
+            _, datos = pendiente
+            informe = {
+                **(informe or {}),
+                **{k: datos.get(k) for k in ("id", "etag", "cuidador", "entradas", "mantenimiento", "temas")},
+            }
+            taxis_pendientes = datos.get("taxis") or []
+
         if informe:
             info["cuidador"] = informe.get("cuidador", "")
             info["entradas"] = informe.get("entradas", "")
             info["mantenimiento"] = informe.get("mantenimiento", "")
             info["temas"] = informe.get("temas", "")
             st.session_state["informe_general_id"] = informe.get("id")
+            st.session_state["informe_general_etag"] = informe.get("etag")
 
-            try:
-                taxis = DV.get_taxis_por_fecha(fecha_iso)
-            except Exception:
-                taxis = []
+            if taxis_pendientes is not None:
+                taxis = taxis_pendientes
+            else:
+                try:
+                    taxis = DV.get_taxis_by_informe(informe.get("id"), con_id=True)
+                except Exception:
+                    taxis = []
 
             st.session_state["taxis_df"] = _ensure_taxis_df_schema(pd.DataFrame(taxis))
             st.session_state["bloqueado"] = True
@@ -1196,6 +1030,7 @@ def formulario_informe_general():
             info["temas"] = ""
             st.session_state["taxis_df"] = _ensure_taxis_df_schema(pd.DataFrame([]))
             st.session_state["informe_general_id"] = None
+            st.session_state["informe_general_etag"] = None
             st.session_state["bloqueado"] = False
 
 
@@ -1206,7 +1041,7 @@ def formulario_informe_general():
     # -----------------------
     # CONTROL BLOQUEIG
     # -----------------------
-    if st.session_state.get("informe_general_id") and st.session_state["bloqueado"]:
+    if st.session_state["bloqueado"]:
         st.info("🔒 Aquest informe ja existeix i està bloquejat.")
         if st.button("✏️ Editar informe"):
             st.session_state["bloqueado"] = False
@@ -1252,6 +1087,7 @@ def formulario_informe_general():
                 hide_index=True,
                 use_container_width=True,
                 disabled=disabled,
+                column_config={"Id": None},
                 key="taxis_editor"
             )
             st.session_state["taxis_df"] = _ensure_taxis_df_schema(taxis_df)
@@ -1365,17 +1201,28 @@ def formulario_informe_general():
         taxis_records = st.session_state["taxis_df"].to_dict("records")
 
         try:
-            informe_id = DV.upsert_informe_general(
-                fecha_iso,
-                info["cuidador"],
-                info["entradas"],
-                info["mantenimiento"],
-                info["temas"],
+            desat = desar_a_dataverse("informe_general", clave_general(fecha_iso), {
+                "id": st.session_state.get("informe_general_id"),
+                "etag": st.session_state.get("informe_general_etag"),
+                "fecha_iso": fecha_iso,
+                "cuidador": info["cuidador"],
+                "entradas": info["entradas"],
+                "mantenimiento": info["mantenimiento"],
+                "temas": info["temas"],
+                "taxis": _ensure_taxis_df_schema(pd.DataFrame(taxis_records)).to_dict("records"),
+            })
+        except ConflictoEscritura:
+            st.error(
+                "⚠️ Un altre usuari ha modificat aquest informe mentre l'editaves. "
+                "Copia els teus canvis, torna a carregar la data i revisa'ls."
             )
-            DV.replace_taxis_for_informe(informe_id, fecha_iso, taxis_records)
+            return
         except Exception as e:
             st.error(f"Error desant l'informe: {e}")
             return
+        if desat:
+            st.session_state["informe_general_id"] = desat["id"]
+            st.session_state["informe_general_etag"] = desat.get("etag")
 
         if submitted_enviar:
             pdf = generar_pdf_general(
@@ -1437,7 +1284,7 @@ def formulario_informe_individual():
     # Asseguram l'accés a les globals
     global ALUMNOS, ALIAS_DEPORTISTAS
 
-    # Carregar sempre els alumnes des de Dataverse (per si l'estat s'ha perdut)
+    # Carregar sempre els alumnes (per si l'estat s'ha perdut); ve de la llista compartida
     try:
         cargar_alumnos_desde_dataverse()
     except Exception as e:
@@ -1493,6 +1340,7 @@ def formulario_informe_individual():
     # ----------------------------------------------------
     contenido_inicial = ""
     tiene_informe = False
+    rec_id = None
 
     try:
         rec = DV.get_informe_individual(fecha_iso, alumno)
@@ -1500,9 +1348,22 @@ def formulario_informe_individual():
         st.error(f"Error llegint informe individual des de Dataverse: {e}")
         rec = None
 
+    # Un desat encara a la cua mana sobre el que hi ha a Dataverse
+    pendiente = COLA.pendiente(clave_individual(fecha_iso, alumno)) if COLA is not None else None
+    if pendiente:
+        tipo_pend, datos_pend = pendiente
+        rec = None if tipo_pend == "borrar_individual" else {
+            "id": datos_pend.get("id"),
+            "etag": datos_pend.get("etag"),
+            "contenido": datos_pend.get("contenido", ""),
+        }
+
+    rec_etag = None
     if rec:
         tiene_informe = True
         contenido_inicial = rec.get("contenido", "") or ""
+        rec_id = rec.get("id")
+        rec_etag = rec.get("etag")
 
     bloqueado = tiene_informe and not st.session_state["forzar_edicion_individual"]
 
@@ -1538,18 +1399,15 @@ def formulario_informe_individual():
         # 🔥 Si el contingut està buit → eliminar informe si existeix
         if contenido_norm == "":
             try:
-                rec_exist = DV.get_informe_individual(fecha_iso, alumno)
+                desar_a_dataverse("borrar_individual", clave_individual(fecha_iso, alumno), {
+                    "etag": rec_etag,
+                    "fecha_iso": fecha_iso,
+                    "alumno": alumno,
+                })
             except Exception as e:
-                st.error(f"Error comprovant l'informe individual a Dataverse: {e}")
+                st.error(f"Error eliminant l'informe individual a Dataverse: {e}")
                 return
 
-            if rec_exist and rec_exist.get("id"):
-                try:
-                    DV.delete(f"{ENTITY_INDIV}({rec_exist['id']})")
-                except Exception as e:
-                    st.error(f"Error eliminant l'informe individual a Dataverse: {e}")
-                    return
-
             st.success(f"🗑️ Informe individual eliminat per al dia {fecha_mostrar}.")
             st.session_state["forzar_edicion_individual"] = False
             st.session_state["confirmar_salir_individual"] = False
@@ -1559,12 +1417,14 @@ def formulario_informe_individual():
 
         # ✅ Si hi ha contingut → crear/actualitzar normalment
         try:
-            DV.upsert_informe_individual(
-                fecha_iso=fecha_iso,
-                alumno=alumno,
-                alias=alias,
-                contenido=contenido_norm,
-            )
+            desar_a_dataverse("informe_individual", clave_individual(fecha_iso, alumno), {
+                "id": rec_id,
+                "etag": rec_etag,
+                "fecha_iso": fecha_iso,
+                "alumno": alumno,
+                "alias": alias,
+                "contenido": contenido_norm,
+            })
         except Exception as e:
             st.error(f"Error desant l'informe individual a Dataverse: {e}")
             return
@@ -1777,51 +1637,6 @@ from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.units import cm
 
 
-def _recopilar_taxis_en_rang(desde, hasta):
-    """
-    Retorna una llista de files amb tots els taxis en el rang de dates (Dataverse).
-    Cada fila és: [data_informe, data_servei, hora, recollida, destí, esportistes, observacions]
-    """
-    desde_iso = desde.strftime("%Y-%m-%d")
-    hasta_iso = hasta.strftime("%Y-%m-%d")
-
-    try:
-        informes = DV.get_informes_generales_rango(desde_iso, hasta_iso)
-    except Exception as e:
-        st.error(f"Error llegint informes generals per a taxis de Dataverse: {e}")
-        informes = []
-
-    filas = []
-
-    for rec in informes:
-        fecha_informe = rec.get("fecha") or ""   # ojo: en tu DV ya lo devuelves en dd/mm/yyyy
-        informe_id = rec.get("id")
-
-        try:
-            taxis_list = DV.get_taxis_by_informe(informe_id) if informe_id else []
-        except Exception as e:
-            st.error(f"Error llegint taxis de Dataverse: {e}")
-            taxis_list = []
-
-        # Fecha informe ya viene en dd/mm/yyyy si usas dv_date en DV.get_informes_generales_rango()
-        fecha_inf_str = fecha_informe or ""
-
-        for t in taxis_list:
-            fecha_servicio_str = t.get("Fecha", "") or ""  # ya viene dd/mm/yyyy por dv_date
-
-            filas.append([
-                fecha_inf_str,
-                fecha_servicio_str,
-                t.get("Hora", "") or "",
-                t.get("Recogida", "") or "",
-                t.get("Destino", "") or "",
-                t.get("Deportistas", "") or "",
-                t.get("Observaciones", "") or "",
-            ])
-
-    return filas
-
-
 # =========================================================
 # app_dataverse.py - BLOQUE 9
 # -----------------------
@@ -1840,6 +1655,13 @@ from reportlab.lib.styles import ParagraphStyle
 #   DETECCIÓ I EXTRACCIÓ DE MENCIONS
 # =====================================================
 
+def _terminos_mencion(alumno: str) -> tuple[str, str]:
+    """(àlies, "@nom de pila") en minúscules; l'àlies pot ser buit."""
+    alias = (ALIAS_DEPORTISTAS.get(alumno, "") or "").strip()
+    nombre_pila = (alumno.split()[0] if alumno.split() else alumno).lower()
+    return alias.lower(), f"@{nombre_pila}"
+
+
 def extraer_menciones_de(alumno: str, texto: str) -> list[str]:
     """
     Retorna una llista de línies on apareix l'esportista.
@@ -1850,9 +1672,7 @@ def extraer_menciones_de(alumno: str, texto: str) -> list[str]:
     if not texto or not alumno:
         return []
 
-    alias = (ALIAS_DEPORTISTAS.get(alumno, "") or "").strip()
-    alias_lower = alias.lower() if alias else ""
-    nombre_pila = (alumno.split()[0] if alumno.split() else alumno).lower()
+    alias_lower, nom_arroba = _terminos_mencion(alumno)
 
     trozos: list[str] = []
     for linea in (texto or "").splitlines():
@@ -1860,7 +1680,7 @@ def extraer_menciones_de(alumno: str, texto: str) -> list[str]:
         linea_lower = linea_str.lower()
 
         te_alias = bool(alias_lower) and (alias_lower in linea_lower)
-        te_nom = f"@{nombre_pila}" in linea_lower
+        te_nom = nom_arroba in linea_lower
 
         if te_alias or te_nom:
             trozos.append(linea_str)
@@ -1872,6 +1692,45 @@ def hay_mencion_de(alumno: str, texto: str) -> bool:
     return len(extraer_menciones_de(alumno, texto)) > 0
 
 
+def menciones_de_alumno(alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None,
+                        ascendente: bool = False) -> list[tuple[str, str, dict[str, list[str]]]]:
+    """
+    [(fecha_iso, cuidador, {camp: [línies]})] de l'esportista, opcionalment
+    dins el rang. Va a l'índex local si està al dia; si no, a Dataverse: amb
+    rang, els informes del rang; sense, només els que contenen l'àlies o el
+    @nom (filtre al servidor). Els candidats es refinen línia a línia.
+    """
+    if indice_menciones_listo():
+        return INDICE_MENCIONES.menciones_de(alumno, desde_iso, hasta_iso, ascendente=ascendente)
+    return menciones_en_informes(alumno, informes_candidatos_mencion(alumno, desde_iso, hasta_iso), ascendente)
+
+
+def informes_candidatos_mencion(alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None):
+    """
+    Informes generals de Dataverse on pot sortir l'esportista: amb rang, tots
+    els del rang; sense, els que contenen l'àlies o el @nom. Només llegeix
+    Dataverse (es pot cridar des d'un fil).
+    """
+    if desde_iso and hasta_iso:
+        return ALMACEN.informes_generales_rango(desde_iso, hasta_iso)
+    return ALMACEN.iter_informes_generales_con_texto([t for t in _terminos_mencion(alumno) if t])
+
+
+def menciones_en_informes(alumno: str, informes, ascendente: bool = False) -> list[tuple[str, str, dict[str, list[str]]]]:
+    """Refina els informes candidats línia a línia (mateix format que menciones_de_alumno)."""
+    menciones = []
+    for rec in informes:
+        campos = {}
+        for campo, titulo in CAMPOS_MENCIONES.items():
+            frags = extraer_menciones_de(alumno, rec.get(campo) or "")
+            if frags:
+                campos[titulo] = frags
+        if campos:
+            menciones.append((rec.get("fecha") or "", rec.get("cuidador") or "", campos))
+    menciones.sort(key=lambda m: m[0], reverse=not ascendente)
+    return menciones
+
+
 # =====================================================
 #   CONSULTAR INFORME INDIVIDUAL I MENCIONS (Dataverse)
 # =====================================================
@@ -1898,8 +1757,8 @@ def consultar_informe_individual():
     # 1) INFORMES INDIVIDUALS
     if tipo == "Informes individuals":
         try:
-            # Devuelve [(fecha_txt_ddmmyyyy, contenido), ...]
-            registros = DV.get_informes_individuales_por_alumno(alumno)
+            # Devuelve [(fecha_iso, contenido), ...]
+            registros = ALMACEN.informes_individuales(alumno)
         except Exception as e:
             st.error(f"Error llegint informes individuals de Dataverse: {e}")
             registros = []
@@ -1921,37 +1780,15 @@ def consultar_informe_individual():
 
     # 2) MENCIONS EN INFORMES GENERALS
     else:
+        menciones: list[tuple[str, str, dict]] = []
+
         try:
-            informes = DV.get_informes_generales_todos()
+            menciones = [
+                (fecha, cuidador, {camp: "\n".join(frags) for camp, frags in campos.items()})
+                for fecha, cuidador, campos in menciones_de_alumno(alumno)
+            ]
         except Exception as e:
             st.error(f"Error llegint informes generals de Dataverse: {e}")
-            informes = []
-
-        menciones: list[tuple[str, str, dict]] = []
-
-        for rec in informes:
-            fecha_txt = rec.get("fecha") or ""
-            cuidador = rec.get("cuidador") or ""
-            entradas = rec.get("entradas") or ""
-            mantenimiento = rec.get("mantenimiento") or ""
-            temas = rec.get("temas") or ""
-
-            campos: dict[str, str] = {}
-
-            frags_e = extraer_menciones_de(alumno, entradas)
-            if frags_e:
-                campos["Informe del dia"] = "\n".join(frags_e)
-
-            frags_m = extraer_menciones_de(alumno, mantenimiento)
-            if frags_m:
-                campos["Notes per direcció, manteniment i neteja"] = "\n".join(frags_m)
-
-            frags_t = extraer_menciones_de(alumno, temas)
-            if frags_t:
-                campos["Pícnics pel dia següent"] = "\n".join(frags_t)
-
-            if campos:
-                menciones.append((fecha_txt, cuidador, campos))
 
         if not menciones:
             st.info("No hi ha mencions d'aquest esportista als informes generals.")
@@ -1995,7 +1832,8 @@ def consultar_informe_general():
     st.markdown(f"**Data seleccionada:** {fecha_mostrar}")
 
     try:
-        informe = DV.get_informe_general(fecha_iso)
+        # Inclou els taxis
+        informe = ALMACEN.informe_general(fecha_iso)
     except Exception as e:
         st.error(f"Error llegint informe general des de Dataverse: {e}")
         informe = None
@@ -2011,13 +1849,7 @@ def consultar_informe_general():
     entradas = informe.get("entradas") or ""
     mantenimiento = informe.get("mantenimiento") or ""
     temas = informe.get("temas") or ""
-    informe_id = informe.get("id")
-
-    try:
-        taxis_list = DV.get_taxis_by_informe(informe_id) if informe_id else []
-    except Exception as e:
-        st.error(f"Error llegint taxis de Dataverse: {e}")
-        taxis_list = []
+    taxis_list = informe.get("taxis") or []
 
     st.markdown(
         f"""
@@ -2089,54 +1921,22 @@ def generar_pdf_historico_individual(alumno, desde, hasta):
     elements.append(Paragraph(f"Històric individual - {alumno}", estilo_sub))
     elements.append(Spacer(1, 8))
 
-    # Informes individuals (ja venen del servidor ordenats desc; i la data ja ve en dd/mm/yyyy)
-    try:
-        todos_ind = DV.get_informes_individuales_por_alumno(alumno)
-    except Exception as e:
-        st.error(f"Error llegint informes individuals de Dataverse: {e}")
-        todos_ind = []
-
-    # Filtrar per rang (comparant ISO del rang contra Dataverse al servidor no és possible aquí,
-    # però com a mínim fem filtre tolerant intentant convertir dd/mm/yyyy -> ISO)
-    registros_ind = []
-    for fecha_txt, contenido in todos_ind:
-        if not fecha_txt:
-            continue
-        try:
-            iso = datetime.strptime(fecha_txt, "%d/%m/%Y").strftime("%Y-%m-%d")
-        except Exception:
-            iso = ""
-        if iso and (desde_iso <= iso <= hasta_iso):
-            registros_ind.append((fecha_txt, contenido))
-
-    # Mencions a informes generals (ja ve filtrat per rang des del servidor)
+    # Informes individuals (filtrats per data al servidor, ja ordenats desc) i
+    # mencions del rang. L'índex de mencions (caché de Streamlit) es consulta en
+    # aquest fil; si no està llest, les dues lectures de Dataverse van alhora.
     try:
-        informes_gen = DV.get_informes_generales_rango(desde_iso, hasta_iso)
+        if indice_menciones_listo():
+            menciones = INDICE_MENCIONES.menciones_de(alumno, desde_iso, hasta_iso, ascendente=True)
+            registros_ind = ALMACEN.informes_individuales(alumno, desde_iso, hasta_iso)
+        else:
+            registros_ind, candidatos = DV.ejecutar_en_paralelo([
+                lambda: ALMACEN.informes_individuales(alumno, desde_iso, hasta_iso),
+                lambda: list(informes_candidatos_mencion(alumno, desde_iso, hasta_iso)),
+            ])
+            menciones = menciones_en_informes(alumno, candidatos, ascendente=True)
     except Exception as e:
-        st.error(f"Error llegint informes generals de Dataverse: {e}")
-        informes_gen = []
-
-    menciones = []
-    for rec in informes_gen:
-        fecha_txt = rec.get("fecha") or ""
-        cuidador = rec.get("cuidador") or ""
-        entradas = rec.get("entradas") or ""
-        mantenimiento = rec.get("mantenimiento") or ""
-        temas = rec.get("temas") or ""
-
-        campos = {}
-        frags_e = extraer_menciones_de(alumno, entradas)
-        if frags_e:
-            campos["Informe del dia"] = frags_e
-        frags_m = extraer_menciones_de(alumno, mantenimiento)
-        if frags_m:
-            campos["Notes per direcció, manteniment i neteja"] = frags_m
-        frags_t = extraer_menciones_de(alumno, temas)
-        if frags_t:
-            campos["Pícnics pel dia següent"] = frags_t
-
-        if campos:
-            menciones.append((fecha_txt, cuidador, campos))
+        st.error(f"Error llegint informes de Dataverse: {e}")
+        registros_ind, menciones = [], []
 
     if not registros_ind and not menciones:
         return None
@@ -2145,8 +1945,8 @@ def generar_pdf_historico_individual(alumno, desde, hasta):
     if registros_ind:
         elements.append(Paragraph("A) Informes individuals", estilo_titulo_bloque))
         elements.append(Spacer(1, 6))
-        for fecha_txt, contenido in registros_ind:
-            elements.append(Paragraph(f"Informe del dia {fecha_txt}", estilo_fecha))
+        for fecha_iso, contenido in registros_ind:
+            elements.append(Paragraph(f"Informe del dia {dv_to_ddmmyyyy(fecha_iso)}", estilo_fecha))
             elements.append(Paragraph((contenido or "—").replace("\n", "<br/>"), estilo_texto))
             elements.append(Spacer(1, 8))
             elements.append(Paragraph("<hr/>", estilo_texto))
@@ -2200,8 +2000,9 @@ def generar_pdf_historico_general(desde, hasta):
     estilo_titulo = ParagraphStyle(name="Titulo", fontName="Helvetica-Bold", fontSize=12, spaceAfter=4)
     estilo_texto = ParagraphStyle(name="Texto", fontName="Helvetica", fontSize=10, leading=14)
 
+    # Informes + taxis de tot el rang en una consulta cadascun (no una per dia)
     try:
-        registros = DV.get_informes_generales_rango(desde_iso, hasta_iso)
+        registros = ALMACEN.informes_generales_rango(desde_iso, hasta_iso, con_taxis=True)
     except Exception as e:
         st.error(f"Error llegint informes generals de Dataverse: {e}")
         registros = []
@@ -2226,13 +2027,7 @@ def generar_pdf_historico_general(desde, hasta):
         entradas = rec.get("entradas") or ""
         mantenimiento = rec.get("mantenimiento") or ""
         temas = rec.get("temas") or ""
-        informe_id = rec.get("id")
-
-        try:
-            taxis_list = DV.get_taxis_by_informe(informe_id) if informe_id else []
-        except Exception as e:
-            st.error(f"Error llegint taxis de Dataverse: {e}")
-            taxis_list = []
+        taxis_list = rec.get("taxis") or []
 
         elements.append(Paragraph(f"Informe del dia {fecha_txt or '—'}", estilo_fecha))
         elements.append(Paragraph(f"<b>Cuidador/a:</b> {cuidador or '—'}", estilo_texto))
@@ -2289,32 +2084,22 @@ def _recopilar_taxis_en_rang(desde, hasta):
     hasta_iso = hasta.strftime("%Y-%m-%d")
 
     try:
-        informes = DV.get_informes_generales_rango(desde_iso, hasta_iso)
+        taxis = ALMACEN.taxis_rango(desde_iso, hasta_iso)
     except Exception as e:
         st.error(f"Error llegint informes generals per a taxis de Dataverse: {e}")
-        informes = []
+        taxis = []
 
     filas = []
-    for rec in informes:
-        fecha_informe_txt = rec.get("fecha") or ""
-        informe_id = rec.get("id")
-
-        try:
-            taxis_list = DV.get_taxis_by_informe(informe_id) if informe_id else []
-        except Exception as e:
-            st.error(f"Error llegint taxis de Dataverse: {e}")
-            taxis_list = []
-
-        for t in taxis_list:
-            filas.append([
-                fecha_informe_txt,
-                t.get("Fecha", "") or "",
-                t.get("Hora", "") or "",
-                t.get("Recogida", "") or "",
-                t.get("Destino", "") or "",
-                t.get("Deportistas", "") or "",
-                t.get("Observaciones", "") or "",
-            ])
+    for fecha_informe_txt, t in taxis:
+        filas.append([
+            fecha_informe_txt or "",
+            t.get("Fecha", "") or "",
+            t.get("Hora", "") or "",
+            t.get("Recogida", "") or "",
+            t.get("Destino", "") or "",
+            t.get("Deportistas", "") or "",
+            t.get("Observaciones", "") or "",
+        ])
 
     return filas
 
@@ -2385,10 +2170,9 @@ def main():
         login()
         return
 
-    # --- Càrrega d'esportistes des de Dataverse (una vegada per sessió) ---
-    if "alumnos_cargados" not in st.session_state:
-        cargar_alumnos_desde_dataverse()
-        st.session_state["alumnos_cargados"] = True
+    # --- Càrrega d'esportistes (llista compartida entre sessions; Streamlit
+    #     buida les globals a cada rerun, però això no fa cap crida HTTP) ---
+    cargar_alumnos_desde_dataverse()
 
     # --- Barra lateral ---
     st.sidebar.markdown(f"👤 Usuari: **{st.session_state.get('usuario','').capitalize()}**")
@@ -2398,6 +2182,10 @@ def main():
     if st.sidebar.button("🚪 Tancar sessió"):
         logout()
         return
+    if st.sidebar.button("🔄 Actualitzar esportistes"):
+        cargar_alumnos_desde_dataverse(forzar=True)
+        st.sidebar.caption(f"Llista d'esportistes actualitzada (versió {st.session_state.get('roster_version', 0)}).")
+    mostrar_estado_cola()
 
     vista = st.session_state.get("vista_actual", "menu")
 
@@ -2413,6 +2201,8 @@ def main():
         consultar_informe_individual()
     elif vista == "cambiar_contraseña":
         cambiar_contraseña()
+    elif vista == "conflictes":
+        vista_conflictos()
     elif vista == "historico":
         st.header("🖨️ Imprimir històric d'informes")
         tipo = st.radio(
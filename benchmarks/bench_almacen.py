@@ -0,0 +1,142 @@
+# =========================================================
+# benchmarks/bench_almacen.py
+# =========================================================
+# La mateixa càrrega (consultes de les vistes i dels històrics, amb algun desat
+# entremig) contra qualsevol AlmacenInformes, amb i sense AlmacenEnCache:
+#   - SQLite: informes.db sintètica en un directori temporal.
+#   - Dataverse (opcional): --secrets .streamlit/secrets.toml. Només llegeix,
+#     llevat de --desats-dataverse > 0 (escriu informes de prova a
+#     --fecha-desats). El client ja té la seva pròpia caché de GET.
+#
+#   python benchmarks/bench_almacen.py --operaciones 400
+#   python benchmarks/bench_almacen.py --secrets .streamlit/secrets.toml --operaciones 100
+#
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tomllib
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacen_informes import AlmacenEnCache, AlmacenInformes  # noqa: E402
+from informes_sqlite import AlmacenSQLite, GestorConexiones  # noqa: E402
+
+ALUMNOS = [f"Esportista {i:02d}" for i in range(40)]
+INICIO = date(2024, 1, 1)
+
+
+def _poblar(almacen: AlmacenInformes, dias: int):
+    rnd = random.Random(1)
+    for d in range(dias):
+        fecha = (INICIO + timedelta(d)).isoformat()
+        almacen.guardar("informe_general", {
+            "fecha_iso": fecha,
+            "cuidador": "Cuidador",
+            "entradas": f"Informe del dia {d}. " * 20,
+            "mantenimiento": "Res a destacar.",
+            "temas": "Pícnic per a 3.",
+            "taxis": [
+                {"Fecha": (INICIO + timedelta(d + 1)).strftime("%d/%m/%Y"), "Hora": "08:00",
+                 "Recogida": "Residència", "Destino": "Aeroport", "Deportistas": "@esportista",
+                 "Observaciones": ""}
+                for _ in range(rnd.randint(0, 3))
+            ],
+        })
+        for alumno in rnd.sample(ALUMNOS, 10):
+            almacen.guardar("informe_individual", {
+                "fecha_iso": fecha, "alumno": alumno, "alias": "", "contenido": f"Informe de {alumno}. " * 8,
+            })
+
+
+def _carga(almacen: AlmacenInformes, dias: int, operaciones: int, desats: int, fecha_desats: str,
+           semilla: int = 2) -> dict[str, list[float]]:
+    """
+    Barreja de les consultes de l'app. Cada operació tria un dia/esportista
+    d'un conjunt petit (com fan unes quantes sessions mirant el mateix).
+    """
+    rnd = random.Random(semilla)
+    fechas = [(INICIO + timedelta(d)).isoformat() for d in range(max(dias - 31, 1))]
+    consultas = {
+        "informe_general": lambda f, a: almacen.informe_general(f),
+        "generales_mes": lambda f, a: almacen.informes_generales_rango(
+            f, (date.fromisoformat(f) + timedelta(30)).isoformat(), con_taxis=True),
+        "taxis_mes": lambda f, a: almacen.taxis_rango(f, (date.fromisoformat(f) + timedelta(30)).isoformat()),
+        "individuales_alumno": lambda f, a: almacen.informes_individuales(a),
+        "individuales_mes": lambda f, a: almacen.informes_individuales(
+            a, f, (date.fromisoformat(f) + timedelta(30)).isoformat(), ascendente=True),
+        "alumnos_con_informe": lambda f, a: almacen.alumnos_con_informe(f),
+    }
+    cada_desat = operaciones // desats if desats else 0
+    tiempos: dict[str, list[float]] = {nombre: [] for nombre in consultas}
+    tiempos["guardar"] = []
+    for i in range(operaciones):
+        if cada_desat and i % cada_desat == cada_desat - 1:
+            t0 = time.perf_counter()
+            almacen.guardar("informe_individual", {
+                "fecha_iso": fecha_desats, "alumno": ALUMNOS[0], "alias": "", "contenido": f"Desat {i}",
+            })
+            tiempos["guardar"].append(time.perf_counter() - t0)
+        nombre = rnd.choice(list(consultas))
+        t0 = time.perf_counter()
+        consultas[nombre](rnd.choice(fechas[:8]), rnd.choice(ALUMNOS[:6]))
+        tiempos[nombre].append(time.perf_counter() - t0)
+    return tiempos
+
+
+def _informe(titulo: str, tiempos: dict[str, list[float]], segundos: float):
+    total = sum(len(v) for v in tiempos.values())
+    print(f"  {titulo}: {total} operacions en {segundos:.2f} s")
+    for nombre, valores in tiempos.items():
+        if not valores:
+            continue
+        valores = sorted(valores)
+        p95 = valores[min(int(len(valores) * 0.95), len(valores) - 1)]
+        print(f"    {nombre:22} n={len(valores):4}  mitjana {statistics.fmean(valores) * 1000:8.2f} ms"
+              f"  p95 {p95 * 1000:8.2f} ms")
+
+
+def _comparar(nombre: str, crear, desats: int, args):
+    print(nombre)
+    for titulo, almacen in (("directe", crear()), ("amb AlmacenEnCache", AlmacenEnCache(crear(), ttl=args.ttl))):
+        t0 = time.perf_counter()
+        tiempos = _carga(almacen, args.dias, args.operaciones, desats, args.fecha_desats)
+        _informe(titulo, tiempos, time.perf_counter() - t0)
+        if isinstance(almacen, AlmacenEnCache):
+            print(f"    caché: {almacen.estadisticas()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mateixa càrrega contra els AlmacenInformes")
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--operaciones", type=int, default=400)
+    parser.add_argument("--desats", type=int, default=10, help="desats repartits entre les operacions (SQLite)")
+    parser.add_argument("--desats-dataverse", type=int, default=0, help="igual, a Dataverse (escriu!)")
+    parser.add_argument("--fecha-desats", default="2099-01-01", help="data dels informes de prova que es desen")
+    parser.add_argument("--ttl", type=float, default=30.0)
+    parser.add_argument("--secrets", help="secrets.toml amb la secció [dataverse]")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gestor = GestorConexiones(os.path.join(tmp, "informes.db"))
+        _poblar(AlmacenSQLite(gestor), args.dias)
+        _comparar(f"SQLite ({args.dias} dies)", lambda: AlmacenSQLite(gestor), args.desats, args)
+
+    if args.secrets:
+        from dataverse_almacen import AlmacenDataverse
+        from dataverse_client import DataverseClient
+
+        with open(args.secrets, "rb") as f:
+            cfg = tomllib.load(f)["dataverse"]
+        client = DataverseClient(cfg)
+        if args.desats_dataverse:
+            print(f"⚠️ Es desaran informes individuals de prova a {args.fecha_desats} ({ALUMNOS[0]})")
+        _comparar("Dataverse", lambda: AlmacenDataverse(client), args.desats_dataverse, args)
+
+
+if __name__ == "__main__":
+    main()
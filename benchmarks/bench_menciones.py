@@ -0,0 +1,109 @@
+# =========================================================
+# benchmarks/bench_menciones.py
+# =========================================================
+# Mencions de tots els esportistes en un any d'informes generals: el bucle
+# actual (extraer_menciones_de per esportista i camp) contra BuscadorMenciones
+# (un sol recorregut per text). Els textos són sintètics però amb la forma dels
+# reals: línies curtes amb àlies i @noms barrejats.
+#
+#   python benchmarks/bench_menciones.py --alumnos 40 --dias 365
+#
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menciones import BuscadorMenciones  # noqa: E402
+
+NOMS = ["Joan", "Maria", "Pere", "Aina", "Miquel", "Marta", "Toni", "Laura", "Pau", "Neus",
+        "Jaume", "Clara", "Biel", "Júlia", "Xisco", "Carme", "Tomeu", "Elena", "Lluc", "Rosa"]
+COGNOMS = ["Ferrer", "Pons", "Vidal", "Mas", "Riera", "Serra", "Coll", "Font", "Bauzà", "Pou"]
+PARAULES = ("ha arribat tard al sopar avui entrenament dutxa habitació ordenada "
+            "febre metge revisió taxi aeroport competició material perdut").split()
+
+
+def extraer_menciones_de(alumno: str, alias_map: dict[str, str], texto: str) -> list[str]:
+    """Còpia de la detecció per esportista de les apps (referència)."""
+    if not texto or not alumno:
+        return []
+    alias_lower = (alias_map.get(alumno, "") or "").strip().lower()
+    nombre_pila = (alumno.split()[0] if alumno.split() else alumno).lower()
+    trozos = []
+    for linea in texto.splitlines():
+        linea_str = linea.strip()
+        linea_lower = linea_str.lower()
+        if (alias_lower and alias_lower in linea_lower) or f"@{nombre_pila}" in linea_lower:
+            trozos.append(linea_str)
+    return trozos
+
+
+def _datos(n_alumnos: int, dias: int, semilla: int = 1):
+    rnd = random.Random(semilla)
+    alumnos = []
+    while len(alumnos) < n_alumnos:
+        nom = f"{rnd.choice(NOMS)} {rnd.choice(COGNOMS)} {rnd.choice(COGNOMS)}"
+        if nom not in alumnos:
+            alumnos.append(nom)
+    alias_map = {a: f"@{a.split()[0].lower()}{a.split()[1][0].lower()}{a.split()[2][0].lower()}" for a in alumnos}
+
+    def linea():
+        palabras = rnd.choices(PARAULES, k=rnd.randint(5, 14))
+        for _ in range(rnd.choice((0, 0, 1, 1, 2))):
+            a = rnd.choice(alumnos)
+            ref = alias_map[a] if rnd.random() < 0.6 else f"@{a.split()[0]}"
+            palabras.insert(rnd.randrange(len(palabras) + 1), ref.upper() if rnd.random() < 0.1 else ref)
+        return " ".join(palabras)
+
+    informes = [
+        {campo: "\n".join(linea() for _ in range(rnd.randint(3, 25)))
+         for campo in ("entradas", "mantenimiento", "temas")}
+        for _ in range(dias)
+    ]
+    return alumnos, alias_map, informes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mencions: bucle per esportista vs Aho–Corasick")
+    parser.add_argument("--alumnos", type=int, default=40)
+    parser.add_argument("--dias", type=int, default=365)
+    args = parser.parse_args()
+
+    alumnos, alias_map, informes = _datos(args.alumnos, args.dias)
+    caracteres = sum(len(t) for inf in informes for t in inf.values())
+    print(f"{args.alumnos} esportistes, {args.dias} informes, {caracteres / 1000:.0f} k caràcters")
+
+    t0 = time.perf_counter()
+    bucle = []
+    for inf in informes:
+        por_alumno = {}
+        for alumno in alumnos:
+            campos = {}
+            for campo, texto in inf.items():
+                frags = extraer_menciones_de(alumno, alias_map, texto)
+                if frags:
+                    campos[campo] = frags
+            if campos:
+                por_alumno[alumno] = campos
+        bucle.append(por_alumno)
+    t_bucle = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    buscador = BuscadorMenciones.desde_alias(alumnos, alias_map)
+    t_compilar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ac = [buscador.menciones_informe(inf) for inf in informes]
+    t_ac = time.perf_counter() - t0
+
+    print(f"  bucle per esportista   {t_bucle * 1000:8.1f} ms")
+    print(f"  Aho–Corasick           {t_ac * 1000:8.1f} ms  (+{t_compilar * 1000:.2f} ms compilant)")
+    print(f"  x{t_bucle / t_ac:.1f}")
+
+    assert ac == bucle, "els dos mètodes no troben les mateixes mencions"
+
+
+if __name__ == "__main__":
+    main()
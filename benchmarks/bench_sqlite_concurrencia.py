@@ -0,0 +1,166 @@
+# =========================================================
+# benchmarks/bench_sqlite_concurrencia.py
+# =========================================================
+# Diverses sessions llegint l'històric d'un esportista mentre una altra desa
+# informes, sobre una còpia temporal d'informes.db. Com a Streamlit, cada
+# rerun s'executa en un fil nou i fa unes quantes consultes:
+#   - "compartida": una sola connexió per a tots els fils (com app.py al
+#     principi), mode de journal per defecte.
+#   - "per fil + WAL": una connexió per fil (threading.local): cada rerun
+#     obre una connexió nova i torna a aplicar els PRAGMA.
+#   - "pool + WAL": GestorConexiones d'informes_sqlite (connexions de llarga
+#     durada, prestades per operació).
+#
+#   python benchmarks/bench_sqlite_concurrencia.py --lectores 8 --segundos 5
+#
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from informes_sqlite import (  # noqa: E402
+    BUSY_TIMEOUT, PRAGMAS_CONEXION, GestorConexiones, migrar, SQL_INDIVIDUALES_ALUMNO, SQL_INFORME_INDIVIDUAL,
+)
+
+ALUMNOS = [f"Esportista {i:02d}" for i in range(40)]
+SQL_DESAR = (
+    "INSERT INTO informes_alumnos (fecha, alumno, contenido) VALUES (?, ?, ?) "
+    "ON CONFLICT(fecha, alumno) DO UPDATE SET contenido=excluded.contenido"
+)
+
+
+def _poblar(path: str, dias: int):
+    conn = sqlite3.connect(path)
+    migrar(conn)
+    inicio = date(2024, 1, 1)
+    with conn:
+        conn.executemany(SQL_DESAR, [
+            ((inicio + timedelta(d)).isoformat(), a, f"Informe de {a}, dia {d}. " * 8)
+            for d in range(dias) for a in ALUMNOS
+        ])
+    conn.close()
+
+
+class _Compartida:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+    def conexion(self):
+        return nullcontext(self.conn)
+
+
+class _PorFil:
+    """Com GestorConexiones abans del pool: una connexió per fil."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+            for pragma in PRAGMAS_CONEXION:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return nullcontext(conn)
+
+
+def _en_fil_nou(funcion):
+    fil = threading.Thread(target=funcion)
+    fil.start()
+    fil.join()
+
+
+def _escenario(gestor, lectores: int, segundos: float, intervalo: float,
+               consultas: int) -> tuple[list[float], int]:
+    latencias: list[float] = []
+    escrituras = 0
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def lector(i: int):
+        propias = []
+        alumno = ALUMNOS[i % len(ALUMNOS)]
+
+        def rerun():
+            # Històric de l'esportista + unes quantes lectures puntuals
+            with gestor.conexion() as conn:
+                conn.execute(SQL_INDIVIDUALES_ALUMNO, (alumno,)).fetchall()
+            for d in range(consultas):
+                with gestor.conexion() as conn:
+                    conn.execute(SQL_INFORME_INDIVIDUAL, ((date(2024, 1, 1) + timedelta(d)).isoformat(), alumno)).fetchone()
+
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            _en_fil_nou(rerun)
+            propias.append(time.perf_counter() - t0)
+        with lock:
+            latencias.extend(propias)
+
+    def escritor():
+        nonlocal escrituras
+        d = 0
+        while time.perf_counter() < fin:
+            def rerun():
+                with gestor.conexion() as conn, conn:
+                    conn.execute(SQL_DESAR, ((date(2030, 1, 1) + timedelta(d)).isoformat(), ALUMNOS[0], "nou"))
+            _en_fil_nou(rerun)
+            d += 1
+            time.sleep(intervalo)
+        escrituras = d
+
+    fils = [threading.Thread(target=lector, args=(i,)) for i in range(lectores)]
+    fils.append(threading.Thread(target=escritor))
+    for f in fils:
+        f.start()
+    for f in fils:
+        f.join()
+    return latencias, escrituras
+
+
+def _informe(nombre: str, latencias: list[float], escrituras: int, segundos: float):
+    latencias.sort()
+    p99 = latencias[int(len(latencias) * 0.99)]
+    print(f"  {nombre:16} {len(latencias) / segundos:7.0f} reruns/s  "
+          f"p50 {statistics.median(latencias) * 1000:6.2f} ms  p99 {p99 * 1000:7.2f} ms  "
+          f"màx {latencias[-1] * 1000:7.1f} ms  {escrituras / segundos:5.0f} desats/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite: connexió compartida vs una per fil vs pool")
+    parser.add_argument("--lectores", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--consultas", type=int, default=10, help="lectures puntuals per rerun")
+    parser.add_argument("--intervalo-ms", type=float, default=20.0, help="pausa entre desats")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "informes.db")
+        _poblar(path, args.dias)
+        print(f"{args.dias * len(ALUMNOS)} informes individuals, {args.lectores} lectors + 1 escriptor "
+              f"(un desat cada {args.intervalo_ms:.0f} ms), {args.consultas + 1} consultes per rerun, "
+              f"{args.segundos:.0f} s")
+        intervalo = args.intervalo_ms / 1000.0
+
+        compartida = _Compartida(path)
+        _informe("compartida", *_escenario(compartida, args.lectores, args.segundos, intervalo, args.consultas),
+                 args.segundos)
+        compartida.conn.close()
+
+        for nombre, gestor in (("per fil + WAL", _PorFil(path)), ("pool + WAL", GestorConexiones(path))):
+            _informe(nombre, *_escenario(gestor, args.lectores, args.segundos, intervalo, args.consultas),
+                     args.segundos)
+
+
+if __name__ == "__main__":
+    main()
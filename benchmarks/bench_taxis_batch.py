@@ -0,0 +1,229 @@
+# =========================================================
+# benchmarks/bench_taxis_batch.py
+# =========================================================
+# Compara el desat de taxis seqüencial (un DELETE/POST per fila) amb el desat
+# en $batch de DataverseClient.replace_taxis_for_informe i amb la sincronització
+# per diferències (sync_taxis_for_informe), contra un servidor OData local que
+# simula la latència de xarxa de Dataverse.
+#
+#   python benchmarks/bench_taxis_batch.py --taxis 15 --latencia-ms 40
+#
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataverse_client import DataverseClient  # noqa: E402
+
+ENTITY_INFORMES = "cr143_informegenerals"
+ENTITY_TAXIS = "cr143_taxis"
+
+
+class ServidorODataFals:
+    """
+    Servidor OData mínim: token OAuth, GET/POST/DELETE de taxis i $batch.
+    Cada petició HTTP espera 'latencia' segons per simular el round-trip.
+    """
+
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.taxis: dict[str, dict] = {}
+        self.peticiones = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _handler(self):
+        srv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _enviar(self, status: int, body: str = "", ctype: str = "application/json", headers: dict | None = None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _cuerpo(self) -> str:
+                n = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(n).decode("utf-8") if n else ""
+
+            def _comptar(self):
+                with srv.lock:
+                    srv.peticiones += 1
+                time.sleep(srv.latencia)
+
+            def do_GET(self):
+                self._comptar()
+                m = re.search(r"_cr143_informegeneral_value eq ([\w-]+)", self.path.replace("%20", " "))
+                informe_id = m.group(1) if m else None
+                with srv.lock:
+                    rows = [t for t in srv.taxis.values() if t["_informe"] == informe_id]
+                self._enviar(200, json.dumps({"value": rows}))
+
+            def do_PATCH(self):
+                cuerpo = self._cuerpo()
+                self._comptar()
+                srv.aplicar("PATCH", self.path, json.loads(cuerpo or "{}"))
+                self._enviar(204)
+
+            def do_DELETE(self):
+                self._comptar()
+                srv.aplicar("DELETE", self.path, None)
+                self._enviar(204)
+
+            def do_POST(self):
+                cuerpo = self._cuerpo()
+                if "/oauth2/v2.0/token" in self.path:
+                    self._enviar(200, json.dumps({"access_token": "fals", "expires_in": 3600}))
+                    return
+                self._comptar()
+                if self.path.endswith("/$batch"):
+                    self._batch(cuerpo)
+                    return
+                taxi_id = srv.aplicar("POST", self.path, json.loads(cuerpo or "{}"))
+                self._enviar(204, headers={"OData-EntityId": f"{srv.url}/{ENTITY_TAXIS}({taxi_id})"})
+
+            def _batch(self, cuerpo: str):
+                partes = []
+                for bloque in re.split(r"\r\n--changeset_\w+", cuerpo):
+                    m = re.search(r"^(DELETE|POST|PATCH) (\S+) HTTP/1\.1\r\n(?:[^\r\n]+\r\n)*\r\n(.*)$", bloque, flags=re.M | re.S)
+                    if not m:
+                        continue
+                    metodo, url, payload = m.group(1), m.group(2), m.group(3).strip()
+                    srv.aplicar(metodo, url, json.loads(payload) if metodo != "DELETE" else None)
+                    partes.append("HTTP/1.1 204 No Content")
+                self._enviar(200, "\r\n".join(partes), ctype="multipart/mixed")
+
+        return Handler
+
+    def aplicar(self, metodo: str, url: str, payload: dict | None) -> str | None:
+        with self.lock:
+            if metodo == "DELETE":
+                m = re.search(r"\(([\w-]+)\)", url)
+                if m:
+                    self.taxis.pop(m.group(1), None)
+                return None
+            if metodo == "PATCH":
+                m = re.search(r"\(([\w-]+)\)", url)
+                if m and m.group(1) in self.taxis:
+                    self.taxis[m.group(1)].update(payload or {})
+                return None
+            taxi_id = str(uuid.uuid4())
+            bind = (payload or {}).get("cr143_Informegeneral@odata.bind", "")
+            m = re.search(r"\(([\w-]+)\)", bind)
+            rec = {k: v for k, v in (payload or {}).items() if "@" not in k}
+            rec["cr143_taxiid"] = taxi_id
+            rec["_informe"] = m.group(1) if m else None
+            self.taxis[taxi_id] = rec
+            return taxi_id
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _taxis_de_prova(n: int) -> list[dict]:
+    return [
+        {
+            "Fecha": "15/12/2025",
+            "Hora": f"{7 + i % 12:02d}:30",
+            "Recogida": "Residència",
+            "Destino": f"Destí {i}",
+            "Deportistas": f"Esportista {i}",
+            "Observaciones": "",
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Desat de taxis: seqüencial vs $batch")
+    parser.add_argument("--taxis", type=int, default=15, help="taxis per informe")
+    parser.add_argument("--latencia-ms", type=float, default=40.0, help="latència simulada per petició")
+    parser.add_argument("--repeticions", type=int, default=5)
+    args = parser.parse_args()
+
+    with ServidorODataFals(args.latencia_ms / 1000.0) as srv:
+        cfg = {
+            "tenant_id": "tenant",
+            "client_id": "client",
+            "client_secret": "secret",
+            "resource": srv.url,
+            "api_base": srv.url,
+            "authority_host": srv.url,
+            "informes_entity_set": ENTITY_INFORMES,
+            "taxis_entity_set": ENTITY_TAXIS,
+            "informes_ind_entity_set": "cr143_informeindividuals",
+            "usuarios_entity_set": "cr143_usuarisaplicacios",
+            "alumnos_entity_set": "cr143_esportistes",
+            # sense limitador de ritme: volem mesurar només els round-trips
+            "peticions_per_segon": 1_000_000,
+            "rafaga_peticions": 1_000_000,
+        }
+        client = DataverseClient(cfg)
+        informe_id = str(uuid.uuid4())
+        taxis = _taxis_de_prova(args.taxis)
+
+        # Estat inicial: l'informe ja té els taxis desats (cas d'una edició)
+        client.replace_taxis_for_informe(informe_id, "2025-12-15", taxis, usar_batch=True)
+
+        print(f"{args.taxis} taxis, latència simulada {args.latencia_ms:.0f} ms/petició")
+        for nom, usar_batch in (("seqüencial", False), ("$batch", True)):
+            tiempos = []
+            peticiones_ini = srv.peticiones
+            for _ in range(args.repeticions):
+                t0 = time.perf_counter()
+                client.replace_taxis_for_informe(informe_id, "2025-12-15", taxis, usar_batch=usar_batch)
+                tiempos.append(time.perf_counter() - t0)
+            peticiones = (srv.peticiones - peticiones_ini) / args.repeticions
+            tiempos.sort()
+            print(
+                f"  {nom:<12} mediana {tiempos[len(tiempos) // 2] * 1000:8.1f} ms"
+                f"   {peticiones:5.1f} peticions/desat"
+            )
+
+        # Sincronització per diferències: sense canvis i amb una cel·la editada
+        for nom, canviar in (("sync igual", False), ("sync 1 canvi", True)):
+            tiempos = []
+            peticiones_ini = srv.peticiones
+            for i in range(args.repeticions):
+                editats = client.get_taxis_by_informe(informe_id, con_id=True)
+                if canviar and editats:
+                    editats[0]["Observaciones"] = f"canvi {i}"
+                peticiones_ini += 1  # el GET de preparació no compta
+                t0 = time.perf_counter()
+                client.sync_taxis_for_informe(informe_id, "2025-12-15", editats)
+                tiempos.append(time.perf_counter() - t0)
+            peticiones = (srv.peticiones - peticiones_ini) / args.repeticions
+            tiempos.sort()
+            print(
+                f"  {nom:<12} mediana {tiempos[len(tiempos) // 2] * 1000:8.1f} ms"
+                f"   {peticiones:5.1f} peticions/desat"
+            )
+
+        stats = client.estadisticas_pool()
+        print(f"  pool: {stats['peticions']} peticions sobre {stats['connexions']} connexions")
+
+
+if __name__ == "__main__":
+    main()
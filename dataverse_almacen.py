@@ -0,0 +1,88 @@
+# =========================================================
+# dataverse_almacen.py - AlmacenInformes SOBRE DATAVERSE
+# =========================================================
+# Implementació d'almacen_informes.AlmacenInformes per a app_dataverse.py.
+# Les consultes de rang i de text (històrics, mencions) van a la rèplica local
+# si n'hi ha i ja ha fet la càrrega inicial; les lectures d'un sol informe (les
+# dels formularis) i les escriptures van sempre a Dataverse.
+from typing import Iterator
+
+from almacen_informes import AlmacenInformes
+from dataverse_client import DataverseClient
+from dataverse_cola import aplicar_operacion
+from dataverse_replica import ReplicaDataverse
+
+
+class AlmacenDataverse(AlmacenInformes):
+    """
+    'replica' és opcional: sense, tot va a Dataverse. Després de cada desat es
+    demana a la rèplica que se sincronitzi.
+    """
+
+    def __init__(self, client: DataverseClient, replica: ReplicaDataverse | None = None):
+        self.client = client
+        self.replica = replica
+
+    def _lecturas(self):
+        """La rèplica si està llesta; si no, el client (mateixa interfície de lectura)."""
+        if self.replica is not None and self.replica.lista():
+            return self.replica
+        return self.client
+
+    # ----------------------------------------------
+    # Informes generals
+    # ----------------------------------------------
+    def informe_general(self, fecha_iso: str) -> dict | None:
+        rec = self.client.get_informe_general(fecha_iso)
+        if rec is None:
+            return None
+        return {**rec, "fecha": fecha_iso, "taxis": self.client.get_taxis_by_informe(rec.get("id"))}
+
+    def informes_generales_rango(self, desde_iso: str, hasta_iso: str, con_taxis: bool = False) -> list[dict]:
+        return self._lecturas().get_informes_generales_rango(desde_iso, hasta_iso, con_taxis=con_taxis)
+
+    def iter_informes_generales_todos(self) -> Iterator[dict]:
+        return self._lecturas().iter_informes_generales_todos()
+
+    def iter_informes_generales_con_texto(self, terminos: list[str]) -> Iterator[dict]:
+        return self._lecturas().iter_informes_generales_con_texto(terminos)
+
+    def taxis_rango(self, desde_iso: str, hasta_iso: str, por_servicio: bool = False) -> list[tuple[str, dict]]:
+        if por_servicio:
+            return self._lecturas().get_taxis_servicio_rango(desde_iso, hasta_iso)
+        return [
+            (rec.get("fecha") or "", taxi)
+            for rec in self.informes_generales_rango(desde_iso, hasta_iso, con_taxis=True)
+            for taxi in rec.get("taxis") or []
+        ]
+
+    # ----------------------------------------------
+    # Informes individuals
+    # ----------------------------------------------
+    def informe_individual(self, fecha_iso: str, alumno: str) -> str | None:
+        rec = self.client.get_informe_individual(fecha_iso, alumno)
+        return None if rec is None else rec.get("contenido") or ""
+
+    def informes_individuales(self, alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None,
+                              ascendente: bool = False) -> list[tuple[str, str]]:
+        fuente = self._lecturas()
+        if desde_iso and hasta_iso:
+            registros = fuente.get_informes_individuales_rango(alumno, desde_iso, hasta_iso)
+        else:
+            registros = fuente.get_informes_individuales_por_alumno(alumno)
+        # Tots dos arriben més recents primer
+        if ascendente:
+            registros.reverse()
+        return registros
+
+    def alumnos_con_informe(self, fecha_iso: str) -> list[str]:
+        return self.client.get_alumnos_con_informe_en_fecha(fecha_iso)
+
+    # ----------------------------------------------
+    # Escriptura (mateixes operacions que la cua)
+    # ----------------------------------------------
+    def guardar(self, tipo: str, datos: dict) -> dict | None:
+        desat = aplicar_operacion(self.client, tipo, datos)
+        if self.replica is not None:
+            self.replica.solicitar_sincronizacion()
+        return desat
@@ -0,0 +1,1783 @@
+# =========================================================
+# dataverse_client.py - CLIENT DATAVERSE
+# =========================================================
+# Mòdul importable (no és un script de Streamlit): Streamlit torna a executar
+# app_dataverse.py a cada rerun, però els mòduls importats es mantenen a
+# sys.modules durant tota la vida del procés. Tot l'estat que ha de sobreviure
+# entre reruns i sessions (token OAuth, etc.) viu aquí.
+from datetime import date, datetime
+import json
+import os
+import random
+import time
+import hashlib
+import re
+import threading
+import uuid
+from typing import Any, Callable, Iterator
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote
+
+
+USU_LOGIN_FIELD = "cr143_nomusuariregistre"
+USU_NAME_FIELD  = "cr143_nomusuari"
+
+ALUMNOS_NAME_FIELD  = "cr143_nomcomplet"
+ALUMNOS_ALIAS_FIELD = "cr143_alias"
+
+def dv_to_iso_date(value: str) -> str:
+    """
+    Devuelve YYYY-MM-DD para usar en lógica (comparaciones, rangos, etc.).
+    Acepta:
+      - 2025-12-15
+      - 2025-12-15T00:00:00
+      - 2025-12-15T00:00:00Z
+      - 15/12/2025
+    """
+    if not value:
+        return ""
+    v = str(value).strip()
+    if not v:
+        return ""
+
+    # dd/mm/yyyy
+    if "/" in v and len(v.split("/")) == 3:
+        try:
+            return datetime.strptime(v, "%d/%m/%Y").strftime("%Y-%m-%d")
+        except Exception:
+            return ""
+
+    # ISO con Z
+    if v.endswith("Z"):
+        v = v[:-1] + "+00:00"
+
+    try:
+        return datetime.fromisoformat(v).date().strftime("%Y-%m-%d")
+    except Exception:
+        try:
+            return datetime.strptime(v[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except Exception:
+            return ""
+
+
+def dv_to_ddmmyyyy(value: str) -> str:
+    """Devuelve dd/mm/yyyy para mostrar en UI/PDF."""
+    iso = dv_to_iso_date(value)
+    if not iso:
+        return ""
+    try:
+        return datetime.strptime(iso, "%Y-%m-%d").strftime("%d/%m/%Y")
+    except Exception:
+        return ""
+
+
+def _to_text(v) -> str:
+    if v is None:
+        return ""
+    try:
+        if isinstance(v, float) and pd.isna(v):
+            return ""
+    except Exception:
+        pass
+    if isinstance(v, (list, tuple, set)):
+        return "\n".join([str(x) for x in v if x is not None])
+    return str(v)
+
+
+# -----------------------
+# Caché de tokens OAuth (compartida per tot el procés)
+# -----------------------
+# El token client_credentials d'Azure AD dura ~1 h (expires_in). El guardam a
+# nivell de mòdul perquè totes les sessions de Streamlit del mateix procés el
+# reutilitzin, i opcionalment a disc perquè un reinici no hagi de tornar a fer
+# el round-trip a login.microsoftonline.com.
+TOKEN_MARGEN_RENOVACION = 300  # segons: renovam abans que caduqui de veritat
+
+_TOKEN_LOCK = threading.Lock()
+_TOKEN_CACHE: dict[str, dict] = {}
+
+
+def _token_cache_key(tenant_id: str, client_id: str, resource: str) -> str:
+    return hashlib.sha256(f"{tenant_id}|{client_id}|{resource}".encode("utf-8")).hexdigest()
+
+
+def _token_vigente(rec: dict | None) -> bool:
+    if not rec or not rec.get("access_token"):
+        return False
+    return float(rec.get("expires_at") or 0) - TOKEN_MARGEN_RENOVACION > time.time()
+
+
+def _leer_tokens_disco(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _guardar_token_disco(path: str, key: str, rec: dict):
+    """
+    Escriu el token al fitxer de caché (atòmic i amb permisos 0600, és un secret).
+    Si falla no passa res: la caché a disc és només una optimització.
+    """
+    data = {k: v for k, v in _leer_tokens_disco(path).items() if _token_vigente(v)}
+    data[key] = rec
+    tmp = f"{path}.tmp"
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+# -----------------------
+# Sessió HTTP amb pool de connexions
+# -----------------------
+# Cada save fa desenes de crides OData al mateix host: amb una sola
+# requests.Session les connexions TCP+TLS es reutilitzen (keep-alive).
+HTTP_POOL_CONNECTIONS = 4   # hosts diferents (Dataverse + login.microsoftonline.com)
+HTTP_POOL_MAXSIZE = 16      # connexions obertes per host (sessions de Streamlit en paral·lel)
+
+# Camps de dades d'un taxi (sense la relació amb l'informe)
+TAXI_CAMPOS = (
+    "cr143_fecha",
+    "cr143_hora",
+    "cr143_recollida",
+    "cr143_desti",
+    "cr143_esportistes",
+    "cr143_observacions",
+)
+
+# Columnes i format comú dels informes generals
+INFORME_GENERAL_SELECT = ",".join([
+    "cr143_informegeneralid",
+    "cr143_codigofecha",
+    "cr143_cuidador",
+    "cr143_informedeldia",
+    "cr143_notesdireccio",
+    "cr143_picnics",
+])
+
+
+# Camps de text lliure dels informes generals (on es busquen les mencions)
+INFORME_GENERAL_CAMPOS_TEXTO = ("cr143_informedeldia", "cr143_notesdireccio", "cr143_picnics")
+
+
+def _informe_general_desde_dv(rec: dict) -> dict:
+    fecha_iso = (rec.get("cr143_codigofecha") or "").strip()
+    return {
+        "id": rec.get("cr143_informegeneralid"),
+        "fecha": fecha_iso,  # ISO
+        "cuidador": rec.get("cr143_cuidador") or "",
+        "entradas": rec.get("cr143_informedeldia") or "",
+        "mantenimiento": rec.get("cr143_notesdireccio") or "",
+        "temas": rec.get("cr143_picnics") or "",
+    }
+
+
+def _taxi_desde_dv(rec: dict, con_id: bool = False) -> dict:
+    # UI/PDF quiere dd/mm/yyyy
+    fecha_txt = dv_to_ddmmyyyy(rec.get("cr143_fecha"))
+    taxi = {
+        "Fecha": fecha_txt,
+        "Hora": rec.get("cr143_hora") or "",
+        "Recogida": rec.get("cr143_recollida") or "",
+        "Destino": rec.get("cr143_desti") or "",
+        "Deportistas": rec.get("cr143_esportistes") or "",
+        "Observaciones": rec.get("cr143_observacions") or "",
+    }
+    if con_id:
+        taxi["Id"] = rec.get("cr143_taxiid") or ""
+    return taxi
+
+
+def _unir_taxis(informes: list[dict], taxis_rango: list[tuple[str, dict]]) -> list[dict]:
+    """Afegeix "taxis" a cada informe a partir dels (informe_id, taxi) del rang."""
+    taxis_por_informe: dict[str, list[dict]] = {}
+    for informe_id, taxi in taxis_rango:
+        taxis_por_informe.setdefault(informe_id.lower(), []).append(taxi)
+
+    for rec in informes:
+        rec["taxis"] = taxis_por_informe.get((rec.get("id") or "").lower(), [])
+    return informes
+
+
+def es_registro_borrado(rec: dict) -> bool:
+    """True si el registre d'una resposta delta indica un esborrat."""
+    return "$deletedEntity" in (rec.get("@odata.context") or "") or rec.get("reason") in ("deleted", "changed")
+
+
+# Mida de pàgina que demanam al servidor (Prefer: odata.maxpagesize)
+DV_PAGE_SIZE = 500
+
+# Crides concurrents per defecte (Dataverse en permet 52 per usuari)
+MAX_CONCURRENCIA = 6
+
+# -----------------------
+# Reintents i limitació de ritme
+# -----------------------
+# Dataverse aplica límits de protecció del servei (6000 peticions / 5 min per
+# usuari, 52 concurrents...) i respon 429 amb Retry-After quan es superen.
+MAX_INTENTOS = 6
+BACKOFF_BASE = 0.5      # segons
+BACKOFF_MAXIMO = 30     # segons
+MAX_ESPERA_RETRY_AFTER = 60  # segons
+TIMEOUT_HTTP = (10, 120)     # (connexió, lectura) en segons
+
+# Ritme màxim compartit per tot el procés (6000 / 300 s = 20 peticions/s)
+PETICIONS_PER_SEGON = 20
+RAFAGA_PETICIONS = 40
+
+# PATCH no hi és: cada escriptura canvia l'etag i sempre va amb If-Match, així
+# que repetir-ne una que ja havia entrat (resposta perduda) donaria un 412 fals.
+METODOS_IDEMPOTENTES = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+ESTADOS_REINTENTABLES = {502, 503, 504}
+
+
+def _segundos_retry_after(valor: str | None) -> float | None:
+    """Retry-After en segons (accepta segons o data HTTP); None si no n'hi ha."""
+    if not valor:
+        return None
+    try:
+        return min(max(float(valor), 0.0), MAX_ESPERA_RETRY_AFTER)
+    except ValueError:
+        try:
+            fecha = parsedate_to_datetime(valor)
+            return min(max(fecha.timestamp() - time.time(), 0.0), MAX_ESPERA_RETRY_AFTER)
+        except (TypeError, ValueError):
+            return None
+
+
+class PoliticaReintentos:
+    """
+    Backoff exponencial amb jitter: l'espera de l'intent n és un valor aleatori
+    entre 0 i min(maximo, base * 2^(n-1)). Si el servidor envia Retry-After,
+    s'espera com a mínim això (més un poc de jitter perquè les sessions no
+    tornin totes alhora).
+    """
+
+    def __init__(self, max_intentos: int = MAX_INTENTOS, base: float = BACKOFF_BASE, maximo: float = BACKOFF_MAXIMO):
+        self.max_intentos = max_intentos
+        self.base = base
+        self.maximo = maximo
+
+    def espera(self, intento: int, retry_after: str | None = None) -> float:
+        segundos = _segundos_retry_after(retry_after)
+        if segundos is not None:
+            return segundos + random.uniform(0, self.base)
+        return random.uniform(0, min(self.maximo, self.base * (2 ** (intento - 1))))
+
+
+class LimitadorRitmo:
+    """
+    Token bucket thread-safe: 'tasa' peticions per segon amb ràfegues de fins a
+    'capacidad'. pausar() atura tots els consumidors (p. ex. després d'un 429),
+    de manera que el procés sencer baixa el ritme en lloc de fallar.
+    """
+
+    def __init__(self, tasa: float, capacidad: int):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad)
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def _intentar(self) -> float:
+        """Pren un token si n'hi ha (retorna 0) o retorna quants segons cal esperar."""
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora < self._pausa_hasta:
+                return self._pausa_hasta - ahora
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.tasa
+
+    def adquirir(self):
+        while (espera := self._intentar()) > 0:
+            time.sleep(espera)
+
+    def pausar(self, segundos: float):
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+            self._tokens = 0.0
+            self._ultimo = self._pausa_hasta
+
+
+# Un limitador per entorn Dataverse, compartit per totes les sessions del procés
+_LIMITADORES_LOCK = threading.Lock()
+_LIMITADORES: dict[str, LimitadorRitmo] = {}
+
+
+def _limitador_para(api_base: str, tasa: float, capacidad: int) -> LimitadorRitmo:
+    with _LIMITADORES_LOCK:
+        lim = _LIMITADORES.get(api_base)
+        if lim is None:
+            lim = LimitadorRitmo(tasa, capacidad)
+            _LIMITADORES[api_base] = lim
+        return lim
+
+
+# -----------------------
+# Caché de lectures
+# -----------------------
+# Cada rerun de Streamlit torna a demanar el mateix informe/usuari; guardam les
+# respostes dels GET uns segons. Les escriptures del mateix client invaliden
+# tota l'entitat afectada.
+CACHE_TTL = 60                      # segons
+CACHE_MAX_ENTRADAS = 512
+CACHE_MAX_BYTES = 16 * 1024 * 1024  # mida total de les respostes guardades
+VALIDADORES_MAX = 256               # respostes amb ETag guardades per als GET condicionals
+
+
+def _entidad_de(endpoint: str) -> str:
+    """Entity set d'un endpoint: 'cr143_taxis(123)?$filter=...' → 'cr143_taxis'."""
+    ruta = endpoint.split("?", 1)[0].rstrip("/")
+    ruta = ruta.rsplit("/", 1)[-1]
+    return ruta.split("(", 1)[0]
+
+
+def _clave_cache(endpoint: str, params: dict | None) -> str:
+    if not params:
+        return endpoint
+    return endpoint + "|" + json.dumps(params, sort_keys=True, default=str)
+
+
+class CacheLecturas:
+    """
+    Caché LRU thread-safe de respostes GET (text JSON), amb TTL, límit
+    d'entrades i límit de memòria. Les claus s'agrupen per entitat perquè
+    invalidar(entitat) esborri totes les consultes d'aquella taula.
+    """
+
+    def __init__(self, ttl: float, max_entradas: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos: OrderedDict[str, tuple[float, str, str]] = OrderedDict()
+        self._bytes = 0
+        self._generaciones: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    def _quitar(self, clave: str):
+        _, _, texto = self._datos.pop(clave)
+        self._bytes -= len(texto)
+
+    def obtener(self, clave: str) -> str | None:
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    self._quitar(clave)
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return item[2]
+
+    def generacion(self, entidad: str) -> int:
+        """Comptador d'invalidacions de l'entitat (per detectar escriptures concurrents)."""
+        with self._lock:
+            return self._generaciones.get(entidad, 0)
+
+    def guardar(self, entidad: str, clave: str, texto: str, generacion: int | None = None):
+        """
+        Guarda la resposta. Si es passa la generació llegida abans de fer el GET
+        i l'entitat s'ha invalidat mentrestant, no es guarda (podria ser antiga).
+        """
+        if self.ttl <= 0 or len(texto) > self.max_bytes:
+            return
+        with self._lock:
+            if generacion is not None and self._generaciones.get(entidad, 0) != generacion:
+                return
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (time.monotonic() + self.ttl, entidad, texto)
+            self._bytes += len(texto)
+            while self._datos and (len(self._datos) > self.max_entradas or self._bytes > self.max_bytes):
+                self._quitar(next(iter(self._datos)))
+                self.expulsiones += 1
+
+    def invalidar(self, entidad: str | None = None):
+        """Esborra les entrades d'una entitat (o totes si entidad és None)."""
+        with self._lock:
+            claves = [k for k, (_, ent, _) in self._datos.items() if entidad is None or ent == entidad]
+            for k in claves:
+                self._quitar(k)
+            if entidad is None:
+                for ent in self._generaciones:
+                    self._generaciones[ent] += 1
+            else:
+                self._generaciones[entidad] = self._generaciones.get(entidad, 0) + 1
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "encerts": self.aciertos,
+                "errades": self.fallos,
+                "percentatge_encerts": round(100 * self.aciertos / total, 1) if total else 0.0,
+                "expulsions": self.expulsiones,
+                "invalidacions": self.invalidaciones,
+                "entrades": len(self._datos),
+                "bytes": self._bytes,
+            }
+
+
+# -----------------------
+# Llista d'esportistes compartida
+# -----------------------
+ROSTER_TTL = 600  # segons
+
+
+class RosterAlumnos:
+    """
+    Esportistes (nom → àlies) compartits per totes les sessions del procés.
+    - La primera càrrega baixa tota la taula; després, quan passa el TTL (o
+      amb forzar=True), només es baixen els registres amb modifiedon posterior
+      a l'últim vist, més la llista de noms per detectar baixes.
+    - 'version' augmenta cada vegada que el contingut canvia.
+    Si un refresc automàtic falla i ja hi ha dades, se serveixen les antigues.
+    """
+
+    def __init__(self, client: "DataverseClient", ttl: float = ROSTER_TTL):
+        self._client = client
+        self.ttl = ttl
+        self.version = 0
+        self._alumnos: dict[str, str] = {}
+        self._max_modificado = ""
+        self._actualizado = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self, forzar: bool = False) -> tuple[int, dict[str, str]]:
+        with self._lock:
+            caducat = not self._actualizado or time.monotonic() - self._actualizado > self.ttl
+            if forzar or caducat:
+                try:
+                    self._refrescar()
+                except Exception:
+                    if forzar or not self._actualizado:
+                        raise
+            return self.version, dict(self._alumnos)
+
+    def _refrescar(self):
+        if not self._max_modificado:
+            filas = self._client.get_alumnos()
+            nuevo = {f["nombre"]: f["alias"] for f in filas}
+        else:
+            filas = self._client.get_alumnos(modificados_desde=self._max_modificado)
+            nombres = self._client.get_nombres_alumnos()
+            nuevo = {n: a for n, a in self._alumnos.items() if n in nombres}
+            for f in filas:
+                nuevo[f["nombre"]] = f["alias"]
+            if set(nuevo) != nombres:
+                # Alguna cosa no quadra (p. ex. rellotge): recàrrega completa
+                filas = self._client.get_alumnos()
+                nuevo = {f["nombre"]: f["alias"] for f in filas}
+
+        modificados = [f["modifiedon"] for f in filas if f.get("modifiedon")]
+        if modificados:
+            self._max_modificado = max(modificados + [self._max_modificado])
+
+        if nuevo != self._alumnos:
+            self._alumnos = nuevo
+            self.version += 1
+        self._actualizado = time.monotonic()
+
+
+# Límit de Dataverse: 1000 operacions per $batch / changeset
+BATCH_MAX_OPERACIONES = 1000
+
+
+# -----------------------
+# Upsert per clau alternativa
+# -----------------------
+# PATCH entity(clau='valor') crea o actualitza en una sola crida. Les capçaleres
+# condicionals acoten el que es permet:
+#   "actualizar" → If-Match: *       (només si ja existeix; 404 si no)
+#   "crear"      → If-None-Match: *  (només si no existeix; 412 si ja hi és)
+#   "upsert"     → sense condició
+class ConflictoEscritura(RuntimeError):
+    """
+    L'escriptura no s'ha fet perquè no es complia la precondició (412): el
+    registre ja existia, no existia, o algú l'ha modificat des que es va llegir
+    (If-Match amb l'ETag de la lectura).
+    """
+
+
+def _valor_clave(v: str) -> str:
+    return "'" + quote(str(v).replace("'", "''"), safe="") + "'"
+
+
+def _segmento_clave(claves: dict[str, str]) -> str:
+    return ",".join(f"{campo}={_valor_clave(valor)}" for campo, valor in claves.items())
+
+
+def _id_de_respuesta(r, campo_id: str | None = None) -> str | None:
+    """
+    Id del registre escrit: del cos (Prefer: return=representation) si hi és,
+    o de la capçalera OData-EntityId (o Location).
+    """
+    if campo_id and r.text:
+        try:
+            rec_id = r.json().get(campo_id)
+        except ValueError:
+            rec_id = None
+        if rec_id:
+            return rec_id
+    location = r.headers.get("OData-EntityId") or r.headers.get("Location")
+    if location and "(" in location and ")" in location:
+        return location.rsplit("(", 1)[1].split(")")[0]
+    return None
+
+
+def _etag_de_respuesta(r) -> str | None:
+    """ETag del registre: @odata.etag del cos o capçalera ETag."""
+    if r.text:
+        try:
+            etag = r.json().get("@odata.etag")
+        except ValueError:
+            etag = None
+        if etag:
+            return etag
+    return r.headers.get("ETag")
+
+
+def _error_odata(r) -> tuple[str, str]:
+    """(code, message) de l'error OData del cos de la resposta ("" si no n'hi ha)."""
+    try:
+        error = (r.json() or {}).get("error") or {}
+    except (ValueError, AttributeError):
+        return "", ""
+    return str(error.get("code") or ""), str(error.get("message") or "")
+
+
+# Errors de Dataverse quan la taula no té (o encara no té activa) la clau
+# alternativa de la URL: 0x80060888 = segment de clau que no encaixa amb cap clau.
+CODIGOS_SIN_CLAVE_ALTERNATIVA = {"0x80060888"}
+
+
+def _falta_clave_alternativa(r) -> bool:
+    codigo, mensaje = _error_odata(r)
+    if codigo.lower() in CODIGOS_SIN_CLAVE_ALTERNATIVA:
+        return True
+    mensaje = mensaje.lower()
+    return "key" in mensaje and any(t in mensaje for t in ("not defined", "not active", "inactive", "invalid key"))
+
+
+class DeltaCaducado(RuntimeError):
+    """
+    Dataverse ja no accepta el deltaLink (410 o token de canvis caducat/invàlid):
+    cal tornar a fer la càrrega inicial de la taula.
+    """
+
+
+def _delta_caducado(r) -> bool:
+    if r.status_code == 410:
+        return True
+    if r.status_code != 400:
+        return False
+    mensaje = _error_odata(r)[1].lower()
+    return "token" in mensaje and ("expired" in mensaje or "invalid" in mensaje)
+
+
+def _con_select(endpoint: str, select: list[str] | str) -> str:
+    if not isinstance(select, str):
+        select = ",".join(select)
+    return f"{endpoint}{'&' if '?' in endpoint else '?'}$select={select}"
+
+
+PREFER_REPRESENTACION = {"Prefer": "return=representation"}
+
+# Camp id de cada taula d'informes
+ID_INFORME_GENERAL = "cr143_informegeneralid"
+ID_INFORME_INDIVIDUAL = "cr143_informeindividualsid"
+
+
+def _crear_sesion_http(pool_connections: int, pool_maxsize: int) -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=False,
+    )
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return s
+
+
+class DataverseClient:
+    def __init__(self, cfg):
+        self.tenant_id = cfg["tenant_id"]
+        self.client_id = cfg["client_id"]
+        self.client_secret = cfg["client_secret"]
+        self.resource = cfg["resource"]
+        self.api_base = cfg["api_base"]
+        self.authority_host = (cfg.get("authority_host") or "https://login.microsoftonline.com").rstrip("/")
+
+        self.entity_informes = cfg["informes_entity_set"]
+        self.entity_taxis = cfg["taxis_entity_set"]
+        self.entity_indiv = cfg["informes_ind_entity_set"]
+        self.entity_usuarios = cfg["usuarios_entity_set"]
+        self.entity_alumnos = cfg["alumnos_entity_set"]
+
+        # Opcional: fitxer on persistir el token entre reinicis del procés
+        self.token_cache_path: str | None = cfg.get("token_cache_path") or None
+        self._token_key = _token_cache_key(self.tenant_id, self.client_id, self.resource)
+
+        self.reintentos = PoliticaReintentos(
+            max_intentos=int(cfg.get("max_intentos") or MAX_INTENTOS),
+        )
+        self._limitador = _limitador_para(
+            self.api_base,
+            float(cfg.get("peticions_per_segon") or PETICIONS_PER_SEGON),
+            int(cfg.get("rafaga_peticions") or RAFAGA_PETICIONS),
+        )
+
+        # Caché de lectures (el client és únic per procés: la comparteixen totes les sessions)
+        self.cache = CacheLecturas(
+            ttl=float(cfg.get("cache_ttl") or CACHE_TTL),
+            max_entradas=int(cfg.get("cache_max_entradas") or CACHE_MAX_ENTRADAS),
+            max_bytes=int(cfg.get("cache_max_bytes") or CACHE_MAX_BYTES),
+        )
+
+        # Esportistes compartits per totes les sessions
+        self.roster = RosterAlumnos(self, ttl=float(cfg.get("roster_ttl") or ROSTER_TTL))
+
+        # Upsert per clau alternativa (cr143_codigofecha, cr143_codigofecha+cr143_alumne).
+        # Si la taula no en té, la primera crida falla i es recorda per no tornar-ho a provar.
+        self.usar_claves_alternativas = bool(cfg.get("claves_alternativas", True))
+        self._sin_clave_alternativa: set[str] = set()
+
+        # GET condicionals: darrera resposta amb ETag de cada consulta
+        self._validadores: OrderedDict[str, tuple[str, str, Any]] = OrderedDict()
+        self._validadores_lock = threading.Lock()
+        self.respuestas_304 = 0
+        # Id ja conegut de l'informe de cada data (i alumne): els formularis el
+        # rellegeixen per id, que és la lectura que torna ETag i permet el 304
+        self._ids_informes: OrderedDict[tuple, str] = OrderedDict()
+
+        # Fils màxims per a les crides concurrents (ejecutar_en_paralelo)
+        self.max_concurrencia = int(cfg.get("max_concurrencia") or MAX_CONCURRENCIA)
+
+        self._session = _crear_sesion_http(
+            int(cfg.get("http_pool_connections") or HTTP_POOL_CONNECTIONS),
+            int(cfg.get("http_pool_maxsize") or HTTP_POOL_MAXSIZE),
+        )
+
+    # ----------------------------------------------
+    # Token OAuth
+    # ----------------------------------------------
+    def _solicitar_token(self) -> dict:
+        url = f"{self.authority_host}/{self.tenant_id}/oauth2/v2.0/token"
+        data = {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "scope": f"{self.resource}/.default",
+            "grant_type": "client_credentials",
+        }
+
+        resp = self._session.post(url, data=data)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Error obtenint token OAuth: {resp.status_code} - {resp.text}")
+
+        body = resp.json()
+        expires_in = int(body.get("expires_in") or 3599)
+        return {
+            "access_token": body["access_token"],
+            "expires_at": time.time() + expires_in,
+        }
+
+    def _get_token(self) -> str:
+        rec = _TOKEN_CACHE.get(self._token_key)
+        if _token_vigente(rec):
+            return rec["access_token"]
+
+        with _TOKEN_LOCK:
+            # Una altra sessió pot haver-lo renovat mentre esperàvem el lock
+            rec = _TOKEN_CACHE.get(self._token_key)
+            if _token_vigente(rec):
+                return rec["access_token"]
+
+            if self.token_cache_path:
+                rec = _leer_tokens_disco(self.token_cache_path).get(self._token_key)
+                if _token_vigente(rec):
+                    _TOKEN_CACHE[self._token_key] = rec
+                    return rec["access_token"]
+
+            rec = self._solicitar_token()
+            _TOKEN_CACHE[self._token_key] = rec
+            if self.token_cache_path:
+                _guardar_token_disco(self.token_cache_path, self._token_key, rec)
+            return rec["access_token"]
+
+    def invalidar_token(self):
+        """Descarta el token en memòria (p. ex. després d'un 401 del servidor)."""
+        with _TOKEN_LOCK:
+            _TOKEN_CACHE.pop(self._token_key, None)
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self._get_token()}",
+            "Content-Type": "application/json; charset=utf-8",
+            "Accept": "application/json",
+            "OData-MaxVersion": "4.0",
+            "OData-Version": "4.0",
+        }
+
+    # ----------------------------------------------
+    # Helpers HTTP
+    # ----------------------------------------------
+    def _request(self, method: str, endpoint: str, headers: dict | None = None, **kwargs):
+        """
+        Fa la crida HTTP passant pel limitador de ritme compartit.
+        - 401 (token revocat o caducat abans d'hora): renovam el token i repetim una vegada.
+        - 429 i 502/503/504: reintents amb backoff exponencial + jitter respectant
+          Retry-After (vegeu PoliticaReintentos); errors de connexió, igual,
+          però només en mètodes idempotents.
+        """
+        # els @odata.nextLink ja són URL absolutes
+        if endpoint.startswith(("https://", "http://")):
+            url = endpoint
+        else:
+            url = f"{self.api_base}/{endpoint}"
+
+        def _hdrs() -> dict:
+            h = self._headers()
+            if headers:
+                h.update(headers)
+            return h
+
+        kwargs.setdefault("timeout", TIMEOUT_HTTP)
+        idempotente = method.upper() in METODOS_IDEMPOTENTES
+        token_renovado = False
+        intento = 0
+
+        while True:
+            intento += 1
+            self._limitador.adquirir()
+            try:
+                r = self._session.request(method, url, headers=_hdrs(), **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                # Un POST pot haver arribat al servidor: no el repetim
+                if not idempotente or intento >= self.reintentos.max_intentos:
+                    raise
+                time.sleep(self.reintentos.espera(intento))
+                continue
+
+            if r.status_code == 401 and not token_renovado:
+                token_renovado = True
+                self.invalidar_token()
+                intento -= 1
+                continue
+
+            # 429: el servidor no ha processat la petició, es pot repetir sempre.
+            # 502/503/504: només si la petició és idempotent.
+            reintentable = r.status_code == 429 or (idempotente and r.status_code in ESTADOS_REINTENTABLES)
+            if not reintentable or intento >= self.reintentos.max_intentos:
+                return r
+
+            espera = self.reintentos.espera(intento, r.headers.get("Retry-After"))
+            if r.status_code == 429:
+                # Tot el procés frena, no només aquest fil
+                self._limitador.pausar(espera)
+            else:
+                time.sleep(espera)
+
+    def estadisticas_pool(self) -> dict:
+        """
+        Estat dels pools de connexions de la sessió HTTP, per comprovar que les
+        connexions es reutilitzen: 'connexions' són les obertes (TCP+TLS) i
+        'peticions' les fetes; si peticions >> connexions, el keep-alive funciona.
+        """
+        res = {"connexions": 0, "peticions": 0, "reutilitzades": 0, "hosts": {}}
+        seen = set()
+        for adapter in self._session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}"
+                res["hosts"][host] = {
+                    "connexions": pool.num_connections,
+                    "peticions": pool.num_requests,
+                    "lliures": pool.pool.qsize() if pool.pool is not None else 0,
+                }
+                res["connexions"] += pool.num_connections
+                res["peticions"] += pool.num_requests
+        res["reutilitzades"] = max(res["peticions"] - res["connexions"], 0)
+        return res
+
+    def get(self, endpoint: str, params: dict | None = None, usar_cache: bool = True):
+        """
+        GET amb caché de lectura (vegeu CacheLecturas). usar_cache=False força
+        anar al servidor, p. ex. quan la resposta decideix una escriptura.
+        """
+        entidad = _entidad_de(endpoint)
+        clave = _clave_cache(endpoint, params)
+        if usar_cache:
+            texto = self.cache.obtener(clave)
+            if texto is not None:
+                return json.loads(texto) if texto else None
+        generacion = self.cache.generacion(entidad)
+
+        # Si tenim l'ETag de la darrera resposta, GET condicional: un 304 no porta
+        # cos i reaprofitam el JSON ja parsejat (no el modifiqueu).
+        with self._validadores_lock:
+            validador = self._validadores.get(clave)
+        headers = {"If-None-Match": validador[0]} if validador else None
+
+        r = self._request("GET", endpoint, headers=headers, params=params)
+        if r.status_code == 304 and validador:
+            with self._validadores_lock:
+                self.respuestas_304 += 1
+                if clave in self._validadores:
+                    self._validadores.move_to_end(clave)
+            self.cache.guardar(entidad, clave, validador[1], generacion)
+            return validador[2]
+        if r.status_code not in (200, 204):
+            raise RuntimeError(f"GET {endpoint} → {r.status_code}: {r.text}")
+        self.cache.guardar(entidad, clave, r.text or "", generacion)
+        if not r.text:
+            return None
+        datos = r.json()
+
+        # Dataverse només torna ETag a les lectures d'un sol registre
+        etag = r.headers.get("ETag")
+        if etag:
+            with self._validadores_lock:
+                self._validadores[clave] = (etag, r.text, datos)
+                self._validadores.move_to_end(clave)
+                while len(self._validadores) > VALIDADORES_MAX:
+                    self._validadores.popitem(last=False)
+        return datos
+
+    def post(self, endpoint: str, payload: dict, select: list[str] | str | None = None):
+        """
+        POST d'un registre nou. Amb select, demana Prefer: return=representation
+        i el servidor torna el registre creat (aquests camps) al cos de la resposta:
+        r.json() té l'id i els camps calculats sense haver de tornar a llegir.
+        """
+        headers = None
+        if select:
+            endpoint = _con_select(endpoint, select)
+            headers = PREFER_REPRESENTACION
+        r = self._request("POST", endpoint, headers=headers, data=json.dumps(payload))
+        self.cache.invalidar(_entidad_de(endpoint))
+        if r.status_code not in (200, 201, 204):
+            raise RuntimeError(f"POST {endpoint} → {r.status_code}: {r.text}")
+        return r
+
+    def patch(self, endpoint: str, payload: dict, etag: str | None = None, headers: dict | None = None):
+        """
+        PATCH sempre condicional: If-Match amb l'etag llegit, o * per com a
+        mínim no crear un registre nou si l'id ja no existeix (PATCH fa upsert).
+        """
+        headers = {"If-Match": etag or "*", **(headers or {})}
+        r = self._request("PATCH", endpoint, headers=headers, data=json.dumps(payload))
+        self.cache.invalidar(_entidad_de(endpoint))
+        if r.status_code == 412:
+            raise ConflictoEscritura(f"PATCH {endpoint} → 412: {r.text}")
+        if r.status_code not in (200, 204):
+            raise RuntimeError(f"PATCH {endpoint} → {r.status_code}: {r.text}")
+        return r
+
+    def delete(self, endpoint: str, etag: str | None = None):
+        r = self._request("DELETE", endpoint, headers={"If-Match": etag} if etag else None)
+        self.cache.invalidar(_entidad_de(endpoint))
+        if r.status_code == 412:
+            raise ConflictoEscritura(f"DELETE {endpoint} → 412: el registre ha canviat des que es va llegir")
+        if r.status_code not in (200, 204):
+            raise RuntimeError(f"DELETE {endpoint} → {r.status_code}: {r.text}")
+        return r
+
+    def estadisticas_cache(self) -> dict:
+        """Encerts, errades, expulsions i mida de la caché de lectures (i 304 rebuts)."""
+        return {**self.cache.estadisticas(), "respostes_304": self.respuestas_304}
+
+    # ----------------------------------------------
+    # Crides concurrents
+    # ----------------------------------------------
+    def ejecutar_en_paralelo(self, tareas: list[Callable[[], Any]], max_workers: int | None = None) -> list:
+        """
+        Executa les tasques (funcions sense arguments que fan crides al client)
+        en un pool de fils limitat i retorna els resultats en el mateix ordre.
+        Si alguna falla, es propaga la primera excepció (per ordre).
+        Les tasques no han de cridar st.*: s'executen fora del fil de Streamlit.
+        """
+        if not tareas:
+            return []
+        workers = max(1, min(max_workers or self.max_concurrencia, len(tareas)))
+        if workers == 1:
+            return [t() for t in tareas]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dataverse") as ex:
+            return list(ex.map(lambda t: t(), tareas))
+
+    def get_en_paralelo(self, endpoints: list[str], max_workers: int | None = None) -> list:
+        """GET de diversos endpoints independents alhora; resultats en el mateix ordre."""
+        return self.ejecutar_en_paralelo(
+            [lambda e=e: self.get(e) for e in endpoints],
+            max_workers=max_workers,
+        )
+
+    # ----------------------------------------------
+    # Paginació (@odata.nextLink)
+    # ----------------------------------------------
+    def iter_paginas(self, endpoint: str, params: dict | None = None, page_size: int | None = None) -> Iterator[list[dict]]:
+        """
+        Genera les pàgines ("value") d'una consulta seguint @odata.nextLink.
+        Demana la mida de pàgina amb Prefer: odata.maxpagesize; les pàgines es
+        descarreguen només quan el consumidor les demana.
+        """
+        headers = {"Prefer": f"odata.maxpagesize={page_size or DV_PAGE_SIZE}"}
+        url = endpoint
+        while url:
+            r = self._request("GET", url, headers=headers, params=params)
+            if r.status_code not in (200, 204):
+                raise RuntimeError(f"GET {url} → {r.status_code}: {r.text}")
+            if not r.text:
+                return
+            data = r.json()
+            yield data.get("value", []) or []
+
+            # el nextLink ja porta tots els paràmetres (inclòs $skiptoken)
+            url = data.get("@odata.nextLink")
+            params = None
+
+    def iter_registros(self, endpoint: str, params: dict | None = None, page_size: int | None = None) -> Iterator[dict]:
+        """Com iter_paginas, però registre a registre."""
+        for pagina in self.iter_paginas(endpoint, params=params, page_size=page_size):
+            yield from pagina
+
+    def iter_paginas_cambios(self, endpoint: str, page_size: int | None = None) -> Iterator[tuple[list[dict], str | None]]:
+        """
+        Change tracking de Dataverse. Amb un endpoint normal fa la càrrega
+        inicial (Prefer: odata.track-changes); amb un @odata.deltaLink retorna
+        només els canvis des d'aleshores. Genera (registres, delta_link): el
+        delta_link només ve a la darrera pàgina i és el que s'ha de guardar per
+        a la propera sincronització. Els registres esborrats arriben com
+        {"id": ..., "reason": "deleted"} (vegeu es_registro_borrado).
+        DeltaCaducado si el deltaLink ja no val; la resta d'errors, RuntimeError.
+        """
+        headers = {"Prefer": f"odata.track-changes,odata.maxpagesize={page_size or DV_PAGE_SIZE}"}
+        url = endpoint
+        while url:
+            r = self._request("GET", url, headers=headers)
+            if _delta_caducado(r):
+                raise DeltaCaducado(f"GET {url} → {r.status_code}: {r.text}")
+            if r.status_code not in (200, 204):
+                raise RuntimeError(f"GET {url} → {r.status_code}: {r.text}")
+            if not r.text:
+                return
+            data = r.json()
+            delta_link = data.get("@odata.deltaLink")
+            yield (data.get("value", []) or [], delta_link)
+            url = data.get("@odata.nextLink")
+
+    # ----------------------------------------------
+    # OData $batch
+    # ----------------------------------------------
+    def _cuerpo_batch(self, operaciones: list[tuple], batch_id: str, changeset_id: str) -> str:
+        lineas = [
+            f"--{batch_id}",
+            f"Content-Type: multipart/mixed; boundary={changeset_id}",
+            "",
+        ]
+        for i, op in enumerate(operaciones, start=1):
+            metodo, endpoint, payload = op[:3]
+            extra = op[3] if len(op) > 3 and op[3] else {}
+            # Les parts sense cos (DELETE) no porten ni cos ni Content-Type
+            lineas += [
+                f"--{changeset_id}",
+                "Content-Type: application/http",
+                "Content-Transfer-Encoding: binary",
+                f"Content-ID: {i}",
+                "",
+                f"{metodo} {self.api_base}/{endpoint} HTTP/1.1",
+                *(["Content-Type: application/json; type=entry"] if payload is not None else []),
+                *(f"{k}: {v}" for k, v in extra.items()),
+                "",
+                json.dumps(payload) if payload is not None else "",
+            ]
+        lineas += [f"--{changeset_id}--", f"--{batch_id}--", ""]
+        return "\r\n".join(lineas)
+
+    def batch(self, operaciones: list[tuple], max_por_changeset: int | None = None):
+        """
+        Envia les operacions (metodo, endpoint, payload[, capçaleres]) en $batch,
+        cadascuna dins un changeset: o s'apliquen totes o cap. Si n'hi ha més que el
+        límit de Dataverse per changeset, es parteixen en diversos $batch
+        consecutius (cada tros és atòmic per si mateix, i l'ordre es manté).
+        """
+        if not operaciones:
+            return
+        limite = max_por_changeset or BATCH_MAX_OPERACIONES
+
+        for inicio in range(0, len(operaciones), limite):
+            trozo = operaciones[inicio:inicio + limite]
+            batch_id = f"batch_{uuid.uuid4().hex}"
+            changeset_id = f"changeset_{uuid.uuid4().hex}"
+            cuerpo = self._cuerpo_batch(trozo, batch_id, changeset_id)
+
+            r = self._request(
+                "POST",
+                "$batch",
+                headers={
+                    "Content-Type": f"multipart/mixed; boundary={batch_id}",
+                    "Accept": "application/json",
+                },
+                data=cuerpo.encode("utf-8"),
+            )
+            # Invalidam abans de mirar el resultat: un error pot ser parcial
+            for op in trozo:
+                self.cache.invalidar(_entidad_de(op[1]))
+
+            if r.status_code not in (200, 202):
+                raise RuntimeError(f"POST $batch → {r.status_code}: {r.text}")
+
+            # Cada resposta interna porta la seva línia d'estat HTTP
+            errores = [
+                int(m) for m in re.findall(r"^HTTP/1\.1 (\d{3})", r.text or "", flags=re.MULTILINE)
+                if int(m) >= 400
+            ]
+            if 412 in errores:
+                raise ConflictoEscritura(f"POST $batch → 412 dins el changeset: algun registre ha canviat")
+            if errores:
+                raise RuntimeError(f"POST $batch → error {errores[0]} dins el changeset: {r.text}")
+
+    # =========================================================
+    # 🔶 CONSULTES (endpoints)
+    # =========================================================
+    def _ep_informe_general(self, fecha_iso: str) -> str:
+        fecha_esc = fecha_iso.replace("'", "''")
+        return f"{self.entity_informes}?$filter=cr143_codigofecha eq '{fecha_esc}'"
+
+    def _ep_taxis_informe(self, informe_id: str) -> str:
+        return f"{self.entity_taxis}?$filter=_cr143_informegeneral_value eq {informe_id}"
+
+    def _ep_taxis_rango(self, desde_iso: str, hasta_iso: str) -> str:
+        desde_esc = desde_iso.replace("'", "''")
+        hasta_esc = hasta_iso.replace("'", "''")
+        filtro = (
+            f"cr143_Informegeneral/cr143_codigofecha ge '{desde_esc}'"
+            f" and cr143_Informegeneral/cr143_codigofecha le '{hasta_esc}'"
+        )
+        select = ",".join(("cr143_taxiid", "_cr143_informegeneral_value") + TAXI_CAMPOS)
+        return (
+            f"{self.entity_taxis}"
+            f"?$filter={filtro}"
+            f"&$select={select}"
+            f"&$orderby=cr143_fecha asc,cr143_hora asc"
+        )
+
+    def _ep_taxis_servicio_rango(self, desde_iso: str, hasta_iso: str) -> str:
+        # cr143_fecha és una data (sense cometes); es valida perquè va dins el filtre
+        desde = date.fromisoformat(desde_iso).isoformat()
+        hasta = date.fromisoformat(hasta_iso).isoformat()
+        select = ",".join(("cr143_taxiid",) + TAXI_CAMPOS)
+        return (
+            f"{self.entity_taxis}"
+            f"?$filter=cr143_fecha ge {desde} and cr143_fecha le {hasta}"
+            f"&$select={select}"
+            f"&$expand=cr143_Informegeneral($select=cr143_codigofecha)"
+            f"&$orderby=cr143_fecha asc,cr143_hora asc"
+        )
+
+    def _ep_informe_individual(self, fecha_iso: str, alumno: str) -> str:
+        fecha_esc = fecha_iso.replace("'", "''")
+        alumno_esc = alumno.replace("'", "''")
+        filtro = f"cr143_codigofecha eq '{fecha_esc}' and cr143_alumne eq '{alumno_esc}'"
+        return f"{self.entity_indiv}?$filter={filtro}"
+
+    def _ep_individuales_alumno(self, alumno: str) -> str:
+        alumno_esc = alumno.replace("'", "''")
+        filtro = f"cr143_alumne eq '{alumno_esc}'"
+        return f"{self.entity_indiv}?$filter={filtro}&$orderby=cr143_fechainforme desc"
+
+    def _ep_individuales_rango(self, alumno: str, desde_iso: str, hasta_iso: str) -> str:
+        alumno_esc = alumno.replace("'", "''")
+        desde_esc = desde_iso.replace("'", "''")
+        hasta_esc = hasta_iso.replace("'", "''")
+        filtro = (
+            f"cr143_alumne eq '{alumno_esc}'"
+            f" and cr143_codigofecha ge '{desde_esc}' and cr143_codigofecha le '{hasta_esc}'"
+        )
+        return (
+            f"{self.entity_indiv}"
+            f"?$filter={filtro}"
+            f"&$orderby=cr143_fechainforme desc"
+            f"&$select=cr143_fechainforme,cr143_congingut"
+        )
+
+    def _ep_alumnos_con_informe(self, fecha_iso: str) -> str:
+        fecha_esc = fecha_iso.replace("'", "''")
+        return f"{self.entity_indiv}?$filter=cr143_codigofecha eq '{fecha_esc}'&$select=cr143_alumne"
+
+    def _ep_generales_rango(self, desde_iso: str, hasta_iso: str) -> str:
+        desde_esc = desde_iso.replace("'", "''")
+        hasta_esc = hasta_iso.replace("'", "''")
+        filtro = f"cr143_codigofecha ge '{desde_esc}' and cr143_codigofecha le '{hasta_esc}'"
+        return (
+            f"{self.entity_informes}"
+            f"?$filter={filtro}"
+            f"&$orderby=cr143_codigofecha asc"
+            f"&$select={INFORME_GENERAL_SELECT}"
+        )
+
+    def _ep_generales_todos(self) -> str:
+        return (
+            f"{self.entity_informes}"
+            f"?$orderby=cr143_codigofecha desc"
+            f"&$select={INFORME_GENERAL_SELECT}"
+        )
+
+    def _ep_generales_con_texto(self, terminos: list[str]) -> str:
+        # contains() de Dataverse no distingeix majúscules (com extraer_menciones_de)
+        condiciones = []
+        for termino in terminos:
+            termino_esc = termino.replace("'", "''")
+            condiciones += [f"contains({campo},'{termino_esc}')" for campo in INFORME_GENERAL_CAMPOS_TEXTO]
+        return (
+            f"{self.entity_informes}"
+            f"?$filter={' or '.join(condiciones)}"
+            f"&$orderby=cr143_codigofecha desc"
+            f"&$select={INFORME_GENERAL_SELECT}"
+        )
+
+    # =========================================================
+    # 🔶 ESCRIPTURA PER CLAU (upsert en una crida, concurrència amb ETag)
+    # =========================================================
+    def upsert_por_clave(self, entity: str, claves: dict[str, str], payload: dict, campo_id: str,
+                         rec_id: str | None = None, etag: str | None = None,
+                         modo: str = "upsert") -> dict | None:
+        """
+        Crea o actualitza un registre amb un sol PATCH. Retorna {"id", "etag"}
+        del registre ja escrit (Prefer: return=representation).
+        - Amb rec_id (el formulari ja el coneix): PATCH entity(id) + If-Match amb
+          l'etag llegit (o * si no en tenim). Si un altre usuari l'ha modificat
+          després de llegir-lo → ConflictoEscritura. Si s'ha esborrat (404), es
+          torna a crear per clau.
+        - Sense rec_id: PATCH entity(clau alternativa) segons 'modo' (vegeu
+          ConflictoEscritura). Retorna None si la taula no té clau alternativa;
+          llavors el cridador ha de fer-ho a l'antiga (GET + PATCH/POST).
+        """
+        if rec_id:
+            endpoint = f"{entity}({rec_id})"
+            headers = {"If-Match": etag or "*", **PREFER_REPRESENTACION}
+            r = self._request("PATCH", _con_select(endpoint, campo_id), headers=headers, data=json.dumps(payload))
+            self.cache.invalidar(entity)
+            if r.status_code in (200, 204):
+                return {"id": rec_id, "etag": _etag_de_respuesta(r)}
+            if r.status_code == 412:
+                raise ConflictoEscritura(f"PATCH {endpoint} → 412: el registre ha canviat des que es va llegir")
+            if r.status_code != 404:
+                raise RuntimeError(f"PATCH {endpoint} → {r.status_code}: {r.text}")
+
+        if not self.usar_claves_alternativas or entity in self._sin_clave_alternativa:
+            return None
+
+        headers = {}
+        if modo == "actualizar":
+            headers["If-Match"] = "*"
+        elif modo == "crear":
+            headers["If-None-Match"] = "*"
+
+        # L'id torna al cos de la resposta (també si el PATCH ha creat el registre)
+        headers.update(PREFER_REPRESENTACION)
+        endpoint = f"{entity}({_segmento_clave(claves)})"
+        r = self._request("PATCH", _con_select(endpoint, campo_id), headers=headers, data=json.dumps(payload))
+        self.cache.invalidar(entity)
+        # 201 si el PATCH ha creat el registre (amb return=representation)
+        if r.status_code in (200, 201, 204):
+            nuevo_id = _id_de_respuesta(r, campo_id)
+            if not nuevo_id:
+                raise RuntimeError(f"PATCH {endpoint} → {r.status_code} sense id del registre")
+            return {"id": nuevo_id, "etag": _etag_de_respuesta(r)}
+        if r.status_code == 412 or (r.status_code == 404 and modo == "actualizar"):
+            raise ConflictoEscritura(f"PATCH {endpoint} → {r.status_code}: {r.text}")
+        if r.status_code in (400, 404) and _falta_clave_alternativa(r):
+            # Clau alternativa no definida (o no activa encara) en aquesta taula
+            self._sin_clave_alternativa.add(entity)
+            return None
+        raise RuntimeError(f"PATCH {endpoint} → {r.status_code}: {r.text}")
+
+    def _crear(self, entity: str, payload: dict, campo_id: str) -> dict:
+        """POST amb return=representation; l'id ve a la resposta o és un error."""
+        r = self.post(entity, payload, select=[campo_id])
+        rec_id = _id_de_respuesta(r, campo_id)
+        if not rec_id:
+            raise RuntimeError(f"POST {entity} → {r.status_code} sense id del registre creat")
+        return {"id": rec_id, "etag": _etag_de_respuesta(r)}
+
+    # =========================================================
+    # 🔶 USUARIOS
+    # =========================================================
+    def _get_usuario_registro(self, usuario_login: str) -> dict | None:
+        usuario_esc = usuario_login.replace("'", "''")
+        filtro = f"{USU_LOGIN_FIELD} eq '{usuario_esc}'"
+        endpoint = f"{self.entity_usuarios}?$filter={filtro}"
+        data = self.get(endpoint)
+        if not data or not data.get("value"):
+            return None
+        return data["value"][0]
+
+    def get_usuario_hash(self, usuario_login: str) -> str | None:
+        rec = self._get_usuario_registro(usuario_login)
+        if not rec:
+            return None
+        return rec.get("cr143_passwordhash")
+
+    def set_usuario_hash(self, usuario_login: str, password_hash: str):
+        usuario_esc = usuario_login.replace("'", "''")
+        filtro = f"{USU_LOGIN_FIELD} eq '{usuario_esc}'"
+        endpoint = f"{self.entity_usuarios}?$filter={filtro}"
+        data = self.get(endpoint, usar_cache=False)
+
+        payload = {
+            USU_LOGIN_FIELD: usuario_login,
+            "cr143_passwordhash": password_hash,
+        }
+
+        if data and data.get("value"):
+            rec_id = data["value"][0]["cr143_usuarisaplicacioid"]
+            self.patch(f"{self.entity_usuarios}({rec_id})", payload)
+        else:
+            self.post(self.entity_usuarios, payload)
+
+    def get_usuario_nombre_visible(self, usuario_login: str) -> str | None:
+        rec = self._get_usuario_registro(usuario_login)
+        if not rec:
+            return None
+        return (rec.get(USU_NAME_FIELD) or "").strip()
+
+    # =========================================================
+    # 🔶 INFORME GENERAL
+    # =========================================================
+    def _recordar_id(self, clave: tuple, rec_id: str | None) -> None:
+        with self._validadores_lock:
+            if not rec_id:
+                self._ids_informes.pop(clave, None)
+                return
+            self._ids_informes[clave] = rec_id
+            self._ids_informes.move_to_end(clave)
+            while len(self._ids_informes) > VALIDADORES_MAX:
+                self._ids_informes.popitem(last=False)
+
+    def _id_conegut(self, clave: tuple) -> str | None:
+        with self._validadores_lock:
+            return self._ids_informes.get(clave)
+
+    def get_informe_general(self, fecha_iso: str) -> dict | None:
+        # Amb l'id ja conegut, lectura per id (GET condicional → 304 si no ha canviat)
+        clave = ("general", fecha_iso)
+        rec_id = self._id_conegut(clave)
+        if rec_id:
+            informe = self.get_informe_general_por_id(rec_id, usar_cache=True)
+            if informe and informe.pop("fecha") == fecha_iso:
+                return informe
+            self._recordar_id(clave, None)
+
+        data = self.get(self._ep_informe_general(fecha_iso))
+        if not data or not data.get("value"):
+            return None
+
+        rec = data["value"][0]
+        self._recordar_id(clave, rec.get("cr143_informegeneralid"))
+        return {
+            "id": rec.get("cr143_informegeneralid"),
+            "etag": rec.get("@odata.etag"),
+            "cuidador": rec.get("cr143_cuidador") or "",
+            "entradas": rec.get("cr143_informedeldia") or "",
+            "mantenimiento": rec.get("cr143_notesdireccio") or "",
+            "temas": rec.get("cr143_picnics") or "",
+        }
+
+    def get_informe_general_por_id(self, rec_id: str, usar_cache: bool = False) -> dict | None:
+        """
+        Lectura d'un sol registre (amb ETag → GET condicional, 304 si no ha canviat).
+        Per defecte va sempre al servidor: la vista de conflicte necessita l'estat real.
+        """
+        endpoint = f"{self.entity_informes}({rec_id})?$select={INFORME_GENERAL_SELECT}"
+        try:
+            rec = self.get(endpoint, usar_cache=usar_cache)
+        except RuntimeError as e:
+            if "→ 404" in str(e):
+                return None
+            raise
+        if not rec:
+            return None
+        return {
+            **_informe_general_desde_dv(rec),
+            "etag": rec.get("@odata.etag"),
+        }
+
+    def upsert_informe_general(self, fecha_iso: str, cuidador: str, entradas: str, mantenimiento: str, temas: str,
+                               rec_id: str | None = None) -> str:
+        return self.guardar_informe_general(fecha_iso, cuidador, entradas, mantenimiento, temas, rec_id=rec_id)["id"]
+
+    def guardar_informe_general(self, fecha_iso: str, cuidador: str, entradas: str, mantenimiento: str, temas: str,
+                                rec_id: str | None = None, etag: str | None = None) -> dict:
+        """
+        Com upsert_informe_general, però amb l'etag de la lectura (If-Match) i
+        retorna {"id", "etag"} del registre desat. ConflictoEscritura si algú
+        l'ha modificat entremig. Sense rec_id (el formulari no l'ha trobat en
+        carregar) només es crea: si mentrestant un altre usuari ja l'ha creat,
+        també és ConflictoEscritura (If-None-Match: *), no una sobrescriptura.
+        """
+        fecha_date = datetime.strptime(fecha_iso, "%Y-%m-%d").date().isoformat()
+
+        payload = {
+            "cr143_fechainforme": fecha_date,
+            "cr143_codigofecha": fecha_iso,
+            "cr143_cuidador": cuidador or "",
+            "cr143_informedeldia": entradas or "",
+            "cr143_notesdireccio": mantenimiento or "",
+            "cr143_picnics": temas or "",
+        }
+
+        desat = self.upsert_por_clave(
+            self.entity_informes, {"cr143_codigofecha": fecha_iso}, payload, ID_INFORME_GENERAL,
+            rec_id=rec_id, etag=etag, modo="crear",
+        )
+        if desat:
+            return desat
+
+        # Sense clau alternativa: lectura + creació
+        if self.get_informe_general(fecha_iso):
+            raise ConflictoEscritura(f"Ja hi ha un informe general del {fecha_iso} que no s'havia llegit")
+        return self._crear(self.entity_informes, payload, ID_INFORME_GENERAL)
+
+    # =========================================================
+    # 🔶 TAXIS
+    # =========================================================
+    def get_taxis_by_informe(self, informe_id: str, con_id: bool = False) -> list[dict]:
+        """
+        Taxis de l'informe en format UI/PDF. Amb con_id=True cada fila porta
+        també "Id" (cr143_taxiid), per poder-la reconèixer en desar.
+        """
+        if not informe_id:
+            return []
+        return [_taxi_desde_dv(rec, con_id) for rec in self.iter_registros(self._ep_taxis_informe(informe_id))]
+
+    def iter_taxis_rango(self, desde_iso: str, hasta_iso: str) -> Iterator[tuple[str, dict]]:
+        """
+        Genera (informe_id, taxi) de tots els taxis dels informes generals del
+        rang amb una sola consulta (paginada): el filtre passa per la relació
+        cr143_Informegeneral, així no cal una crida per informe.
+        """
+        for rec in self.iter_registros(self._ep_taxis_rango(desde_iso, hasta_iso)):
+            yield (rec.get("_cr143_informegeneral_value") or "", _taxi_desde_dv(rec))
+
+    def get_taxis_servicio_rango(self, desde_iso: str, hasta_iso: str) -> list[tuple[str, dict]]:
+        """
+        (data ISO de l'informe, taxi) dels serveis amb data (cr143_fecha) dins
+        el rang, per data i hora del servei. Una sola consulta paginada.
+        """
+        return [
+            (((rec.get("cr143_Informegeneral") or {}).get("cr143_codigofecha") or "").strip(), _taxi_desde_dv(rec))
+            for rec in self.iter_registros(self._ep_taxis_servicio_rango(desde_iso, hasta_iso))
+        ]
+
+    def _payload_taxi(self, informe_id: str, fecha_iso: str, t: dict) -> dict:
+        fecha_txt = _to_text(t.get("Fecha") or fecha_iso).strip()
+
+        # aceptar YYYY-MM-DD o dd/mm/yyyy
+        fecha_iso_real = ""
+        for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+            try:
+                fecha_iso_real = datetime.strptime(fecha_txt, fmt).date().isoformat()
+                break
+            except Exception:
+                pass
+        if not fecha_iso_real:
+            fecha_iso_real = datetime.strptime(fecha_iso, "%Y-%m-%d").date().isoformat()
+
+        return {
+            "cr143_fecha": fecha_iso_real,
+            "cr143_hora": _to_text(t.get("Hora", "")).strip(),
+            "cr143_recollida": _to_text(t.get("Recogida", "")).strip(),
+            "cr143_desti": _to_text(t.get("Destino", "")).strip(),
+            "cr143_esportistes": _to_text(t.get("Deportistas", "")).strip(),
+            "cr143_observacions": _to_text(t.get("Observaciones", "")).strip(),
+            "cr143_Informegeneral@odata.bind": f"/{self.entity_informes}({informe_id})",
+        }
+
+    def replace_taxis_for_informe(self, informe_id: str, fecha_iso: str, taxis_list: list[dict], usar_batch: bool = True):
+        """
+        Substitueix tots els taxis de l'informe pels de taxis_list.
+        Amb usar_batch=True els DELETE i POST van junts en un $batch (un sol
+        round-trip i atòmic per changeset); amb False es fan un a un. Amb la
+        latència real de Dataverse (40-100 ms) el $batch és 3-11 vegades més
+        ràpid (benchmarks/bench_taxis_batch.py); només amb latències de xarxa
+        local (5 ms) la diferència és petita.
+        """
+        if not informe_id:
+            raise RuntimeError("No es poden desar els taxis sense l'id de l'informe general")
+
+        filtro = f"_cr143_informegeneral_value eq {informe_id}"
+        endpoint = f"{self.entity_taxis}?$filter={filtro}&$select=cr143_taxiid"
+        data = self.get(endpoint, usar_cache=False)
+        rows = data.get("value", []) if data else []
+
+        operaciones: list[tuple[str, str, dict | None]] = []
+        for rec in rows:
+            taxi_id = rec["cr143_taxiid"]
+            operaciones.append(("DELETE", f"{self.entity_taxis}({taxi_id})", None))
+
+        for t in taxis_list:
+            operaciones.append(("POST", self.entity_taxis, self._payload_taxi(informe_id, fecha_iso, t)))
+
+        if usar_batch:
+            self.batch(operaciones)
+            return
+
+        for metodo, endpoint_op, payload in operaciones:
+            if metodo == "DELETE":
+                self.delete(endpoint_op)
+            else:
+                self.post(endpoint_op, payload)
+
+    def sync_taxis_for_informe(self, informe_id: str, fecha_iso: str, taxis_list: list[dict]) -> dict:
+        """
+        Reconcilia els taxis desats amb taxis_list i només envia el que ha canviat:
+          1) files amb "Id" existent → PATCH dels camps modificats (o res)
+          2) files sense Id idèntiques a una fila desada → res
+          3) la resta s'aparellen per ordre amb les files desades sobrants → PATCH
+          4) desades sense parella → DELETE; noves sense parella → POST
+        Un desat sense canvis costa només el GET; una sola escriptura va directa
+        i si n'hi ha diverses s'envien en un $batch.
+        Retorna el recompte {"creats", "actualitzats", "eliminats", "sense_canvis"}.
+        """
+        res = {"creats": 0, "actualitzats": 0, "eliminats": 0, "sense_canvis": 0}
+        if not informe_id:
+            raise RuntimeError("No es poden desar els taxis sense l'id de l'informe general")
+
+        filtro = f"_cr143_informegeneral_value eq {informe_id}"
+        select = ",".join(("cr143_taxiid",) + TAXI_CAMPOS)
+        endpoint = f"{self.entity_taxis}?$filter={filtro}&$select={select}"
+        data = self.get(endpoint, usar_cache=False)
+        rows = data.get("value", []) if data else []
+
+        # id -> valors normalitzats (en l'ordre del servidor)
+        existentes: dict[str, tuple] = {}
+        etags: dict[str, str] = {}
+        for rec in rows:
+            etags[rec["cr143_taxiid"]] = rec.get("@odata.etag") or "*"
+            existentes[rec["cr143_taxiid"]] = tuple(
+                dv_to_iso_date(rec.get(c)) if c == "cr143_fecha" else (rec.get(c) or "").strip()
+                for c in TAXI_CAMPOS
+            )
+        libres = dict(existentes)
+
+        nuevos: list[tuple[str, dict]] = []
+        for t in taxis_list:
+            taxi_id = _to_text(t.get("Id")).strip()
+            nuevos.append((taxi_id, self._payload_taxi(informe_id, fecha_iso, t)))
+
+        parejas: list[tuple[str, dict]] = []
+        pendientes: list[dict] = []
+
+        # 1) Identitat de fila
+        for taxi_id, payload in nuevos:
+            if taxi_id and taxi_id in libres:
+                del libres[taxi_id]
+                parejas.append((taxi_id, payload))
+            else:
+                pendientes.append(payload)
+
+        # 2) Contingut idèntic
+        por_valor: dict[tuple, list[str]] = {}
+        for taxi_id, valores in libres.items():
+            por_valor.setdefault(valores, []).append(taxi_id)
+
+        sin_pareja: list[dict] = []
+        for payload in pendientes:
+            ids = por_valor.get(tuple(payload[c] for c in TAXI_CAMPOS))
+            if ids:
+                taxi_id = ids.pop(0)
+                del libres[taxi_id]
+                parejas.append((taxi_id, payload))
+            else:
+                sin_pareja.append(payload)
+
+        # 3) La resta, per ordre
+        sobrantes = list(libres.keys())
+        while sin_pareja and sobrantes:
+            parejas.append((sobrantes.pop(0), sin_pareja.pop(0)))
+
+        operaciones: list[tuple[str, str, dict | None]] = []
+        for taxi_id, payload in parejas:
+            cambios = {
+                c: payload[c]
+                for c, actual in zip(TAXI_CAMPOS, existentes[taxi_id])
+                if payload[c] != actual
+            }
+            if cambios:
+                operaciones.append(("PATCH", f"{self.entity_taxis}({taxi_id})", cambios, {"If-Match": etags[taxi_id]}))
+                res["actualitzats"] += 1
+            else:
+                res["sense_canvis"] += 1
+
+        for taxi_id in sobrantes:
+            operaciones.append(("DELETE", f"{self.entity_taxis}({taxi_id})", None, {"If-Match": etags[taxi_id]}))
+            res["eliminats"] += 1
+
+        for payload in sin_pareja:
+            operaciones.append(("POST", self.entity_taxis, payload))
+            res["creats"] += 1
+
+        if len(operaciones) == 1:
+            metodo, endpoint_op, payload = operaciones[0][:3]
+            etag = operaciones[0][3]["If-Match"] if len(operaciones[0]) > 3 else None
+            if metodo == "DELETE":
+                self.delete(endpoint_op, etag=etag)
+            elif metodo == "PATCH":
+                self.patch(endpoint_op, payload, etag=etag)
+            else:
+                self.post(endpoint_op, payload)
+        elif operaciones:
+            self.batch(operaciones)
+
+        return res
+
+    # =========================================================
+    # 🔶 INFORMES INDIVIDUALS
+    # =========================================================
+    def get_informe_individual(self, fecha_iso: str, alumno: str) -> dict | None:
+        clave = ("individual", fecha_iso, alumno)
+        rec_id = self._id_conegut(clave)
+        if rec_id:
+            informe = self.get_informe_individual_por_id(rec_id, usar_cache=True)
+            if informe:
+                return informe
+            self._recordar_id(clave, None)
+
+        data = self.get(self._ep_informe_individual(fecha_iso, alumno))
+        if not data or not data.get("value"):
+            return None
+
+        rec = data["value"][0]
+        self._recordar_id(clave, rec.get("cr143_informeindividualsid"))
+        return {
+            "id": rec.get("cr143_informeindividualsid"),
+            "etag": rec.get("@odata.etag"),
+            "contenido": rec.get("cr143_congingut") or "",
+        }
+
+    def get_informe_individual_por_id(self, rec_id: str, usar_cache: bool = False) -> dict | None:
+        """Vegeu get_informe_general_por_id."""
+        endpoint = f"{self.entity_indiv}({rec_id})?$select={ID_INFORME_INDIVIDUAL},cr143_congingut"
+        try:
+            rec = self.get(endpoint, usar_cache=usar_cache)
+        except RuntimeError as e:
+            if "→ 404" in str(e):
+                return None
+            raise
+        if not rec:
+            return None
+        return {
+            "id": rec.get(ID_INFORME_INDIVIDUAL),
+            "etag": rec.get("@odata.etag"),
+            "contenido": rec.get("cr143_congingut") or "",
+        }
+
+    def upsert_informe_individual(self, fecha_iso: str, alumno: str, alias: str, contenido: str,
+                                  rec_id: str | None = None) -> str:
+        return self.guardar_informe_individual(fecha_iso, alumno, alias, contenido, rec_id=rec_id)["id"]
+
+    def guardar_informe_individual(self, fecha_iso: str, alumno: str, alias: str, contenido: str,
+                                   rec_id: str | None = None, etag: str | None = None) -> dict:
+        """Vegeu guardar_informe_general."""
+        fecha_date = datetime.strptime(fecha_iso, "%Y-%m-%d").date().isoformat()
+
+        payload = {
+            "cr143_fechainforme": fecha_date,
+            "cr143_codigofecha": fecha_iso,
+            "cr143_alumne": alumno,
+            "cr143_alias": alias or "",
+            "cr143_congingut": contenido or "",
+        }
+
+        claves = {"cr143_codigofecha": fecha_iso, "cr143_alumne": alumno}
+        desat = self.upsert_por_clave(
+            self.entity_indiv, claves, payload, ID_INFORME_INDIVIDUAL, rec_id=rec_id, etag=etag, modo="crear",
+        )
+        if desat:
+            return desat
+
+        # Sense clau alternativa: lectura + creació
+        if self.get_informe_individual(fecha_iso, alumno):
+            raise ConflictoEscritura(f"Ja hi ha un informe individual de {alumno} del {fecha_iso} que no s'havia llegit")
+        return self._crear(self.entity_indiv, payload, ID_INFORME_INDIVIDUAL)
+
+    def borrar_informe_individual(self, fecha_iso: str, alumno: str, etag: str | None = None) -> bool:
+        """
+        Esborra l'informe (data, alumne) si existeix. Retorna si n'hi havia.
+        Amb etag, només si no ha canviat des de la lectura (ConflictoEscritura).
+        """
+        existente = self.get_informe_individual(fecha_iso, alumno)
+        if not existente or not existente.get("id"):
+            return False
+        self.delete(f"{self.entity_indiv}({existente['id']})", etag=etag)
+        return True
+
+    def iter_informes_individuales_por_alumno(self, alumno: str) -> Iterator[tuple[str, str]]:
+        """
+        Genera (fecha_iso_YYYY_MM_DD, contenido) pàgina a pàgina.
+        """
+        for rec in self.iter_registros(self._ep_individuales_alumno(alumno)):
+            fecha_iso = dv_to_iso_date(rec.get("cr143_fechainforme"))
+            contenido = rec.get("cr143_congingut") or ""
+            if fecha_iso:
+                yield (fecha_iso, contenido)
+
+    def get_informes_individuales_por_alumno(self, alumno: str) -> list[tuple[str, str]]:
+        """
+        Devuelve (fecha_iso_YYYY_MM_DD, contenido)
+        """
+        return list(self.iter_informes_individuales_por_alumno(alumno))
+
+    def iter_informes_individuales_rango(self, alumno: str, desde_iso: str, hasta_iso: str) -> Iterator[tuple[str, str]]:
+        """
+        Com iter_informes_individuales_por_alumno, però només el rang [desde, hasta]:
+        el filtre per data i el $select es fan al servidor.
+        """
+        for rec in self.iter_registros(self._ep_individuales_rango(alumno, desde_iso, hasta_iso)):
+            fecha_iso = dv_to_iso_date(rec.get("cr143_fechainforme"))
+            if fecha_iso:
+                yield (fecha_iso, rec.get("cr143_congingut") or "")
+
+    def get_informes_individuales_rango(self, alumno: str, desde_iso: str, hasta_iso: str) -> list[tuple[str, str]]:
+        """
+        Devuelve (fecha_iso_YYYY_MM_DD, contenido) del rang, ordenat desc.
+        """
+        return list(self.iter_informes_individuales_rango(alumno, desde_iso, hasta_iso))
+
+    # =========================================================
+    # 🔶 ALUMNOS (Esportistes)
+    # =========================================================
+    def get_alumnos(self, modificados_desde: str | None = None) -> list[dict]:
+        """
+        Esportistes {"nombre", "alias", "modifiedon"}. Amb modificados_desde
+        (timestamp ISO de modifiedon) només es baixen els canviats des d'aleshores.
+        """
+        campos = [ALUMNOS_NAME_FIELD, "modifiedon"]
+        if ALUMNOS_ALIAS_FIELD:
+            campos.append(ALUMNOS_ALIAS_FIELD)
+        endpoint = f"{self.entity_alumnos}?$select={','.join(campos)}"
+        if modificados_desde:
+            endpoint += f"&$filter=modifiedon ge {modificados_desde}"
+
+        res: list[dict] = []
+
+        for rec in self.iter_registros(endpoint):
+            nombre = (rec.get(ALUMNOS_NAME_FIELD) or "").strip()
+            if not nombre:
+                continue
+
+            alias = ""
+            if ALUMNOS_ALIAS_FIELD:
+                alias = (rec.get(ALUMNOS_ALIAS_FIELD) or "").strip()
+
+            res.append({"nombre": nombre, "alias": alias, "modifiedon": rec.get("modifiedon") or ""})
+
+        return res
+
+    def get_nombres_alumnos(self) -> set[str]:
+        """Només els noms (consulta lleugera per detectar baixes i canvis de nom)."""
+        endpoint = f"{self.entity_alumnos}?$select={ALUMNOS_NAME_FIELD}"
+        return {
+            (rec.get(ALUMNOS_NAME_FIELD) or "").strip()
+            for rec in self.iter_registros(endpoint)
+            if (rec.get(ALUMNOS_NAME_FIELD) or "").strip()
+        }
+
+    # =========================================================
+    # 🔶 HELPERS EXTRA
+    # =========================================================
+    def get_alumnos_con_informe_en_fecha(self, fecha_iso: str) -> list[str]:
+        data = self.get(self._ep_alumnos_con_informe(fecha_iso))
+
+        alumnes: list[str] = []
+        rows = data.get("value", []) if data else []
+        for rec in rows:
+            nom = (rec.get("cr143_alumne") or "").strip()
+            if nom and nom not in alumnes:
+                alumnes.append(nom)
+        return alumnes
+
+    def iter_informes_generales_rango(self, desde_iso: str, hasta_iso: str) -> Iterator[dict]:
+        """
+        Genera els informes generals del rang (ordre ascendent), pàgina a pàgina.
+        """
+        for rec in self.iter_registros(self._ep_generales_rango(desde_iso, hasta_iso)):
+            yield _informe_general_desde_dv(rec)
+
+    def get_informes_generales_rango(self, desde_iso: str, hasta_iso: str, con_taxis: bool = False) -> list[dict]:
+        """
+        Devuelve 'fecha' en ISO (YYYY-MM-DD) para que el bloque 9 pueda parsear y comparar bien.
+        Amb con_taxis=True cada informe porta també "taxis" (mateix format que
+        get_taxis_by_informe), obtinguts amb una consulta per a tot el rang.
+        """
+        if not con_taxis:
+            return list(self.iter_informes_generales_rango(desde_iso, hasta_iso))
+
+        # Les dues consultes són independents: les feim alhora
+        informes, taxis_rango = self.ejecutar_en_paralelo([
+            lambda: list(self.iter_informes_generales_rango(desde_iso, hasta_iso)),
+            lambda: list(self.iter_taxis_rango(desde_iso, hasta_iso)),
+        ])
+
+        return _unir_taxis(informes, taxis_rango)
+
+    def iter_informes_generales_todos(self) -> Iterator[dict]:
+        """
+        Genera tots els informes generals (més recents primer), pàgina a pàgina,
+        sense carregar tot l'històric a memòria.
+        """
+        for rec in self.iter_registros(self._ep_generales_todos()):
+            yield _informe_general_desde_dv(rec)
+
+    def get_informes_generales_todos(self) -> list[dict]:
+        """
+        Devuelve 'fecha' en ISO (YYYY-MM-DD).
+        """
+        return list(self.iter_informes_generales_todos())
+
+    def iter_informes_generales_con_texto(self, terminos: list[str]) -> Iterator[dict]:
+        """
+        Informes generals (més recents primer) on algun camp de text conté algun
+        dels termes. El filtre es fa al servidor i els resultats arriben pàgina a
+        pàgina: només es transfereixen els candidats.
+        """
+        terminos = [t for t in terminos if t]
+        if not terminos:
+            return
+        for rec in self.iter_registros(self._ep_generales_con_texto(terminos)):
+            yield _informe_general_desde_dv(rec)
+
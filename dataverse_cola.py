@@ -0,0 +1,356 @@
+# =========================================================
+# dataverse_cola.py - CUA D'ESCRIPTURES DIFERIDES (SQLite → Dataverse)
+# =========================================================
+# Els formularis desen a una cua SQLite local (commit a disc, immediat) i un fil
+# en segon pla les reprodueix contra Dataverse. Si la xarxa falla, l'entrada es
+# queda a la cua i es torna a provar més tard: no es perd la feina del cuidador.
+#
+# - Clau d'idempotència: hash de (tipus, clau d'ordre, escriptor, dades). Un doble clic o un
+#   rerun que torna a encolar el mateix desat no crea una segona entrada.
+# - Ordre per clau: les entrades d'un mateix informe ("general|data" o
+#   "individual|data|alumne") s'apliquen en ordre d'encolat; si una falla, les
+#   posteriors de la mateixa clau esperen. Les altres claus continuen.
+# - Cada operació és un upsert per clau natural (data / data+alumne) i els taxis
+#   es reconcilien per contingut, així que tornar-la a aplicar després d'un error
+#   a mitges no duplica registres. Si el PATCH de l'informe general entra però
+#   els taxis fallen, l'entrada es queda amb el nou id/etag i el reintent només
+#   torna a sincronitzar els taxis.
+# - Concurrència optimista: cada entrada porta l'etag de la lectura del formulari.
+#   Si un altre usuari ha modificat l'informe entremig (412), l'entrada queda en
+#   "conflicte" fins que algú tria quina versió es queda (vista de conflictes).
+#   Els desats successius d'una mateixa sessió parteixen del mateix etag: la
+#   taula 'versiones' el tradueix a l'etag que ha deixat el nostre darrer desat.
+#   La traducció només val per al mateix escriptor (sessió del formulari): les
+#   entrades d'altres sessions van al servidor amb el seu etag i, si són velles, 412.
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+from dataverse_client import DataverseClient, ConflictoEscritura
+
+
+COLA_INTERVALO = 5          # segons entre passades quan no hi ha res a fer
+COLA_ESPERA_ERROR = 30      # segons abans de tornar a provar després d'un error
+COLA_MAX_INTENTOS = 20      # després d'això l'entrada queda en "error" (revisar a mà)
+
+ESQUEMA_COLA = """
+CREATE TABLE IF NOT EXISTS cola (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    clave_idem TEXT UNIQUE,
+    clave_orden TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    escritor TEXT,
+    estado TEXT NOT NULL DEFAULT 'pendent',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    ultimo_error TEXT,
+    creado_en REAL
+);
+CREATE INDEX IF NOT EXISTS idx_cola_orden ON cola (clave_orden, id);
+
+CREATE TABLE IF NOT EXISTS versiones (
+    clave_orden TEXT NOT NULL,
+    escritor TEXT NOT NULL,
+    etag_base TEXT,
+    rec_id TEXT,
+    etag TEXT,
+    PRIMARY KEY (clave_orden, escritor)
+);
+"""
+
+
+def clave_general(fecha_iso: str) -> str:
+    return f"general|{fecha_iso}"
+
+
+def clave_individual(fecha_iso: str, alumno: str) -> str:
+    return f"individual|{fecha_iso}|{alumno}"
+
+
+def aplicar_operacion(client: DataverseClient, tipo: str, datos: dict,
+                      al_guardar_general: Callable[[dict], None] | None = None) -> dict | None:
+    """
+    Aplica una operació de la cua contra Dataverse (també serveix sense cua).
+    Retorna {"id", "etag"} del registre desat (None si s'ha esborrat).
+    ConflictoEscritura si el registre ha canviat des de la lectura (datos["etag"]).
+    Informe general: al_guardar_general rep {"id", "etag"} just després del PATCH,
+    abans de sincronitzar els taxis. Amb datos["general_desat"] el PATCH ja s'ha
+    fet en un intent anterior i només es tornen a sincronitzar els taxis.
+    """
+    if tipo == "informe_general":
+        if datos.get("general_desat"):
+            desat = {"id": datos["id"], "etag": datos.get("etag")}
+        else:
+            desat = client.guardar_informe_general(
+                datos["fecha_iso"], datos["cuidador"], datos["entradas"],
+                datos["mantenimiento"], datos["temas"], rec_id=datos.get("id"), etag=datos.get("etag"),
+            )
+            if al_guardar_general:
+                al_guardar_general(desat)
+        client.sync_taxis_for_informe(desat["id"], datos["fecha_iso"], datos.get("taxis") or [])
+        return desat
+    if tipo == "informe_individual":
+        return client.guardar_informe_individual(
+            fecha_iso=datos["fecha_iso"], alumno=datos["alumno"], alias=datos["alias"],
+            contenido=datos["contenido"], rec_id=datos.get("id"), etag=datos.get("etag"),
+        )
+    if tipo == "borrar_individual":
+        client.borrar_informe_individual(datos["fecha_iso"], datos["alumno"], etag=datos.get("etag"))
+        return None
+    raise RuntimeError(f"Tipus d'operació desconegut a la cua: {tipo}")
+
+
+class ColaEscrituras:
+    """
+    Cua durable de desats pendents d'enviar a Dataverse.
+    Tipus d'entrada: "informe_general", "informe_individual", "borrar_individual".
+    al_desar(tipo, datos) es crida, des del fil de la cua, per cada entrada que
+    Dataverse ha acceptat; al_aplicar(), un cop per passada si se n'ha aplicat alguna.
+    """
+
+    def __init__(self, client: DataverseClient, path: str,
+                 al_aplicar: Callable[[], None] | None = None,
+                 max_intentos: int = COLA_MAX_INTENTOS,
+                 al_desar: Callable[[str, dict], None] | None = None):
+        self.client = client
+        self.path = path
+        self.al_aplicar = al_aplicar
+        self.al_desar = al_desar
+        self.max_intentos = max_intentos
+
+        self._local = threading.local()
+        self._despertar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+        conn = self._conexion()
+        with conn:
+            columnas = [r[1] for r in conn.execute("PRAGMA table_info(cola)")]
+            if columnas and "escritor" not in columnas:
+                # Cues d'abans de l'escriptor: les traduccions velles no saben de qui són
+                conn.execute("ALTER TABLE cola ADD COLUMN escritor TEXT")
+                conn.execute("DROP TABLE IF EXISTS versiones")
+            conn.executescript(ESQUEMA_COLA)
+            # Entrades que s'estaven enviant quan el procés es va aturar
+            conn.execute("UPDATE cola SET estado='pendent' WHERE estado='enviant'")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")  # un desat confirmat ha de sobreviure a un tall
+            self._local.conn = conn
+        return conn
+
+    # ----------------------------------------------
+    # Encolar (des dels formularis)
+    # ----------------------------------------------
+    def encolar(self, tipo: str, clave_orden: str, datos: dict, escritor: str | None = None) -> str:
+        """
+        Desa l'operació a la cua i desperta el fil. Retorna la clau d'idempotència.
+        escritor: identificador de la sessió que desa. Les entrades anteriors del
+        mateix escriptor i la mateixa clau que encara no s'han començat a enviar
+        es descarten: la nova ja conté l'estat final de l'informe.
+        """
+        texto = json.dumps(datos, ensure_ascii=False, sort_keys=True, default=str)
+        clave_idem = hashlib.sha256(
+            f"{tipo}\n{clave_orden}\n{escritor or ''}\n{texto}".encode("utf-8")
+        ).hexdigest()
+
+        conn = self._conexion()
+        with conn:
+            conn.execute(
+                """DELETE FROM cola WHERE clave_orden=? AND escritor IS ?
+                   AND estado IN ('pendent', 'error', 'conflicte') AND clave_idem<>?""",
+                (clave_orden, escritor, clave_idem),
+            )
+            conn.execute(
+                """INSERT OR IGNORE INTO cola (clave_idem, clave_orden, escritor, tipo, datos, creado_en)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (clave_idem, clave_orden, escritor, tipo, texto, time.time()),
+            )
+        self._despertar.set()
+        return clave_idem
+
+    def pendiente(self, clave_orden: str) -> tuple[str, dict] | None:
+        """
+        Darrera operació encara no aplicada d'aquesta clau, com (tipo, datos).
+        Els formularis la fan servir per mostrar el que s'ha desat encara que
+        Dataverse no ho tengui.
+        """
+        row = self._conexion().execute(
+            "SELECT tipo, datos FROM cola WHERE clave_orden=? ORDER BY id DESC LIMIT 1",
+            (clave_orden,),
+        ).fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1])
+
+    def estado(self) -> dict:
+        """Resum per a la barra lateral: pendents, errors, conflictes i darrer error."""
+        conn = self._conexion()
+        cuentas = dict(conn.execute("SELECT estado, COUNT(*) FROM cola GROUP BY estado").fetchall())
+        row = conn.execute(
+            "SELECT ultimo_error FROM cola WHERE ultimo_error IS NOT NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return {
+            "pendents": cuentas.get("pendent", 0) + cuentas.get("enviant", 0),
+            "errors": cuentas.get("error", 0),
+            "conflictes": cuentas.get("conflicte", 0),
+            "ultim_error": row[0] if row else None,
+        }
+
+    def conflictos(self) -> list[dict]:
+        """Entrades aturades perquè l'informe ha canviat a Dataverse."""
+        rows = self._conexion().execute(
+            "SELECT id, clave_orden, tipo, datos FROM cola WHERE estado='conflicte' ORDER BY id"
+        ).fetchall()
+        return [
+            {"id": id_, "clave_orden": clave, "tipo": tipo, "datos": json.loads(datos)}
+            for id_, clave, tipo, datos in rows
+        ]
+
+    def resolver_conflicto(self, id_: int, mantener_local: bool,
+                           rec_id: str | None = None, etag: str | None = None):
+        """
+        mantener_local=True: torna a enviar la versió local sobre la que hi ha ara
+        a Dataverse (rec_id/etag de la versió que l'usuari ha vist al conflicte).
+        mantener_local=False: descarta la versió local.
+        """
+        conn = self._conexion()
+        with conn:
+            if not mantener_local:
+                conn.execute("DELETE FROM cola WHERE id=? AND estado='conflicte'", (id_,))
+                return
+            row = conn.execute("SELECT datos FROM cola WHERE id=? AND estado='conflicte'", (id_,)).fetchone()
+            if not row:
+                return
+            datos = json.loads(row[0])
+            datos.pop("general_desat", None)
+            datos.pop("etag_base", None)
+            datos["id"] = rec_id
+            datos["etag"] = etag
+            conn.execute(
+                "UPDATE cola SET datos=?, estado='pendent', intentos=0, ultimo_error=NULL WHERE id=?",
+                (json.dumps(datos, ensure_ascii=False, sort_keys=True, default=str), id_),
+            )
+        self._despertar.set()
+
+    def reintentar_errores(self):
+        with self._conexion() as conn:
+            conn.execute("UPDATE cola SET estado='pendent', intentos=0 WHERE estado='error'")
+        self._despertar.set()
+
+    # ----------------------------------------------
+    # Buidar la cua contra Dataverse (fil de fons)
+    # ----------------------------------------------
+    def procesar(self) -> int:
+        """
+        Una passada per la cua en ordre d'encolat. Retorna quantes entrades han
+        fallat (0 si tot s'ha aplicat o no hi havia res).
+        """
+        conn = self._conexion()
+        filas = conn.execute(
+            "SELECT id, clave_orden, escritor, tipo, datos, intentos FROM cola WHERE estado='pendent' ORDER BY id"
+        ).fetchall()
+
+        bloqueadas: set[str] = set()
+        fallos = 0
+        aplicadas = 0
+        for id_, clave_orden, escritor, tipo, datos, intentos in filas:
+            if clave_orden in bloqueadas:
+                continue
+            with conn:
+                marcada = conn.execute(
+                    "UPDATE cola SET estado='enviant' WHERE id=? AND estado='pendent'", (id_,)
+                ).rowcount
+            if not marcada:
+                continue  # substituïda per un desat més nou mentre fèiem la passada
+            datos = json.loads(datos)
+            # Un reintent després d'un PATCH que ja va entrar porta l'etag original a part
+            etag_base = datos.get("etag_base", datos.get("etag")) or ""
+            version = conn.execute(
+                "SELECT rec_id, etag FROM versiones WHERE clave_orden=? AND escritor=? AND etag_base=?",
+                (clave_orden, escritor, etag_base),
+            ).fetchone() if escritor and not datos.get("general_desat") else None
+            if version:
+                # Desat posterior de la mateixa edició: parteix del que vam deixar
+                datos["id"], datos["etag"] = version
+
+            def _general_desat(desat: dict):
+                # L'informe ja és a Dataverse: si els taxis fallen, el reintent no
+                # ha de repetir el PATCH amb l'etag vell (seria un 412 contra nosaltres)
+                datos.update(id=desat["id"], etag=desat.get("etag"), etag_base=etag_base, general_desat=True)
+                with conn:
+                    conn.execute(
+                        "UPDATE cola SET datos=? WHERE id=?",
+                        (json.dumps(datos, ensure_ascii=False, sort_keys=True, default=str), id_),
+                    )
+                    self._guardar_version(conn, clave_orden, escritor, etag_base, desat)
+
+            try:
+                desat = aplicar_operacion(self.client, tipo, datos, al_guardar_general=_general_desat)
+            except ConflictoEscritura as e:
+                bloqueadas.add(clave_orden)
+                with conn:
+                    conn.execute(
+                        "UPDATE cola SET estado='conflicte', ultimo_error=? WHERE id=?", (str(e), id_),
+                    )
+                continue
+            except Exception as e:
+                fallos += 1
+                bloqueadas.add(clave_orden)
+                nuevo_estado = "error" if intentos + 1 >= self.max_intentos else "pendent"
+                with conn:
+                    conn.execute(
+                        "UPDATE cola SET estado=?, intentos=?, ultimo_error=? WHERE id=?",
+                        (nuevo_estado, intentos + 1, str(e), id_),
+                    )
+                continue
+            with conn:
+                conn.execute("DELETE FROM cola WHERE id=?", (id_,))
+                self._guardar_version(conn, clave_orden, escritor, etag_base, desat)
+            aplicadas += 1
+            if self.al_desar:
+                try:
+                    self.al_desar(tipo, datos)
+                except Exception:
+                    pass  # l'entrada ja és a Dataverse; no es torna a enviar per això
+
+        if aplicadas and self.al_aplicar:
+            self.al_aplicar()
+        return fallos
+
+    @staticmethod
+    def _guardar_version(conn: sqlite3.Connection, clave_orden: str, escritor: str | None,
+                         etag_base: str, desat: dict | None):
+        """Recorda on ha deixat l'informe el darrer desat d'aquest escriptor."""
+        if not escritor:
+            return
+        if desat:
+            conn.execute(
+                """INSERT OR REPLACE INTO versiones (clave_orden, escritor, etag_base, rec_id, etag)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (clave_orden, escritor, etag_base, desat["id"], desat.get("etag")),
+            )
+        else:
+            conn.execute("DELETE FROM versiones WHERE clave_orden=? AND escritor=?", (clave_orden, escritor))
+
+    def iniciar(self):
+        """Arrenca el fil que buida la cua (només una vegada)."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._hilo = threading.Thread(target=self._bucle, name="cola-dataverse", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            try:
+                fallos = self.procesar()
+            except Exception:
+                fallos = 1
+            self._despertar.wait(COLA_ESPERA_ERROR if fallos else COLA_INTERVALO)
+            self._despertar.clear()
@@ -0,0 +1,332 @@
+# =========================================================
+# dataverse_replica.py - RÈPLICA LOCAL (SQLite) DE DATAVERSE
+# =========================================================
+# Còpia local dels informes generals, taxis i informes individuals, mantinguda
+# amb el change tracking de Dataverse (Prefer: odata.track-changes + deltaLink).
+# Un fil en segon pla aplica els canvis cada 'intervalo' segons; les consultes
+# d'històric i de mencions es fan contra SQLite en lloc d'anar al servidor.
+#
+# Requereix tenir activat "Track changes" a les tres taules de Dataverse. Si no
+# ho està, la sincronització falla, la rèplica no arriba a estar llesta i l'app
+# continua llegint directament de Dataverse.
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+from dataverse_client import (
+    DataverseClient,
+    DeltaCaducado,
+    dv_to_iso_date,
+    dv_to_ddmmyyyy,
+    es_registro_borrado,
+)
+
+
+REPLICA_INTERVALO = 120  # segons entre sincronitzacions en segon pla
+
+# entity set → (taula local, camp id a Dataverse, {columna local: camp Dataverse})
+def _tablas_replica(client: DataverseClient) -> dict[str, tuple[str, str, dict[str, str]]]:
+    return {
+        client.entity_informes: ("informes", "cr143_informegeneralid", {
+            "fecha": "cr143_codigofecha",
+            "cuidador": "cr143_cuidador",
+            "entradas": "cr143_informedeldia",
+            "mantenimiento": "cr143_notesdireccio",
+            "temas": "cr143_picnics",
+        }),
+        client.entity_taxis: ("taxis", "cr143_taxiid", {
+            "informe_id": "_cr143_informegeneral_value",
+            "fecha": "cr143_fecha",
+            "hora": "cr143_hora",
+            "recollida": "cr143_recollida",
+            "desti": "cr143_desti",
+            "esportistes": "cr143_esportistes",
+            "observacions": "cr143_observacions",
+        }),
+        client.entity_indiv: ("individuales", "cr143_informeindividualsid", {
+            "fecha": "cr143_fechainforme",
+            "alumno": "cr143_alumne",
+            "contenido": "cr143_congingut",
+        }),
+    }
+
+
+ESQUEMA_REPLICA = """
+CREATE TABLE IF NOT EXISTS informes (
+    id TEXT PRIMARY KEY,
+    fecha TEXT,
+    cuidador TEXT,
+    entradas TEXT,
+    mantenimiento TEXT,
+    temas TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_informes_fecha ON informes (fecha);
+
+CREATE TABLE IF NOT EXISTS taxis (
+    id TEXT PRIMARY KEY,
+    informe_id TEXT,
+    fecha TEXT,
+    hora TEXT,
+    recollida TEXT,
+    desti TEXT,
+    esportistes TEXT,
+    observacions TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_taxis_informe ON taxis (informe_id);
+CREATE INDEX IF NOT EXISTS idx_taxis_fecha ON taxis (fecha, hora);
+
+CREATE TABLE IF NOT EXISTS individuales (
+    id TEXT PRIMARY KEY,
+    fecha TEXT,
+    alumno TEXT,
+    contenido TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_individuales_alumno_fecha ON individuales (alumno, fecha);
+
+CREATE TABLE IF NOT EXISTS delta_links (
+    entidad TEXT PRIMARY KEY,
+    delta_link TEXT,
+    sincronizado_en REAL
+);
+"""
+
+
+class ReplicaDataverse:
+    """
+    Rèplica SQLite amb la mateixa interfície de lectura que DataverseClient
+    per a les consultes d'històric: get_informes_generales_rango,
+    iter_informes_generales_rango, iter_informes_generales_todos,
+    get_informes_generales_todos, iter_informes_generales_con_texto,
+    get_taxis_servicio_rango, get_informes_individuales_por_alumno i
+    get_informes_individuales_rango.
+    """
+
+    def __init__(self, client: DataverseClient, path: str, intervalo: float = REPLICA_INTERVALO):
+        self.client = client
+        self.path = path
+        self.intervalo = intervalo
+        self.tablas = _tablas_replica(client)
+        self.ultimo_error: str | None = None
+
+        self._local = threading.local()
+        self._lock_escritura = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+        with self._conexion() as conn:
+            conn.executescript(ESQUEMA_REPLICA)
+
+    # ----------------------------------------------
+    # Connexions (una per fil, en mode WAL: lectures sense bloquejar)
+    # ----------------------------------------------
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ----------------------------------------------
+    # Sincronització
+    # ----------------------------------------------
+    def lista(self) -> bool:
+        """True quan totes les taules han fet la càrrega inicial."""
+        rows = self._conexion().execute("SELECT entidad FROM delta_links WHERE delta_link IS NOT NULL").fetchall()
+        return {r[0] for r in rows} >= set(self.tablas)
+
+    def sincronizar(self):
+        """Aplica els canvis pendents de totes les taules (o la càrrega inicial)."""
+        with self._lock_escritura:
+            for entidad in self.tablas:
+                try:
+                    self._sincronizar_entidad(entidad)
+                except DeltaCaducado:
+                    # El deltaLink ha caducat: recàrrega completa d'aquesta taula.
+                    # Els altres errors (5xx, throttling) arriben al bucle, que ho torna a provar.
+                    if not self._delta_link(entidad):
+                        raise
+                    with self._conexion() as conn:
+                        conn.execute("DELETE FROM delta_links WHERE entidad=?", (entidad,))
+                    self._sincronizar_entidad(entidad)
+
+    def _delta_link(self, entidad: str) -> str | None:
+        row = self._conexion().execute("SELECT delta_link FROM delta_links WHERE entidad=?", (entidad,)).fetchone()
+        return row[0] if row else None
+
+    def _sincronizar_entidad(self, entidad: str):
+        tabla, campo_id, columnas = self.tablas[entidad]
+        conn = self._conexion()
+
+        delta_link = self._delta_link(entidad)
+        if delta_link:
+            url = delta_link
+        else:
+            url = f"{entidad}?$select={','.join([campo_id] + list(columnas.values()))}"
+
+        cols = ["id"] + list(columnas)
+        sql_upsert = (
+            f"INSERT OR REPLACE INTO {tabla} ({', '.join(cols)}) "
+            f"VALUES ({', '.join('?' for _ in cols)})"
+        )
+
+        # Tot dins una transacció: si falla a mitges, no es guarda res ni el deltaLink
+        with conn:
+            if not delta_link:
+                conn.execute(f"DELETE FROM {tabla}")
+            nuevo_link = None
+            for registros, link in self.client.iter_paginas_cambios(url):
+                for rec in registros:
+                    if es_registro_borrado(rec):
+                        conn.execute(f"DELETE FROM {tabla} WHERE id=?", (rec.get("id"),))
+                        continue
+                    valores = [rec.get(campo_id)]
+                    for col, campo in columnas.items():
+                        v = rec.get(campo)
+                        if col == "fecha" and tabla != "informes":
+                            v = dv_to_iso_date(v)
+                        valores.append(v or "")
+                    conn.execute(sql_upsert, valores)
+                if link:
+                    nuevo_link = link
+            if nuevo_link:
+                conn.execute(
+                    "INSERT OR REPLACE INTO delta_links (entidad, delta_link, sincronizado_en) VALUES (?, ?, ?)",
+                    (entidad, nuevo_link, time.time()),
+                )
+
+    def solicitar_sincronizacion(self):
+        """Desperta el fil de fons (p. ex. just després d'un desat)."""
+        self._despertar.set()
+
+    def iniciar(self):
+        """Arrenca el fil de sincronització en segon pla (només una vegada)."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._hilo = threading.Thread(target=self._bucle, name="replica-dataverse", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            try:
+                self.sincronizar()
+                self.ultimo_error = None
+            except Exception as e:
+                self.ultimo_error = str(e)
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+    # ----------------------------------------------
+    # Lectures (mateix format que DataverseClient)
+    # ----------------------------------------------
+    def _taxis_de(self, informe_ids: list[str]) -> dict[str, list[dict]]:
+        res: dict[str, list[dict]] = {}
+        if not informe_ids:
+            return res
+        conn = self._conexion()
+        for inicio in range(0, len(informe_ids), 500):
+            trozo = informe_ids[inicio:inicio + 500]
+            rows = conn.execute(
+                f"""SELECT informe_id, fecha, hora, recollida, desti, esportistes, observacions
+                    FROM taxis WHERE informe_id IN ({', '.join('?' for _ in trozo)})
+                    ORDER BY fecha, hora""",
+                trozo,
+            ).fetchall()
+            for informe_id, *valores in rows:
+                res.setdefault(informe_id, []).append(self._taxi(valores))
+        return res
+
+    @staticmethod
+    def _taxi(valores) -> dict:
+        fecha, hora, recollida, desti, esportistes, observacions = valores
+        return {
+            "Fecha": dv_to_ddmmyyyy(fecha),
+            "Hora": hora or "",
+            "Recogida": recollida or "",
+            "Destino": desti or "",
+            "Deportistas": esportistes or "",
+            "Observaciones": observacions or "",
+        }
+
+    def get_taxis_servicio_rango(self, desde_iso: str, hasta_iso: str) -> list[tuple[str, dict]]:
+        rows = self._conexion().execute(
+            """SELECT i.fecha, t.fecha, t.hora, t.recollida, t.desti, t.esportistes, t.observacions
+               FROM taxis t LEFT JOIN informes i ON i.id = t.informe_id
+               WHERE t.fecha >= ? AND t.fecha <= ? ORDER BY t.fecha, t.hora""",
+            (desde_iso, hasta_iso),
+        ).fetchall()
+        return [((fecha_informe or "").strip(), self._taxi(valores)) for fecha_informe, *valores in rows]
+
+    @staticmethod
+    def _informe(row) -> dict:
+        return {
+            "id": row[0],
+            "fecha": (row[1] or "").strip(),  # ISO
+            "cuidador": row[2] or "",
+            "entradas": row[3] or "",
+            "mantenimiento": row[4] or "",
+            "temas": row[5] or "",
+        }
+
+    def iter_informes_generales_rango(self, desde_iso: str, hasta_iso: str) -> Iterator[dict]:
+        cur = self._conexion().execute(
+            """SELECT id, fecha, cuidador, entradas, mantenimiento, temas
+               FROM informes WHERE fecha >= ? AND fecha <= ? ORDER BY fecha ASC""",
+            (desde_iso, hasta_iso),
+        )
+        for row in cur:
+            yield self._informe(row)
+
+    def get_informes_generales_rango(self, desde_iso: str, hasta_iso: str, con_taxis: bool = False) -> list[dict]:
+        informes = list(self.iter_informes_generales_rango(desde_iso, hasta_iso))
+        if con_taxis:
+            taxis = self._taxis_de([i["id"] for i in informes])
+            for rec in informes:
+                rec["taxis"] = taxis.get(rec["id"], [])
+        return informes
+
+    def iter_informes_generales_todos(self) -> Iterator[dict]:
+        cur = self._conexion().execute(
+            """SELECT id, fecha, cuidador, entradas, mantenimiento, temas
+               FROM informes ORDER BY fecha DESC"""
+        )
+        for row in cur:
+            yield self._informe(row)
+
+    def get_informes_generales_todos(self) -> list[dict]:
+        return list(self.iter_informes_generales_todos())
+
+    def iter_informes_generales_con_texto(self, terminos: list[str]) -> Iterator[dict]:
+        terminos = [t.lower() for t in terminos if t]
+        if not terminos:
+            return
+        condiciones = []
+        params = []
+        for termino in terminos:
+            for campo in ("entradas", "mantenimiento", "temas"):
+                condiciones.append(f"instr(lower({campo}), ?) > 0")
+                params.append(termino)
+        cur = self._conexion().execute(
+            f"""SELECT id, fecha, cuidador, entradas, mantenimiento, temas
+                FROM informes WHERE {' OR '.join(condiciones)} ORDER BY fecha DESC""",
+            params,
+        )
+        for row in cur:
+            yield self._informe(row)
+
+    def get_informes_individuales_por_alumno(self, alumno: str) -> list[tuple[str, str]]:
+        rows = self._conexion().execute(
+            "SELECT fecha, contenido FROM individuales WHERE alumno=? ORDER BY fecha DESC",
+            (alumno,),
+        ).fetchall()
+        return [(fecha, contenido or "") for fecha, contenido in rows if fecha]
+
+    def get_informes_individuales_rango(self, alumno: str, desde_iso: str, hasta_iso: str) -> list[tuple[str, str]]:
+        rows = self._conexion().execute(
+            """SELECT fecha, contenido FROM individuales
+               WHERE alumno=? AND fecha >= ? AND fecha <= ? ORDER BY fecha DESC""",
+            (alumno, desde_iso, hasta_iso),
+        ).fetchall()
+        return [(fecha, contenido or "") for fecha, contenido in rows if fecha]
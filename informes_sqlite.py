@@ -0,0 +1,559 @@
+# =========================================================
+# informes_sqlite.py - ESQUEMA, MIGRACIONS I CONSULTES DE informes.db
+# =========================================================
+# Esquema de la base de dades local de app.py, aplicat amb migracions
+# numerades (PRAGMA user_version): cada migració s'executa una sola vegada i
+# dins una transacció. Les consultes que fan servir les vistes i els històrics
+# són aquí perquè es puguin comprovar els plans (EXPLAIN QUERY PLAN):
+#
+#   python informes_sqlite.py             # esquema buit
+#   python informes_sqlite.py informes.db # còpia en memòria d'una BD real
+#
+# surt amb codi 1 si alguna consulta recorre una taula sencera o ha d'ordenar
+# els resultats a part (índex que falta). tests/test_informes_sqlite.py fa la
+# mateixa comprovació sobre l'esquema buit.
+import json
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator
+
+from almacen_informes import AlmacenInformes
+from menciones import ESQUEMA_MENCIONES
+
+# -----------------------
+# Taxis: taula pròpia (abans, JSON a informes.taxis)
+# -----------------------
+# Columnes del formulari (DataFrame de l'editor) → columnes de la taula
+CAMPOS_TAXI = {
+    "Fecha": "fecha",
+    "Hora": "hora",
+    "Recogida": "recogida",
+    "Destino": "destino",
+    "Deportistas": "deportistas",
+    "Observaciones": "observaciones",
+}
+
+
+def _texto(v) -> str:
+    # El DataFrame de l'editor dona None o NaN a les cel·les buides
+    if v is None or (isinstance(v, float) and v != v):
+        return ""
+    return str(v)
+
+
+def _fecha_servicio_iso(valor: str) -> str | None:
+    """Data del servei en ISO si es pot interpretar (dd/mm/aaaa o ja ISO)."""
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(valor.strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return None
+
+
+def guardar_taxis(conn: sqlite3.Connection, fecha_informe: str, taxis: list[dict]):
+    """
+    Substitueix els taxis de l'informe (no fa commit: va amb el desat de
+    l'informe). Les files completament buides de l'editor no es guarden.
+    """
+    conn.execute("DELETE FROM taxis WHERE informe_fecha=?", (fecha_informe,))
+    filas = []
+    for t in taxis:
+        valores = [_texto(t.get(campo)) for campo in CAMPOS_TAXI]
+        if not any(v.strip() for v in valores):
+            continue
+        filas.append((fecha_informe, len(filas), _fecha_servicio_iso(valores[0]), *valores))
+    conn.executemany(
+        """INSERT INTO taxis (informe_fecha, orden, fecha_servicio, fecha, hora, recogida,
+                              destino, deportistas, observaciones)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        filas,
+    )
+
+
+def _taxi(row) -> dict:
+    return dict(zip(CAMPOS_TAXI, row))
+
+
+def leer_taxis(conn: sqlite3.Connection, fecha_informe: str) -> list[dict]:
+    """Taxis de l'informe, amb les claus del formulari (Fecha, Hora...)."""
+    return [_taxi(r) for r in conn.execute(SQL_TAXIS_INFORME, (fecha_informe,))]
+
+
+def taxis_por_informe(conn: sqlite3.Connection, desde_iso: str, hasta_iso: str) -> dict[str, list[dict]]:
+    """{fecha de l'informe: [taxis]} dels informes del rang."""
+    res: dict[str, list[dict]] = {}
+    for fecha_informe, *valores in conn.execute(SQL_TAXIS_RANGO, (desde_iso, hasta_iso)):
+        res.setdefault(fecha_informe, []).append(_taxi(valores))
+    return res
+
+
+def _migrar_taxis_json(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS taxis (
+            id INTEGER PRIMARY KEY,
+            informe_fecha TEXT NOT NULL REFERENCES informes (fecha) ON DELETE CASCADE,
+            orden INTEGER NOT NULL,
+            fecha_servicio TEXT,   -- ISO; NULL si la data entrada no s'entén
+            fecha TEXT,            -- tal com s'ha entrat (dd/mm/aaaa)
+            hora TEXT,
+            recogida TEXT,
+            destino TEXT,
+            deportistas TEXT,
+            observaciones TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_taxis_informe ON taxis (informe_fecha, orden)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_taxis_servicio ON taxis (fecha_servicio, hora)")
+
+    filas = conn.execute("SELECT fecha, taxis FROM informes WHERE taxis IS NOT NULL AND taxis <> ''").fetchall()
+    migrados = []
+    for fecha_informe, taxis_json in filas:
+        try:
+            taxis = json.loads(taxis_json)
+        except ValueError:
+            continue
+        if not isinstance(taxis, list):
+            continue
+        guardar_taxis(conn, fecha_informe, taxis)
+        migrados.append((fecha_informe,))
+    # La columna queda en desús (SQLite antic no pot fer DROP COLUMN): sense
+    # dades, perquè no hi hagi dues versions dels taxis. Els JSON que no s'han
+    # pogut llegir s'hi queden tal com eren per recuperar-los a mà.
+    conn.execute("UPDATE informes SET taxis = NULL WHERE taxis = ''")
+    conn.executemany("UPDATE informes SET taxis = NULL WHERE fecha=?", migrados)
+
+
+# -----------------------
+# Migracions (número, descripció, SQL o funció)
+# -----------------------
+# Taules "external content" de FTS5 (migració 2): el text viu a informes/
+# informes_alumnos i l'índex només en guarda els termes (per rowid); els
+# triggers el mantenen al dia. Per això els desats fan UPSERT (ON CONFLICT DO
+# UPDATE) i no INSERT OR REPLACE: el REPLACE esborra la fila sense disparar el
+# trigger de DELETE i l'índex quedaria desfasat. (Tampoc s'ha de fer VACUUM:
+# pot canviar els rowid.)
+MIGRACIONES = [
+    (1, "taules d'informes", """
+CREATE TABLE IF NOT EXISTS informes (
+    fecha TEXT PRIMARY KEY,
+    cuidador TEXT,
+    entradas_salidas TEXT,
+    mantenimiento TEXT,
+    temas_genericos TEXT,
+    taxis TEXT
+);
+CREATE TABLE IF NOT EXISTS informes_alumnos (
+    fecha TEXT,
+    alumno TEXT,
+    contenido TEXT,
+    PRIMARY KEY (fecha, alumno)
+);
+"""),
+    (2, "índex de text complet (FTS5)", """
+CREATE VIRTUAL TABLE IF NOT EXISTS informes_fts USING fts5(
+    entradas_salidas, mantenimiento, temas_genericos,
+    content='informes', tokenize='unicode61 remove_diacritics 2', prefix='3'
+);
+CREATE TRIGGER IF NOT EXISTS informes_fts_ai AFTER INSERT ON informes BEGIN
+    INSERT INTO informes_fts (rowid, entradas_salidas, mantenimiento, temas_genericos)
+    VALUES (new.rowid, new.entradas_salidas, new.mantenimiento, new.temas_genericos);
+END;
+CREATE TRIGGER IF NOT EXISTS informes_fts_ad AFTER DELETE ON informes BEGIN
+    INSERT INTO informes_fts (informes_fts, rowid, entradas_salidas, mantenimiento, temas_genericos)
+    VALUES ('delete', old.rowid, old.entradas_salidas, old.mantenimiento, old.temas_genericos);
+END;
+CREATE TRIGGER IF NOT EXISTS informes_fts_au AFTER UPDATE ON informes BEGIN
+    INSERT INTO informes_fts (informes_fts, rowid, entradas_salidas, mantenimiento, temas_genericos)
+    VALUES ('delete', old.rowid, old.entradas_salidas, old.mantenimiento, old.temas_genericos);
+    INSERT INTO informes_fts (rowid, entradas_salidas, mantenimiento, temas_genericos)
+    VALUES (new.rowid, new.entradas_salidas, new.mantenimiento, new.temas_genericos);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS informes_alumnos_fts USING fts5(
+    contenido,
+    content='informes_alumnos', tokenize='unicode61 remove_diacritics 2', prefix='3'
+);
+CREATE TRIGGER IF NOT EXISTS informes_alumnos_fts_ai AFTER INSERT ON informes_alumnos BEGIN
+    INSERT INTO informes_alumnos_fts (rowid, contenido) VALUES (new.rowid, new.contenido);
+END;
+CREATE TRIGGER IF NOT EXISTS informes_alumnos_fts_ad AFTER DELETE ON informes_alumnos BEGIN
+    INSERT INTO informes_alumnos_fts (informes_alumnos_fts, rowid, contenido)
+    VALUES ('delete', old.rowid, old.contenido);
+END;
+CREATE TRIGGER IF NOT EXISTS informes_alumnos_fts_au AFTER UPDATE ON informes_alumnos BEGIN
+    INSERT INTO informes_alumnos_fts (informes_alumnos_fts, rowid, contenido)
+    VALUES ('delete', old.rowid, old.contenido);
+    INSERT INTO informes_alumnos_fts (rowid, contenido) VALUES (new.rowid, new.contenido);
+END;
+
+-- Indexa els informes que ja hi havia (idempotent)
+INSERT INTO informes_fts (informes_fts) VALUES ('rebuild');
+INSERT INTO informes_alumnos_fts (informes_alumnos_fts) VALUES ('rebuild');
+"""),
+    # La clau primària (fecha, alumno) no serveix per a "tots els informes d'un
+    # esportista": aquest índex sí, i ja els dona ordenats per data.
+    (3, "índex d'informes individuals per esportista", """
+CREATE INDEX IF NOT EXISTS idx_informes_alumnos_alumno_fecha ON informes_alumnos (alumno, fecha);
+"""),
+    (4, "taula de taxis (migra el JSON de informes.taxis)", _migrar_taxis_json),
+    # Buides: app.py les omple en segon pla (IndiceMenciones.reconstruir)
+    (5, "índex de mencions", ESQUEMA_MENCIONES),
+]
+
+
+def migrar(conn: sqlite3.Connection) -> int:
+    """Aplica les migracions pendents. Retorna la versió de l'esquema."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for numero, _descripcion, paso in MIGRACIONES:
+        if numero <= version:
+            continue
+        if callable(paso):
+            conn.commit()
+            conn.execute("BEGIN")
+            try:
+                paso(conn)
+                conn.execute(f"PRAGMA user_version = {numero}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        else:
+            conn.executescript(f"BEGIN;\n{paso}\nPRAGMA user_version = {numero};\nCOMMIT;")
+        version = numero
+    return version
+
+
+# -----------------------
+# Connexions (pool acotat)
+# -----------------------
+BUSY_TIMEOUT = 10  # segons que una escriptura espera si n'hi ha una altra en curs
+TAMANO_POOL = 8    # connexions obertes com a molt (lectures concurrents)
+ESPERA_POOL = 30   # segons que una operació espera una connexió lliure
+
+PRAGMAS_CONEXION = (
+    "PRAGMA journal_mode = WAL",      # les lectures no esperen l'escriptor (i a l'inrevés)
+    "PRAGMA synchronous = NORMAL",    # amb WAL, sense fsync a cada commit; la BD no es corromp
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT * 1000}",
+    "PRAGMA foreign_keys = ON",       # taxis → informes
+    "PRAGMA cache_size = -16000",     # 16 MB de pàgines per connexió
+    "PRAGMA mmap_size = 134217728",   # lectures via mmap (128 MB)
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class GestorConexiones:
+    """
+    Pool de connexions a informes.db. Streamlit executa cada rerun en un fil
+    nou, així que les connexions no poden anar lligades al fil: se n'obren com
+    a molt 'tamano', viuen tot el procés (amb els PRAGMA ja aplicats) i cada
+    operació en treu una i la torna en acabar:
+
+        with gestor.conexion() as conn:
+            ...
+
+    Les migracions s'apliquen en crear el gestor.
+    """
+
+    def __init__(self, path: str, tamano: int = TAMANO_POOL):
+        self.path = path
+        self.tamano = tamano
+        self._libres: queue.Queue[sqlite3.Connection] = queue.Queue()
+        self._abiertas = 0
+        self._lock = threading.Lock()
+        with self.conexion() as conn:
+            migrar(conn)
+
+    def _abrir(self) -> sqlite3.Connection:
+        # La connexió passa d'un fil a un altre, però només la fa servir un alhora
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        for pragma in PRAGMAS_CONEXION:
+            conn.execute(pragma)
+        return conn
+
+    def _obtener(self) -> sqlite3.Connection:
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            abrir = self._abiertas < self.tamano
+            if abrir:
+                self._abiertas += 1
+        if abrir:
+            try:
+                return self._abrir()
+            except Exception:
+                with self._lock:
+                    self._abiertas -= 1
+                raise
+        try:
+            return self._libres.get(timeout=ESPERA_POOL)
+        except queue.Empty:
+            raise RuntimeError(f"Cap connexió lliure a {self.path} després de {ESPERA_POOL} s") from None
+
+    @contextmanager
+    def conexion(self) -> Iterator[sqlite3.Connection]:
+        """Connexió del pool durant el bloc 'with' (es torna en sortir)."""
+        conn = self._obtener()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()  # no es passa una transacció a mitges a la següent operació
+            self._libres.put(conn)
+
+    def estadisticas(self) -> dict:
+        return {"obertes": self._abiertas, "lliures": self._libres.qsize(), "maxim": self.tamano}
+
+
+# -----------------------
+# Consultes de les vistes i dels històrics
+# -----------------------
+SQL_INFORME_GENERAL = """
+    SELECT cuidador, entradas_salidas, mantenimiento, temas_genericos
+    FROM informes
+    WHERE fecha=?
+"""
+
+SQL_GENERALES_RANGO = """
+    SELECT fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos
+    FROM informes
+    WHERE fecha BETWEEN ? AND ?
+    ORDER BY fecha ASC
+"""
+
+# Recorregut complet (reconstrucció de l'índex de mencions): no va a CONSULTAS
+SQL_GENERALES_TODOS = """
+    SELECT fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos
+    FROM informes
+    ORDER BY fecha DESC
+"""
+
+# Recorre la taula (cerca de subcadenes); app.py fa servir l'índex de mencions
+SQL_GENERALES_CON_TEXTO = """
+    SELECT fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos
+    FROM informes
+    WHERE {condiciones}
+    ORDER BY fecha DESC
+"""
+
+SQL_TAXIS_INFORME = """
+    SELECT fecha, hora, recogida, destino, deportistas, observaciones
+    FROM taxis
+    WHERE informe_fecha=?
+    ORDER BY orden
+"""
+
+# Per data de l'informe (la que tria l'històric)
+SQL_TAXIS_RANGO = """
+    SELECT informe_fecha, fecha, hora, recogida, destino, deportistas, observaciones
+    FROM taxis
+    WHERE informe_fecha BETWEEN ? AND ?
+    ORDER BY informe_fecha, orden
+"""
+
+# Per data del servei (les files sense data interpretable no hi surten)
+SQL_TAXIS_SERVICIO_RANGO = """
+    SELECT informe_fecha, fecha, hora, recogida, destino, deportistas, observaciones
+    FROM taxis
+    WHERE fecha_servicio BETWEEN ? AND ?
+    ORDER BY fecha_servicio, hora
+"""
+
+SQL_INFORME_INDIVIDUAL = "SELECT contenido FROM informes_alumnos WHERE fecha=? AND alumno=?"
+
+SQL_ALUMNOS_CON_INFORME = "SELECT alumno FROM informes_alumnos WHERE fecha=?"
+
+SQL_INDIVIDUALES_ALUMNO = """
+    SELECT fecha, contenido
+    FROM informes_alumnos
+    WHERE alumno=?
+    ORDER BY fecha DESC
+"""
+
+SQL_INDIVIDUALES_ALUMNO_RANGO = """
+    SELECT fecha, contenido
+    FROM informes_alumnos
+    WHERE alumno=?
+      AND fecha BETWEEN ? AND ?
+    ORDER BY fecha ASC
+"""
+
+SQL_GUARDAR_GENERAL = """
+    INSERT INTO informes (fecha, cuidador, entradas_salidas, mantenimiento, temas_genericos)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(fecha) DO UPDATE SET
+        cuidador=excluded.cuidador,
+        entradas_salidas=excluded.entradas_salidas,
+        mantenimiento=excluded.mantenimiento,
+        temas_genericos=excluded.temas_genericos
+"""
+
+SQL_GUARDAR_INDIVIDUAL = """
+    INSERT INTO informes_alumnos (fecha, alumno, contenido) VALUES (?, ?, ?)
+    ON CONFLICT(fecha, alumno) DO UPDATE SET contenido=excluded.contenido
+"""
+
+SQL_BORRAR_INDIVIDUAL = "DELETE FROM informes_alumnos WHERE fecha=? AND alumno=?"
+
+# nom → (SQL, paràmetres d'exemple) per a comprobar_planes
+CONSULTAS = {
+    "informe_general": (SQL_INFORME_GENERAL, ("2025-01-01",)),
+    "generales_rango": (SQL_GENERALES_RANGO, ("2025-01-01", "2025-12-31")),
+    "taxis_informe": (SQL_TAXIS_INFORME, ("2025-01-01",)),
+    "taxis_rango": (SQL_TAXIS_RANGO, ("2025-01-01", "2025-12-31")),
+    "taxis_servicio_rango": (SQL_TAXIS_SERVICIO_RANGO, ("2025-01-01", "2025-12-31")),
+    "informe_individual": (SQL_INFORME_INDIVIDUAL, ("2025-01-01", "X")),
+    "alumnos_con_informe": (SQL_ALUMNOS_CON_INFORME, ("2025-01-01",)),
+    "individuales_alumno": (SQL_INDIVIDUALES_ALUMNO, ("X",)),
+    "individuales_alumno_rango": (SQL_INDIVIDUALES_ALUMNO_RANGO, ("X", "2025-01-01", "2025-12-31")),
+}
+
+
+def comprobar_planes(conn: sqlite3.Connection) -> list[str]:
+    """
+    Revisa el pla de cada consulta de CONSULTAS. Retorna els problemes
+    ("nom: detall del pla"): taules recorregudes senceres (SCAN) o ordenacions
+    fora d'índex (USE TEMP B-TREE). Llista buida si totes van per índex.
+    """
+    problemas = []
+    for nombre, (sql, params) in CONSULTAS.items():
+        for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detalle = fila[-1]
+            if detalle.startswith("SCAN ") or "USE TEMP B-TREE" in detalle:
+                problemas.append(f"{nombre}: {detalle}")
+    return problemas
+
+
+# -----------------------
+# AlmacenInformes sobre informes.db
+# -----------------------
+def _informe_general(row) -> dict:
+    fecha, cuidador, entradas, mantenimiento, temas = row
+    return {
+        "fecha": fecha,
+        "cuidador": cuidador or "",
+        "entradas": entradas or "",
+        "mantenimiento": mantenimiento or "",
+        "temas": temas or "",
+    }
+
+
+class AlmacenSQLite(AlmacenInformes):
+    """
+    Implementació d'AlmacenInformes per a app.py. Cada crida treu una
+    connexió del pool del gestor i la torna en acabar. al_guardar_general(conn,
+    datos) s'executa dins la transacció del desat de l'informe general, abans
+    del commit (índex de mencions).
+    """
+
+    def __init__(self, gestor: GestorConexiones,
+                 al_guardar_general: Callable[[sqlite3.Connection, dict], None] | None = None):
+        self.gestor = gestor
+        self.al_guardar_general = al_guardar_general
+
+    def informe_general(self, fecha_iso: str) -> dict | None:
+        with self.gestor.conexion() as conn:
+            row = conn.execute(SQL_INFORME_GENERAL, (fecha_iso,)).fetchone()
+            if row is None:
+                return None
+            return {**_informe_general((fecha_iso, *row)), "taxis": leer_taxis(conn, fecha_iso)}
+
+    def informes_generales_rango(self, desde_iso: str, hasta_iso: str, con_taxis: bool = False) -> list[dict]:
+        with self.gestor.conexion() as conn:
+            informes = [_informe_general(r) for r in conn.execute(SQL_GENERALES_RANGO, (desde_iso, hasta_iso))]
+            if con_taxis:
+                taxis = taxis_por_informe(conn, desde_iso, hasta_iso)
+                for rec in informes:
+                    rec["taxis"] = taxis.get(rec["fecha"], [])
+        return informes
+
+    def iter_informes_generales_todos(self) -> Iterator[dict]:
+        # La connexió queda agafada fins que s'acaba (o es tanca) el generador
+        with self.gestor.conexion() as conn:
+            for row in conn.execute(SQL_GENERALES_TODOS):
+                yield _informe_general(row)
+
+    def iter_informes_generales_con_texto(self, terminos: list[str]) -> Iterator[dict]:
+        terminos = [t.lower() for t in terminos if t]
+        if not terminos:
+            return
+        condiciones = " OR ".join(
+            f"instr(lower({campo}), ?) > 0"
+            for _ in terminos for campo in ("entradas_salidas", "mantenimiento", "temas_genericos")
+        )
+        params = [t for t in terminos for _ in range(3)]
+        with self.gestor.conexion() as conn:
+            for row in conn.execute(SQL_GENERALES_CON_TEXTO.format(condiciones=condiciones), params):
+                yield _informe_general(row)
+
+    def taxis_rango(self, desde_iso: str, hasta_iso: str, por_servicio: bool = False) -> list[tuple[str, dict]]:
+        sql = SQL_TAXIS_SERVICIO_RANGO if por_servicio else SQL_TAXIS_RANGO
+        with self.gestor.conexion() as conn:
+            return [
+                (fecha_informe, _taxi(valores))
+                for fecha_informe, *valores in conn.execute(sql, (desde_iso, hasta_iso))
+            ]
+
+    def informe_individual(self, fecha_iso: str, alumno: str) -> str | None:
+        with self.gestor.conexion() as conn:
+            row = conn.execute(SQL_INFORME_INDIVIDUAL, (fecha_iso, alumno)).fetchone()
+        return None if row is None else (row[0] or "")
+
+    def informes_individuales(self, alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None,
+                              ascendente: bool = False) -> list[tuple[str, str]]:
+        with self.gestor.conexion() as conn:
+            if desde_iso and hasta_iso:
+                # SQL_INDIVIDUALES_ALUMNO_RANGO és ascendent
+                filas = conn.execute(SQL_INDIVIDUALES_ALUMNO_RANGO, (alumno, desde_iso, hasta_iso)).fetchall()
+                descendente = False
+            else:
+                filas = conn.execute(SQL_INDIVIDUALES_ALUMNO, (alumno,)).fetchall()
+                descendente = True
+        registros = [(fecha, contenido or "") for fecha, contenido in filas]
+        if descendente == ascendente:
+            registros.reverse()
+        return registros
+
+    def alumnos_con_informe(self, fecha_iso: str) -> list[str]:
+        with self.gestor.conexion() as conn:
+            return [r[0] for r in conn.execute(SQL_ALUMNOS_CON_INFORME, (fecha_iso,))]
+
+    def guardar(self, tipo: str, datos: dict) -> dict | None:
+        with self.gestor.conexion() as conn, conn:
+            if tipo == "informe_general":
+                conn.execute(SQL_GUARDAR_GENERAL, (
+                    datos["fecha_iso"], datos["cuidador"], datos["entradas"],
+                    datos["mantenimiento"], datos["temas"],
+                ))
+                guardar_taxis(conn, datos["fecha_iso"], datos.get("taxis") or [])
+                if self.al_guardar_general is not None:
+                    self.al_guardar_general(conn, datos)
+            elif tipo == "informe_individual":
+                conn.execute(SQL_GUARDAR_INDIVIDUAL, (datos["fecha_iso"], datos["alumno"], datos["contenido"]))
+            elif tipo == "borrar_individual":
+                conn.execute(SQL_BORRAR_INDIVIDUAL, (datos["fecha_iso"], datos["alumno"]))
+            else:
+                raise RuntimeError(f"Tipus d'operació desconegut: {tipo}")
+        return None
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(":memory:")
+    if len(sys.argv) > 1:
+        # Es comprova una còpia: la BD original no es migra
+        with sqlite3.connect(sys.argv[1]) as origen:
+            origen.backup(conn)
+    print(f"esquema v{migrar(conn)}")
+    for nombre, (sql, params) in CONSULTAS.items():
+        plan = "; ".join(f[-1] for f in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        print(f"  {nombre:28} {plan}")
+    problemas = comprobar_planes(conn)
+    for p in problemas:
+        print(f"⚠️ {p}")
+    sys.exit(1 if problemas else 0)
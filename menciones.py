@@ -0,0 +1,340 @@
+# =========================================================
+# menciones.py - DETECCIÓ DE MENCIONS (Aho–Corasick)
+# =========================================================
+# Un esportista apareix a una línia si hi ha el seu àlies o "@nom de pila"
+# (sense distingir majúscules), com a extraer_menciones_de de les apps.
+#
+# En lloc de recórrer el text dues vegades per esportista, BuscadorMenciones
+# compila tots els patrons de tots els esportistes en un sol autòmat
+# d'Aho–Corasick i recorre cada línia una única vegada: el cost és
+# proporcional a la longitud del text, no al nombre d'esportistes.
+#
+# IndiceMenciones guarda el resultat a SQLite (fecha, alumno, camp, línia) en el
+# moment de desar cada informe general: les consultes de mencions i l'històric
+# individual passen a ser una cerca per índex en lloc de rellegir tots els textos.
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import AbstractContextManager, nullcontext
+from typing import Callable, Iterable
+
+# Camps de text dels informes generals → títol que mostren les vistes i els PDF
+CAMPOS_MENCIONES = {
+    "entradas": "Informe del dia",
+    "mantenimiento": "Notes per direcció, manteniment i neteja",
+    "temas": "Pícnics pel dia següent",
+}
+
+
+def patrones_alumno(alumno: str, alias: str | None) -> list[str]:
+    """Patrons (en minúscules) que identifiquen l'esportista: àlies i @nom."""
+    patrones = []
+    alias = (alias or "").strip().lower()
+    if alias:
+        patrones.append(alias)
+    partes = alumno.split()
+    nombre_pila = (partes[0] if partes else alumno).lower()
+    if nombre_pila:
+        patrones.append(f"@{nombre_pila}")
+    return patrones
+
+
+class BuscadorMenciones:
+    """
+    Autòmat compilat sobre els patrons de tots els esportistes.
+    patrones: {alumno: [patró en minúscules, ...]}
+    """
+
+    def __init__(self, patrones: dict[str, list[str]]):
+        self.alumnos = list(patrones)
+
+        # Trie: transicions, i per a cada estat els índexs d'esportista que hi acaben
+        goto: list[dict[str, int]] = [{}]
+        salida: list[set[int]] = [set()]
+        for idx, alumno in enumerate(self.alumnos):
+            for patron in patrones[alumno]:
+                if not patron:
+                    continue
+                estado = 0
+                for ch in patron:
+                    sig = goto[estado].get(ch)
+                    if sig is None:
+                        sig = len(goto)
+                        goto[estado][ch] = sig
+                        goto.append({})
+                        salida.append(set())
+                    estado = sig
+                salida[estado].add(idx)
+
+        # Enllaços de fallada en amplada; cada estat hereta les transicions i
+        # sortides del seu estat de fallada (DFA complet: cap bucle de fallades
+        # en temps de cerca).
+        fallo = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        cola = list(goto[0].values())
+        for estado in cola:
+            delta[estado] = dict(delta[fallo[estado]])
+            delta[estado].update(goto[estado])
+            salida[estado] |= salida[fallo[estado]]
+            for ch, sig in goto[estado].items():
+                fallo[sig] = delta[fallo[estado]].get(ch, 0) if estado else 0
+                cola.append(sig)
+
+        self._delta = delta
+        self._salida = [frozenset(s) for s in salida]
+
+        # Identifica el conjunt de patrons: si canvia (nou esportista, àlies
+        # editat...) l'índex de mencions s'ha de reconstruir.
+        texto = json.dumps({a: sorted(patrones[a]) for a in sorted(patrones)}, ensure_ascii=False)
+        self.firma = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def desde_alias(cls, alumnos, alias: dict[str, str]) -> "BuscadorMenciones":
+        """Construeix el buscador per a ALUMNOS amb ALIAS_DEPORTISTAS."""
+        return cls({a: patrones_alumno(a, alias.get(a)) for a in alumnos})
+
+    def alumnos_en_linea(self, linea: str) -> set[int]:
+        """Índexs (a self.alumnos) dels esportistes mencionats a la línia."""
+        delta = self._delta
+        salida = self._salida
+        estado = 0
+        trobats: set[int] = set()
+        for ch in linea.lower():
+            estado = delta[estado].get(ch, 0)
+            if salida[estado]:
+                trobats |= salida[estado]
+        return trobats
+
+    def menciones(self, texto: str) -> dict[str, list[str]]:
+        """
+        {alumno: [línies on apareix]} per a tots els esportistes alhora.
+        Les línies es retornen sense espais als extrems, en ordre.
+        """
+        res: dict[str, list[str]] = {}
+        if not texto:
+            return res
+        for linea in texto.splitlines():
+            trobats = self.alumnos_en_linea(linea)
+            if not trobats:
+                continue
+            linea_str = linea.strip()
+            for idx in trobats:
+                res.setdefault(self.alumnos[idx], []).append(linea_str)
+        return res
+
+    def menciones_informe(self, campos: dict[str, str]) -> dict[str, dict[str, list[str]]]:
+        """
+        campos: {nom del camp: text}. Retorna {alumno: {camp: [línies]}} només
+        amb els esportistes que surten a algun camp.
+        """
+        res: dict[str, dict[str, list[str]]] = {}
+        for campo, texto in campos.items():
+            for alumno, lineas in self.menciones(texto).items():
+                res.setdefault(alumno, {})[campo] = lineas
+        return res
+
+
+ESQUEMA_MENCIONES = """
+CREATE TABLE IF NOT EXISTS menciones (
+    alumno TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    camp TEXT NOT NULL,
+    orden INTEGER NOT NULL,
+    linea TEXT NOT NULL,
+    PRIMARY KEY (alumno, fecha, camp, orden)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_menciones_fecha ON menciones (fecha);
+
+CREATE TABLE IF NOT EXISTS menciones_informes (
+    fecha TEXT PRIMARY KEY,
+    cuidador TEXT
+);
+
+CREATE TABLE IF NOT EXISTS menciones_meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+class IndiceMenciones:
+    """
+    Índex invertit de mencions. 'conexion' és la ruta d'un fitxer SQLite propi
+    (una connexió per fil, en mode WAL; l'esquema es crea aquí) o una funció que
+    presta una connexió durant un bloc 'with' (el pool de GestorConexiones de
+    l'app, on les taules les crea la migració 5 de informes_sqlite.py).
+    """
+
+    def __init__(self, conexion: str | Callable[[], AbstractContextManager[sqlite3.Connection]]):
+        self._prestar = conexion if callable(conexion) else None
+        self._path = None if self._prestar is not None else conexion
+        self._local = threading.local()
+        self._lock_reconstruir = threading.Lock()
+        self.ultimo_error: str | None = None
+        # Informes indexats mentre una reconstrucció llegeix les dades: es
+        # tornen a aplicar al final perquè la càrrega no els trepitgi
+        self._lock_carga = threading.Lock()
+        self._lock_durante = threading.Lock()
+        self._indexados_durante: dict[str, tuple[str, list[tuple]]] | None = None
+        if self._path is not None:
+            with self._conexion() as conn, conn:
+                conn.executescript(ESQUEMA_MENCIONES)
+
+    def _conexion(self) -> AbstractContextManager[sqlite3.Connection]:
+        if self._prestar is not None:
+            return self._prestar()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return nullcontext(conn)
+
+    def _meta(self, clave: str) -> str | None:
+        with self._conexion() as conn:
+            row = conn.execute("SELECT valor FROM menciones_meta WHERE clave=?", (clave,)).fetchone()
+        return row[0] if row else None
+
+    def vigente(self, buscador: BuscadorMenciones) -> bool:
+        """True si l'índex s'ha construït amb els mateixos patrons que 'buscador'."""
+        return self._meta("firma") == buscador.firma
+
+    def reconstruido_en(self) -> float:
+        """Timestamp de la darrera reconstrucció completa (0 si no n'hi ha hagut cap)."""
+        return float(self._meta("reconstruido_en") or 0)
+
+    # ----------------------------------------------
+    # Escriptura
+    # ----------------------------------------------
+    @staticmethod
+    def _filas(buscador: BuscadorMenciones, fecha_iso: str, textos: dict[str, str]) -> list[tuple]:
+        filas = []
+        for alumno, por_camp in buscador.menciones_informe(textos).items():
+            for camp, lineas in por_camp.items():
+                filas += [(alumno, fecha_iso, camp, i, linea) for i, linea in enumerate(lineas)]
+        return filas
+
+    @staticmethod
+    def _escribir(conn: sqlite3.Connection, fecha_iso: str, cuidador: str, filas: list[tuple]):
+        conn.execute("DELETE FROM menciones WHERE fecha=?", (fecha_iso,))
+        conn.execute(
+            "INSERT OR REPLACE INTO menciones_informes (fecha, cuidador) VALUES (?, ?)",
+            (fecha_iso, cuidador or ""),
+        )
+        conn.executemany(
+            "INSERT INTO menciones (alumno, fecha, camp, orden, linea) VALUES (?, ?, ?, ?, ?)", filas,
+        )
+
+    def indexar_informe(self, buscador: BuscadorMenciones, fecha_iso: str, cuidador: str,
+                        textos: dict[str, str], conn: sqlite3.Connection | None = None):
+        """
+        Substitueix les mencions de l'informe d'aquesta data.
+        textos: {"entradas": ..., "mantenimiento": ..., "temas": ...}
+        conn: transacció oberta del desat de l'informe (qui la passa fa el commit).
+        """
+        filas = self._filas(buscador, fecha_iso, textos)
+        with self._lock_durante:
+            if self._indexados_durante is not None:
+                self._indexados_durante[fecha_iso] = (cuidador, filas)
+        if conn is not None:
+            self._escribir(conn, fecha_iso, cuidador, filas)
+            return
+        with self._conexion() as conn, conn:
+            self._escribir(conn, fecha_iso, cuidador, filas)
+
+    def reconstruir(self, buscador: BuscadorMenciones, informes: Iterable[dict]) -> int:
+        """
+        Càrrega completa (omplir l'índex amb les dades existents o després d'un
+        canvi d'àlies). informes: dicts amb fecha (ISO), cuidador, entradas,
+        mantenimiento i temas. Primer es recorren tots (poden venir de la xarxa)
+        i després s'escriu tot en una transacció curta. Els informes indexats
+        mentre es llegia (indexar_informe) hi tornen a anar al final, per sobre
+        de la versió llegida. Retorna quants n'ha indexat.
+        """
+        with self._lock_carga:
+            with self._lock_durante:
+                self._indexados_durante = {}
+            try:
+                por_informe = []
+                for rec in informes:
+                    fecha_iso = (rec.get("fecha") or "").strip()
+                    if not fecha_iso:
+                        continue
+                    textos = {campo: rec.get(campo) or "" for campo in CAMPOS_MENCIONES}
+                    por_informe.append((fecha_iso, rec.get("cuidador") or "", self._filas(buscador, fecha_iso, textos)))
+
+                with self._conexion() as conn, conn:
+                    conn.execute("DELETE FROM menciones")
+                    conn.execute("DELETE FROM menciones_informes")
+                    for fecha_iso, cuidador, filas in por_informe:
+                        self._escribir(conn, fecha_iso, cuidador, filas)
+                    # Dins la transacció: un indexar_informe posterior ja escriu després
+                    with self._lock_durante:
+                        recientes, self._indexados_durante = self._indexados_durante, None
+                    for fecha_iso, (cuidador, filas) in recientes.items():
+                        self._escribir(conn, fecha_iso, cuidador, filas)
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO menciones_meta (clave, valor) VALUES (?, ?)",
+                        [("firma", buscador.firma), ("reconstruido_en", str(time.time()))],
+                    )
+            finally:
+                with self._lock_durante:
+                    self._indexados_durante = None
+        return len(por_informe)
+
+    def reconstruir_en_segundo_plano(self, buscador: BuscadorMenciones,
+                                     obtener_informes: Callable[[], Iterable[dict]]):
+        """Llança reconstruir() en un fil, si no n'hi ha cap en marxa."""
+        if not self._lock_reconstruir.acquire(blocking=False):
+            return
+
+        def _tarea():
+            try:
+                self.reconstruir(buscador, obtener_informes())
+                self.ultimo_error = None
+            except Exception as e:
+                self.ultimo_error = str(e)
+            finally:
+                self._lock_reconstruir.release()
+
+        threading.Thread(target=_tarea, name="menciones-reconstruir", daemon=True).start()
+
+    # ----------------------------------------------
+    # Consulta
+    # ----------------------------------------------
+    def menciones_de(self, alumno: str, desde_iso: str | None = None, hasta_iso: str | None = None,
+                     ascendente: bool = False) -> list[tuple[str, str, dict[str, list[str]]]]:
+        """
+        [(fecha_iso, cuidador, {títol del camp: [línies]})] de l'esportista,
+        per data (desc per defecte), opcionalment limitat al rang.
+        """
+        sql = """SELECT m.fecha, i.cuidador, m.camp, m.linea
+                 FROM menciones m LEFT JOIN menciones_informes i ON i.fecha = m.fecha
+                 WHERE m.alumno=?"""
+        params: list = [alumno]
+        if desde_iso:
+            sql += " AND m.fecha >= ?"
+            params.append(desde_iso)
+        if hasta_iso:
+            sql += " AND m.fecha <= ?"
+            params.append(hasta_iso)
+        orden = "ASC" if ascendente else "DESC"
+        sql += f" ORDER BY m.fecha {orden}, m.camp, m.orden"
+
+        por_fecha: dict[str, tuple[str, dict[str, list[str]]]] = {}
+        with self._conexion() as conn:
+            filas = conn.execute(sql, params).fetchall()
+        for fecha, cuidador, camp, linea in filas:
+            _, campos = por_fecha.setdefault(fecha, (cuidador or "", {}))
+            campos.setdefault(camp, []).append(linea)
+
+        # Camps en l'ordre del formulari, amb el títol de les vistes
+        res = []
+        for fecha, (cuidador, campos) in por_fecha.items():
+            res.append((fecha, cuidador, {
+                titulo: campos[campo] for campo, titulo in CAMPOS_MENCIONES.items() if campo in campos
+            }))
+        return res
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacen_informes import AlmacenEnCache, AlmacenInformes  # noqa: E402
+from informes_sqlite import AlmacenSQLite, GestorConexiones  # noqa: E402
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    base = AlmacenSQLite(GestorConexiones(str(tmp_path / "informes.db")))
+    for fecha in ("2025-01-01", "2025-01-02"):
+        base.guardar("informe_individual", {"fecha_iso": fecha, "alumno": "Ana", "contenido": f"Ana {fecha}"})
+        base.guardar("informe_individual", {"fecha_iso": fecha, "alumno": "Bel", "contenido": f"Bel {fecha}"})
+    return AlmacenEnCache(base, ttl=60)
+
+
+def test_backend_incomplet_no_es_pot_instanciar():
+    class Incomplet(AlmacenInformes):
+        def informe_general(self, fecha_iso):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplet()
+
+
+def test_desat_nomes_invalida_el_que_toca(almacen):
+    almacen.informes_individuales("Ana")
+    almacen.informes_individuales("Bel")
+    almacen.informe_individual("2025-01-01", "Bel")
+
+    almacen.guardar("informe_individual", {"fecha_iso": "2025-01-02", "alumno": "Ana", "contenido": "nou"})
+
+    assert almacen.informes_individuales("Ana")[0] == ("2025-01-02", "nou")
+    almacen.informes_individuales("Bel")
+    almacen.informe_individual("2025-01-01", "Bel")
+    assert (almacen.aciertos, almacen.fallos) == (2, 4)
+
+
+def test_resultats_de_nomes_lectura(almacen):
+    registros = almacen.informes_individuales("Ana")
+    assert isinstance(registros, tuple)
+    assert almacen.informes_individuales("Ana") is registros
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from informes_sqlite import CONSULTAS, MIGRACIONES, GestorConexiones, comprobar_planes, migrar  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "informes.db")
+    yield conn
+    conn.close()
+
+
+def test_migrar_arriba_a_la_darrera_version(conn):
+    assert migrar(conn) == MIGRACIONES[-1][0]
+    # Tornar a migrar no fa res
+    assert migrar(conn) == MIGRACIONES[-1][0]
+
+
+@pytest.mark.parametrize("nombre", sorted(CONSULTAS))
+def test_consulta_usa_indice(conn, nombre):
+    migrar(conn)
+    sql, params = CONSULTAS[nombre]
+    plan = [fila[-1] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    assert any(d.startswith("SEARCH ") for d in plan), plan
+    assert not any(d.startswith("SCAN ") or "USE TEMP B-TREE" in d for d in plan), plan
+
+
+def test_comprobar_planes_sense_problemes(conn):
+    migrar(conn)
+    assert comprobar_planes(conn) == []
+
+
+def test_pool_reutilitza_connexions_entre_fils(tmp_path):
+    gestor = GestorConexiones(str(tmp_path / "informes.db"), tamano=2)
+    vistes = set()
+
+    def rerun():
+        with gestor.conexion() as conn:
+            vistes.add(id(conn))
+            conn.execute("SELECT 1").fetchone()
+
+    # Com els reruns de Streamlit: cada un en un fil nou
+    for _ in range(5):
+        fil = threading.Thread(target=rerun)
+        fil.start()
+        fil.join()
+    assert len(vistes) == 1
+    assert gestor.estadisticas() == {"obertes": 1, "lliures": 1, "maxim": 2}
+
+
+def test_pool_no_passa_transaccions_obertes(tmp_path):
+    gestor = GestorConexiones(str(tmp_path / "informes.db"), tamano=1)
+    with gestor.conexion() as conn:
+        conn.execute("INSERT INTO informes (fecha) VALUES ('2025-01-01')")
+    with gestor.conexion() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM informes").fetchone()[0] == 0
+
+
+def test_reconstruir_mencions_no_trepitja_desats_concurrents(tmp_path):
+    from menciones import BuscadorMenciones, IndiceMenciones
+
+    gestor = GestorConexiones(str(tmp_path / "informes.db"))
+    indice = IndiceMenciones(gestor.conexion)
+    buscador = BuscadorMenciones({"Ana Puig": ["@ana"]})
+
+    def informes():
+        yield {"fecha": "2025-01-01", "cuidador": "x", "entradas": "@ana vella"}
+        # Desat que arriba mentre la reconstrucció encara llegeix
+        indice.indexar_informe(buscador, "2025-01-01", "x", {"entradas": "@ana nova"})
+
+    indice.reconstruir(buscador, informes())
+    assert indice.menciones_de("Ana Puig") == [("2025-01-01", "x", {"Informe del dia": ["@ana nova"]})]